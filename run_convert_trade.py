@@ -7,9 +7,11 @@ REPO_DIR = os.path.dirname(__file__)
 if REPO_DIR not in sys.path:
     sys.path.insert(0, REPO_DIR)
 
-# Ensure 'src' is a package so `from src.cli import main` works
-init_path = os.path.join(REPO_DIR, "src", "__init__.py")
-Path(init_path).touch()
+# Ensure 'src' is a package so `from src.cli import main` works.
+# Create it only if missing: touching it on every launch invalidates its cached bytecode.
+init_path = Path(REPO_DIR, "src", "__init__.py")
+if not init_path.exists():
+    init_path.touch()
 
 from src.cli import main  # noqa: E402
 
@@ -1 +1,13 @@
-from .core import convert_middleware  # noqa: F401
+"""
+Пакет навмисно порожній: стек Convert (``requests``, ``config_dev3``,
+обгортки middleware) імпортується лише командами, яким він потрібен.
+``src.convert_middleware`` лишився доступним — модуль вантажиться при першому зверненні.
+"""
+
+
+def __getattr__(name: str):
+    if name == "convert_middleware":
+        from .core import convert_middleware
+
+        return convert_middleware
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1 +1,268 @@
+"""Оркестратор analyze/trade з блокуванням та квотами."""
 
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import logging
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Sequence
+
+import config_dev3 as config
+
+# Стек Convert (requests, numpy) імпортується у функціях фаз: cron-запуск
+# поза вікном і ``--help`` не платять за нього (див. --profile-startup).
+from .core import eventlog, profiling, scheduler
+
+if TYPE_CHECKING:
+    from .core.accounts import Account
+    from .core.quote_engine import QuoteBudget, QuoteOutcome, QuoteRun
+
+LOGGER = logging.getLogger(__name__)
+
+# режим --phase window (див. run_window)
+_PHASE_GAP_SEC: float = float(getattr(config, "WINDOW_PHASE_GAP_SEC", 420))
+_ANALYZE_SEC: float = float(getattr(config, "WINDOW_ANALYZE_SEC", 300))
+_WARMUP_LEAD_SEC: float = float(getattr(config, "WINDOW_WARMUP_LEAD_SEC", 60))
+_WINDOW_MARGIN_SEC: float = float(getattr(config, "WINDOW_MARGIN_SEC", 60))
+_WINDOW_MAX_LEAD_SEC: float = float(getattr(config, "WINDOW_MAX_LEAD_SEC", 3600))
+
+ANALYZE_DIR = Path(getattr(config, "ANALYZE_DIR", Path(__file__).resolve().parents[1] / "analyze"))
+CANDIDATE_FIELDS = (
+    "ts",
+    "region",
+    "phase",
+    "from",
+    "to",
+    "account",
+    "wallet",
+    "amount",
+    "ratio",
+    "toAmount",
+    "available",
+    "insufficient",
+    "ok",
+    "quoteId",
+    "skipped",
+    "error",
+)
+
+
+def _utc_ts() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def candidate_row(outcome: QuoteOutcome, region: str, phase: str, account: str = "") -> Dict[str, Any]:
+    task, quote = outcome.task, outcome.quote
+    raw = quote.raw if quote else {}
+    return {
+        "ts": _utc_ts(),
+        "region": region,
+        "phase": phase,
+        "from": task.from_asset,
+        "to": task.to_asset,
+        "account": account,
+        "wallet": task.wallet,
+        "amount": str(task.amount),
+        "ratio": str(quote.price) if quote else "",
+        "toAmount": str(quote.to_amount) if quote else "",
+        "available": "",
+        "insufficient": int(bool(raw.get("insufficient"))),
+        "ok": int(outcome.ok),
+        "quoteId": quote.quote_id if quote else "",
+        "skipped": int(outcome.skipped),
+        "error": outcome.error,
+    }
+
+
+def _accept_outcome(outcome: QuoteOutcome, budget: Optional[QuoteBudget] = None) -> None:
+    """Приймає котирування одразу після отримання (фаза trade): дедуп, breaker і знімок — як у ``execute_unique``."""
+
+    from .core import convert_api, convert_middleware
+
+    quote, task = outcome.quote, outcome.task
+    if quote is None:
+        return
+    try:
+        result = convert_api.accept_unique(quote, task.wallet, accept=convert_middleware.accept_quote, budget=budget)
+    except Exception as exc:
+        outcome.error = f"accept failed: {exc}"
+        LOGGER.error("accept %s->%s failed: %s", quote.from_asset, quote.to_asset, exc)
+        return
+    if not result:
+        return
+    order_id = result.get("orderId")
+    LOGGER.info("accepted %s->%s orderId=%s", quote.from_asset, quote.to_asset, order_id)
+    if order_id:
+        try:
+            LOGGER.info("orderStatus %s: %s", order_id, convert_api.order_status(str(order_id)))
+        except Exception as exc:
+            LOGGER.warning("orderStatus %s failed: %s", order_id, exc)
+
+
+def run_phase(
+    region: str,
+    phase: str,
+    dry_run: bool,
+    routes: Optional[Sequence[Dict[str, Any]]] = None,
+    out_dir: Optional[Path] = None,
+    budget: Optional[QuoteBudget] = None,
+    account_list: Optional[Sequence[Account]] = None,
+) -> QuoteRun:
+    """
+    Одна фаза для всіх акаунтів (``ACCOUNTS``) паралельно: кожен котирує
+    свої маршрути × гаманці власним клієнтом і бюджетом; рядки всіх
+    акаунтів ідуть в один ``candidates.jsonl``/``summary.json``.
+    """
+
+    from .core import accept_pipeline, accounts, binance_client, candidates, guard, metrics
+    from .core.quote_engine import PacedBudget, QuoteBudget, QuoteRun, fan_out, summarise, tasks_from_whitelist
+    from .strategy import selector
+
+    out_dir = out_dir or ANALYZE_DIR
+    routes = routes if routes is not None else getattr(config, "ROUTES_WHITELIST", [])
+    tasks = tasks_from_whitelist(selector.routes_for_phase(routes, phase))
+    if phase == "trade":
+        tasks = selector.select_routes(tasks, region, out_dir)
+    budget = budget or QuoteBudget()
+    account_list = list(account_list or accounts.load_accounts())
+    trading = phase == "trade" and not dry_run
+    sink = candidates.CandidateSink(out_dir, region, phase)
+
+    def run_account(account: Account) -> QuoteRun:
+        lane = accounts.expand_tasks(tasks, account)
+        lane_budget = budget if len(account_list) == 1 else budget.fork()
+        if isinstance(lane_budget, PacedBudget):
+            lane_budget.plan(len(lane))
+
+        def on_outcome(outcome: QuoteOutcome) -> None:
+            if trading:
+                _accept_outcome(outcome, lane_budget)
+            sink.write(candidate_row(outcome, region, phase, account.name))
+
+        try:
+            return fan_out(lane, budget=lane_budget, on_outcome=on_outcome)
+        finally:
+            if trading:
+                guard.default_guard().flush()  # гард цього акаунта
+
+    accept_pipeline.STATS.reset()
+    started = time.perf_counter()
+    try:
+        # гард кожного акаунта засівається свіжою оцінкою його портфеля
+        runs = accounts.run_parallel(account_list, run_account, seed_guard=trading)
+    except BaseException:
+        sink.close()
+        raise
+    if len(runs) == 1:
+        run = next(iter(runs.values()))
+    else:
+        outcomes = [o for name in (a.name for a in account_list) for o in runs[name].outcomes]
+        run = QuoteRun(outcomes, summarise(outcomes, (time.perf_counter() - started) * 1000.0))
+    sink.close(run.summary.as_text())
+    eventlog.emit("phase", region=region, phase=phase, dry_run=bool(dry_run), **dataclasses.asdict(run.summary))
+    if trading:
+        accept_pipeline.STATS.log_histogram()
+    LOGGER.info("server clock: %s", binance_client.default_client().clock.stats())
+    try:
+        metrics.write_textfile()
+    except OSError as exc:
+        LOGGER.warning("metrics export failed: %s", exc)
+    return run
+
+
+def run_window(
+    region: str,
+    dry_run: bool,
+    *,
+    routes: Optional[Sequence[Dict[str, Any]]] = None,
+    out_dir: Optional[Path] = None,
+    now: Optional[datetime] = None,
+    sleep: Callable[[float], None] = time.sleep,
+) -> Dict[str, QuoteRun]:
+    """
+    analyze -> trade в одному процесі: прогрів кешів і HTTP-пулу перед
+    вікном, analyze з початку вікна, trade через ``WINDOW_PHASE_GAP_SEC``.
+    Бюджет котирувань кожної фази розподіляється в часі (``PacedBudget``):
+    analyze — на ``WINDOW_ANALYZE_SEC``, trade — до кінця вікна.
+    """
+
+    from . import daemon
+    from .core.quote_engine import PacedBudget
+
+    now = now or datetime.now(timezone.utc)
+    bounds = scheduler.window_bounds(scheduler.region_window(region), now)
+    start, end = bounds if bounds else (now, now)
+    scheduler.sleep_until(start - timedelta(seconds=_WARMUP_LEAD_SEC), sleep)
+    daemon.warm_up()
+    scheduler.sleep_until(start, sleep)
+
+    trade_at = min(end, start + timedelta(seconds=_PHASE_GAP_SEC))
+    analyze_sec = max(0.0, min(_ANALYZE_SEC, (trade_at - max(now, start)).total_seconds()))
+    runs: Dict[str, QuoteRun] = {}
+    with scheduler.file_lock(f"/tmp/{region}_analyze.lock") as locked:
+        if locked:
+            runs["analyze"] = run_phase(
+                region, "analyze", True, routes, out_dir, PacedBudget(duration_sec=analyze_sec, sleep=sleep)
+            )
+        else:
+            LOGGER.warning("%s/analyze already running, trading on the previous analyze", region)
+    scheduler.sleep_until(trade_at, sleep)
+    trade_sec = max(0.0, (end - max(trade_at, datetime.now(timezone.utc))).total_seconds() - _WINDOW_MARGIN_SEC)
+    with scheduler.file_lock(f"/tmp/{region}_trade.lock") as locked:
+        if not locked:
+            LOGGER.warning("%s/trade already running", region)
+            return runs
+        runs["trade"] = run_phase(
+            region, "trade", dry_run, routes, out_dir, PacedBudget(duration_sec=trade_sec, sleep=sleep)
+        )
+    return runs
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="src.app")
+    parser.add_argument("--region", choices=("asia", "us"), required=True)
+    parser.add_argument("--phase", choices=("analyze", "trade", "window"), required=True)
+    parser.add_argument("--dry-run", type=int, choices=(0, 1), default=int(getattr(config, "DRY_RUN", 1)))
+    parser.add_argument("--no-jitter", action="store_true")
+    parser.add_argument("--profile-startup", action="store_true", help="звіт про імпорти й перші запити у stderr")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    eventlog.install()
+    if args.profile_startup:
+        return profiling.profiled("src.app", _run, args)
+    return _run(args)
+
+
+def _run(args: argparse.Namespace) -> int:
+    if args.phase == "window":
+        bounds = scheduler.window_bounds(scheduler.region_window(args.region))
+        lead = (bounds[0] - datetime.now(timezone.utc)).total_seconds() if bounds else 0.0
+        if lead > _WINDOW_MAX_LEAD_SEC:
+            LOGGER.info("%s: window starts in %.0fs, too early to wait", args.region, lead)
+            return 0
+        with scheduler.file_lock(f"/tmp/{args.region}_window.lock") as locked:
+            if not locked:
+                LOGGER.warning("%s/window already running", args.region)
+                return 0
+            run_window(args.region, bool(args.dry_run))
+        return 0
+    if not scheduler.in_window(scheduler.region_window(args.region)):
+        LOGGER.info("%s: outside market window, nothing to do", args.region)
+        return 0
+    with scheduler.file_lock(f"/tmp/{args.region}_{args.phase}.lock") as locked:
+        if not locked:
+            LOGGER.warning("%s/%s already running", args.region, args.phase)
+            return 0
+        if not args.no_jitter:
+            scheduler.start_jitter()
+        run_phase(args.region, args.phase, bool(args.dry_run))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1 +1,258 @@
+"""Єдиний CLI для ручних викликів і автозапуску."""
 
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from . import daemon
+from .core import eventlog, profiling
+from .core.utils import decimal_from_any
+
+
+def _print(payload: Any) -> None:
+    print(json.dumps(payload, indent=2, ensure_ascii=False, default=str))
+
+
+# Команди info/quote/now/status: (params) -> (код виходу, payload).
+# Виконуються або в демоні (src.daemon), або в цьому процесі.
+def _info(params: Dict[str, Any]) -> Tuple[int, Any]:
+    from .core import convert_api
+
+    from_asset, to_asset = params["from_asset"].upper(), params["to_asset"].upper()
+    route = convert_api.route_exists(from_asset, to_asset)
+    limits = convert_api.limits_for_pair(from_asset, to_asset)
+    payload = {
+        "route": route.description if route else None,
+        "minimum": str(limits.minimum),
+        "maximum": str(limits.maximum),
+        "precision": convert_api.get_asset_precision(from_asset),
+    }
+    return (0 if route else 1), payload
+
+
+def _quote(params: Dict[str, Any]) -> Tuple[int, Any]:
+    from .core import convert_middleware
+
+    quote = convert_middleware.get_quote(
+        params["from_asset"].upper(), params["to_asset"].upper(), decimal_from_any(params["amount"]), params["wallet"]
+    )
+    return (0 if quote else 1), (quote.raw if quote else None)
+
+
+def _now(params: Dict[str, Any]) -> Tuple[int, Any]:
+    from .core import convert_api
+
+    if params.get("dry_run"):
+        return _quote(params)
+    result = convert_api.convert_now(
+        params["from_asset"].upper(),
+        params["to_asset"].upper(),
+        decimal_from_any(params["amount"]),
+        wallet=params["wallet"],
+    )
+    return (0 if result else 1), result
+
+
+def _status(params: Dict[str, Any]) -> Tuple[int, Any]:
+    from .core import convert_api
+
+    return 0, convert_api.order_status(params["order_id"])
+
+
+HANDLERS: Dict[str, Callable[[Dict[str, Any]], Tuple[int, Any]]] = {
+    "info": _info,
+    "quote": _quote,
+    "now": _now,
+    "status": _status,
+}
+
+
+def dispatch(command: str, params: Dict[str, Any]) -> Tuple[int, Any]:
+    return HANDLERS[command](params)
+
+
+def cmd_simple(args: argparse.Namespace) -> int:
+    """Спершу через демон (теплі з'єднання й кеші), інакше — у цьому процесі."""
+
+    params = {k: v for k, v in vars(args).items() if k not in ("func", "command", "no_daemon", "profile_startup")}
+    reply = None if args.no_daemon else daemon.call(args.command, params)
+    if reply is None:
+        reply = dispatch(args.command, params)
+    code, payload = reply
+    _print(payload)
+    return code
+
+
+def cmd_trades(args: argparse.Namespace) -> int:
+    from .core.ledger import Ledger
+
+    since = int((time.time() - args.hours * 3600) * 1000)
+    ledger = Ledger()
+    ledger.sync(since)
+    if args.detailed:
+        ledger.fill_details(since)
+    for row in ledger.query(since):
+        ts = datetime.fromtimestamp(int(row.get("createTime", 0)) / 1000, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        line = (
+            f"{ts} {row.get('orderId')} {row.get('fromAmount')} {row.get('fromAsset')} -> "
+            f"{row.get('toAmount')} {row.get('toAsset')} {row.get('orderStatus', '')}"
+        )
+        if args.detailed and row.get("detail"):
+            line += f" ratio={row['detail'].get('ratio', row.get('ratio'))}"
+        print(line)
+    return 0
+
+
+def cmd_health(args: argparse.Namespace) -> int:
+    """Стан circuit breaker пар; ``--reset`` скидає вказані пари (або всі)."""
+
+    from .core import pair_health
+
+    health = pair_health.default_health()
+    pairs = [p.upper() for p in args.pairs]
+    if args.reset:
+        _print({"reset": health.reset(pairs or None)})
+        return 0
+    state = health.state()
+    _print({k: v for k, v in state.items() if not pairs or k in pairs})
+    return 0
+
+
+def cmd_rebalance(args: argparse.Namespace) -> int:
+    """План ребалансування до ``--target`` (або ``REBALANCE_TARGETS``); ``--dry-run 0`` — виконати."""
+
+    from .core import ensure_invested
+
+    targets = None
+    if args.target:
+        targets = {}
+        for item in args.target:
+            asset, _, weight = item.partition("=")
+            targets[asset.upper()] = float(weight)
+    report = ensure_invested.ensure_invested(targets, args.wallet, dry_run=bool(args.dry_run))
+    _print(report)
+    return 1 if any("error" in r for r in report.get("results", [])) else 0
+
+
+def _since_ms(value: Optional[str]) -> Optional[int]:
+    """``7d``/``12h``/``30m`` тому або ISO-дата (UTC)."""
+
+    if not value:
+        return None
+    units = {"d": 86400, "h": 3600, "m": 60}
+    if value[-1:] in units and value[:-1].replace(".", "", 1).isdigit():
+        return int((time.time() - float(value[:-1]) * units[value[-1]]) * 1000)
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp() * 1000)
+
+
+def cmd_events(args: argparse.Namespace) -> int:
+    """Події структурованого журналу (``core/eventlog.py``) за індексом; один JSON на рядок."""
+
+    filters = {
+        "kind": args.kind,
+        "pair": args.pair,
+        "code": args.code,
+        "quote_id": args.quote_id,
+        "order_id": args.order_id,
+        "since_ms": _since_ms(args.since),
+        "until_ms": _since_ms(args.until),
+    }
+    filters = {k: v for k, v in filters.items() if v is not None}
+    if args.explain:
+        _print(eventlog.explain(args.dir, **filters))
+        return 0
+    for event in eventlog.query(args.dir, limit=args.limit, **filters):
+        print(json.dumps(event, ensure_ascii=False))
+    return 0
+
+
+def cmd_run(args: argparse.Namespace) -> int:
+    from . import app
+
+    argv = ["--region", args.region, "--phase", args.phase, "--dry-run", str(args.dry_run)]
+    return app.main(argv)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="src.cli")
+    parser.add_argument("--no-daemon", action="store_true", help="не звертатися до src.daemon")
+    parser.add_argument("--profile-startup", action="store_true", help="звіт про імпорти й перші запити у stderr")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("info")
+    p.add_argument("from_asset")
+    p.add_argument("to_asset")
+    p.set_defaults(func=cmd_simple)
+
+    for name in ("quote", "now"):
+        p = sub.add_parser(name)
+        p.add_argument("from_asset")
+        p.add_argument("to_asset")
+        p.add_argument("amount")
+        p.add_argument("--wallet", type=str.upper, choices=("SPOT", "FUNDING"), default="SPOT")
+        if name == "now":
+            p.add_argument("--dry-run", type=int, choices=(0, 1), default=0)
+        p.set_defaults(func=cmd_simple)
+
+    p = sub.add_parser("status")
+    p.add_argument("order_id")
+    p.set_defaults(func=cmd_simple)
+
+    p = sub.add_parser("trades")
+    p.add_argument("--hours", type=float, default=24)
+    p.add_argument("--detailed", action="store_true")
+    p.set_defaults(func=cmd_trades)
+
+    p = sub.add_parser("health")
+    p.add_argument("pairs", nargs="*", metavar="FROM/TO")
+    p.add_argument("--reset", action="store_true", help="скинути breaker (усіх пар, якщо не вказано)")
+    p.set_defaults(func=cmd_health)
+
+    p = sub.add_parser("rebalance")
+    p.add_argument("--target", action="append", metavar="ASSET=WEIGHT", help="цільова вага (можна кілька разів)")
+    p.add_argument("--wallet", type=str.upper, choices=("SPOT", "FUNDING"), default="SPOT")
+    p.add_argument("--dry-run", type=int, choices=(0, 1), default=1)
+    p.set_defaults(func=cmd_rebalance)
+
+    p = sub.add_parser("events")
+    p.add_argument("--pair", metavar="FROM/TO", help="BTC/USDT або BTC->USDT")
+    p.add_argument("--code", type=int, help="код помилки, напр. 345231")
+    p.add_argument("--quote-id")
+    p.add_argument("--order-id")
+    p.add_argument("--kind", choices=("http", "log", "phase"))
+    p.add_argument("--since", help="7d / 12h / 30m тому або ISO-дата (UTC)")
+    p.add_argument("--until", help="як --since")
+    p.add_argument("--limit", type=int, default=1000)
+    p.add_argument("--dir", default=None, help="каталог журналу (EVENT_LOG_DIR)")
+    p.add_argument("--explain", action="store_true", help="план запиту SQLite замість подій")
+    p.set_defaults(func=cmd_events)
+
+    p = sub.add_parser("run")
+    p.add_argument("--region", choices=("asia", "us"), required=True)
+    p.add_argument("--phase", choices=("analyze", "trade", "window"), required=True)
+    p.add_argument("--dry-run", type=int, choices=(0, 1), default=1)
+    p.set_defaults(func=cmd_run)
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    args = build_parser().parse_args(argv)
+    if args.func is not cmd_events:
+        eventlog.install()
+    if args.profile_startup:
+        return int(profiling.profiled("src.cli", args.func, args) or 0)
+    return int(args.func(args) or 0)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
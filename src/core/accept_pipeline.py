@@ -0,0 +1,234 @@
+"""
+Конвеєр getQuote -> acceptQuote з урахуванням TTL котирування.
+
+- accept відправляється одразу після отримання котирування;
+- якщо до ``expireTime`` лишається менше ``safety_ms``, паралельно вже
+  летить "тіньове" котирування — на 345231 воно підхоплюється без
+  додаткового round trip. Воно списується з ``budget`` прогону
+  (``QuoteBudget.charge``), а невикористане перед виходом з ``run``
+  скасовується або дочікується й рахується в ``convert_shadow_quotes_total``;
+- для кожного accept фіксуються gap (отримання -> відправка), залишок TTL
+  і латентність; ``AcceptStats.log_histogram`` пише гістограму в лог;
+- з ``guard`` кожне котирування проходить ``RiskGuard.enforce`` перед accept,
+  а прийняте — ``RiskGuard.on_fill``.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import pairwise
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from . import binance_client, metrics
+from .convert_errors import _extract_code
+from .utils import bind_context
+
+if TYPE_CHECKING:
+    from .convert_api import ConvertQuote
+    from .guard import RiskGuard
+    from .quote_engine import QuoteBudget
+
+LOGGER = logging.getLogger(__name__)
+
+EXPIRED_CODE = 345231
+# межі кошиків залишку TTL (мс) для гістограми
+TTL_BUCKETS_MS: Tuple[int, ...] = (0, 1000, 2000, 5000, 10000)
+
+_shadow_pool: ThreadPoolExecutor | None = None
+_shadow_lock = threading.Lock()
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _shadow_pool
+    if _shadow_pool is None:
+        with _shadow_lock:
+            if _shadow_pool is None:
+                _shadow_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="shadow-quote")
+    return _shadow_pool
+
+
+class AcceptStats:
+    """Накопичує (залишок TTL, gap, латентність accept, результат) за прогін."""
+
+    def __init__(self) -> None:
+        self._rows: List[Tuple[Optional[int], float, float, str]] = []
+        self._lock = threading.Lock()
+
+    def record(self, remaining_ms: Optional[int], gap_ms: float, latency_ms: float, outcome: str) -> None:
+        metrics.observe("convert_quote_accept_gap_ms", gap_ms, outcome=outcome)
+        if remaining_ms is not None:
+            metrics.observe("convert_quote_ttl_remaining_ms", remaining_ms, metrics.TTL_BUCKETS_MS, outcome=outcome)
+        with self._lock:
+            self._rows.append((remaining_ms, gap_ms, latency_ms, outcome))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._rows.clear()
+
+    def histogram(self) -> List[Dict[str, Any]]:
+        """Кошики за залишком TTL: кількість, середні gap/латентність, кількість 345231."""
+
+        with self._lock:
+            rows = list(self._rows)
+        edges = TTL_BUCKETS_MS
+        labels = [f"<{edges[0]}ms"] + [f"{a}-{b}ms" for a, b in pairwise(edges)] + [f">={edges[-1]}ms"]
+        buckets: List[List[Tuple[Optional[int], float, float, str]]] = [[] for _ in labels]
+        for row in rows:
+            remaining = row[0]
+            if remaining is None:
+                idx = len(labels) - 1
+            else:
+                idx = sum(1 for edge in edges if remaining >= edge)
+            buckets[idx].append(row)
+        out = []
+        for label, items in zip(labels, buckets, strict=True):
+            if not items:
+                continue
+            out.append(
+                {
+                    "ttl": label,
+                    "count": len(items),
+                    "gap_ms": sum(r[1] for r in items) / len(items),
+                    "accept_ms": sum(r[2] for r in items) / len(items),
+                    "expired": sum(1 for r in items if r[3] == "expired"),
+                }
+            )
+        return out
+
+    def log_histogram(self, logger: logging.Logger = LOGGER) -> None:
+        for row in self.histogram():
+            logger.info(
+                "accept latency ttl=%-12s n=%-4d gap=%.1fms accept=%.1fms expired=%d",
+                row["ttl"],
+                row["count"],
+                row["gap_ms"],
+                row["accept_ms"],
+                row["expired"],
+            )
+
+
+STATS = AcceptStats()
+
+
+class QuotePipeline:
+    """
+    Один перехід from -> to: ``fetch()`` дає свіже котирування,
+    ``accept(quote_id)`` приймає його. Помилки, крім 345231, пробрасуються.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], Optional["ConvertQuote"]],
+        accept: Callable[[str], Optional[Dict[str, Any]]],
+        *,
+        safety_ms: int,
+        max_requotes: int = 2,
+        stats: AcceptStats = STATS,
+        label: str = "",
+        guard: Optional["RiskGuard"] = None,
+        budget: Optional["QuoteBudget"] = None,
+    ) -> None:
+        self._fetch_fn = fetch
+        self._accept_fn = accept
+        self.safety_ms = int(abs(safety_ms))
+        self.max_requotes = max(0, int(max_requotes))
+        self.stats = stats
+        self.label = label
+        self.guard = guard
+        self.budget = budget
+        self._shadow: Optional[Future] = None
+        self.fetches = 0
+
+    def _fetch(self) -> Tuple["ConvertQuote", float]:
+        self.fetches += 1
+        quote = self._fetch_fn()
+        if not quote:
+            raise RuntimeError(f"quote failed for {self.label}")
+        return quote, time.monotonic()
+
+    def _next_quote(self) -> Tuple["ConvertQuote", float]:
+        shadow, self._shadow = self._shadow, None
+        if shadow is not None:
+            try:
+                current = shadow.result()
+            except Exception:
+                metrics.inc("convert_shadow_quotes_total", result="error")
+                raise
+            metrics.inc("convert_shadow_quotes_total", result="used")
+            return current
+        return self._fetch()
+
+    def _settle_shadow(self) -> None:
+        """Невикористане тіньове котирування: скасувати, а якщо вже летить — дочекатися й врахувати."""
+
+        shadow, self._shadow = self._shadow, None
+        if shadow is None:
+            return
+        if shadow.cancel():
+            metrics.inc("convert_shadow_quotes_total", result="cancelled")
+            return
+        try:
+            shadow.result()
+        except Exception as exc:
+            metrics.inc("convert_shadow_quotes_total", result="error")
+            LOGGER.warning("shadow quote for %s failed: %s", self.label, exc)
+        else:
+            metrics.inc("convert_shadow_quotes_total", result="unused")
+
+    @staticmethod
+    def _remaining_ms(quote: "ConvertQuote") -> Optional[int]:
+        if not quote.expire_time_ms:
+            return None
+        return quote.expire_time_ms - binance_client.server_now_ms()
+
+    def run(self, quote: Optional["ConvertQuote"] = None) -> Optional[Dict[str, Any]]:
+        try:
+            return self._run(quote)
+        finally:
+            self._settle_shadow()
+
+    def _run(self, quote: Optional["ConvertQuote"]) -> Optional[Dict[str, Any]]:
+        current = (quote, time.monotonic()) if quote is not None else self._fetch()
+        for attempt in range(self.max_requotes + 1):
+            quote, arrived = current
+            remaining = self._remaining_ms(quote)
+            if (
+                remaining is not None
+                and remaining < self.safety_ms
+                and self._shadow is None
+                and (self.budget is None or self.budget.charge())
+            ):
+                self._shadow = _pool().submit(bind_context(self._fetch))
+            if remaining is not None and remaining <= 0:
+                self.stats.record(remaining, 0.0, 0.0, "expired")
+                LOGGER.warning("Quote %s expired before accept (%s)", quote.quote_id, self.label)
+                current = self._next_quote()
+                continue
+
+            if self.guard is not None:
+                self.guard.enforce(quote)
+            sent = time.monotonic()
+            try:
+                result = self._accept_fn(quote.quote_id)
+            except Exception as exc:
+                latency_ms = (time.monotonic() - sent) * 1000.0
+                if _extract_code(exc) != EXPIRED_CODE:
+                    self.stats.record(remaining, (sent - arrived) * 1000.0, latency_ms, "error")
+                    raise
+                self.stats.record(remaining, (sent - arrived) * 1000.0, latency_ms, "expired")
+                if attempt >= self.max_requotes:
+                    raise RuntimeError(f"quote expired after {attempt} re-quotes ({self.label})") from exc
+                LOGGER.warning("acceptQuote says expired (345231), switching to fresh quote for %s", self.label)
+                current = self._next_quote()
+                continue
+
+            self.stats.record(remaining, (sent - arrived) * 1000.0, (time.monotonic() - sent) * 1000.0, "ok")
+            if isinstance(result, dict):
+                result.setdefault("quote", quote.raw)
+                if self.guard is not None:
+                    self.guard.on_fill(quote.from_asset, quote.to_asset, result)
+            return result
+        raise RuntimeError(f"fresh quote already expired ({self.label})")
@@ -0,0 +1,186 @@
+"""
+Кілька акаунтів (субакаунтів) і гаманців в одному ринковому вікні.
+
+Кожен акаунт має власний ``BinanceClient`` — підписувач (ключі), токен-бакет
+лімітера й пул з'єднань — власний знімок залишків ``BalanceService`` і
+власний ризик-гард ``RiskGuard``. ``activate`` робить їх поточними через
+contextvars, тож увесь код поверх ``binance_client.get/post``,
+``balance.default_service`` і ``guard.default_guard`` (convert_api,
+middleware, fan-out) працює від імені акаунта без зміни сигнатур.
+``run_parallel`` запускає роботу всіх акаунтів одночасно.
+
+``ACCOUNTS`` у ``config_dev3``::
+
+    ACCOUNTS = {
+        "main": {"wallets": ["SPOT", "FUNDING"]},                  # ключі з BINANCE_API_KEY/SECRET
+        "sub1": {"api_key": "...", "secret_key": "...", "wallets": ["SPOT"], "qps": 5},
+    }
+
+Без ``ACCOUNTS`` — один акаунт ``main`` з гаманцями з ``ROUTES_WHITELIST``.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, TypeVar
+
+import config_dev3 as config
+
+from . import balance, binance_client, guard
+from .utils import bind_context
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_NAME = "main"
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class Account:
+    name: str
+    api_key: Optional[str] = None  # None -> ключі й спільний клієнт процесу
+    secret_key: Optional[str] = None
+    wallets: Tuple[str, ...] = ()  # () -> гаманець кожного маршруту з whitelist
+    qps: Optional[float] = None
+    burst: Optional[float] = None
+
+    @property
+    def uses_default_client(self) -> bool:
+        return self.api_key is None
+
+
+def load_accounts(raw: Optional[Mapping[str, Mapping[str, Any]]] = None) -> List[Account]:
+    """``ACCOUNTS`` з конфігу -> список; без нього — один акаунт за замовчуванням."""
+
+    raw = raw if raw is not None else getattr(config, "ACCOUNTS", None)
+    if not raw:
+        return [Account(DEFAULT_NAME)]
+    out = []
+    for name, spec in raw.items():
+        spec = spec or {}
+        out.append(
+            Account(
+                name=str(name),
+                api_key=spec.get("api_key"),
+                secret_key=spec.get("secret_key"),
+                wallets=tuple(dict.fromkeys(str(w).upper() for w in spec.get("wallets") or ())),
+                qps=float(spec["qps"]) if spec.get("qps") else None,
+                burst=float(spec["burst"]) if spec.get("burst") else None,
+            )
+        )
+    return out
+
+
+@dataclass
+class AccountSession:
+    client: binance_client.BinanceClient
+    balances: balance.BalanceService
+    guard: guard.RiskGuard
+
+
+_sessions: Dict[str, AccountSession] = {}
+_sessions_lock = threading.Lock()
+_current: ContextVar[Optional[Account]] = ContextVar("account", default=None)
+
+
+def session_for(account: Account) -> AccountSession:
+    """Клієнт і знімок залишків акаунта; створюються один раз на процес."""
+
+    if account.uses_default_client:
+        return AccountSession(binance_client.default_client(), balance.default_service(), guard.default_guard())
+    with _sessions_lock:
+        session = _sessions.get(account.name)
+        if session is None:
+            kwargs: Dict[str, Any] = {}
+            if account.qps:
+                burst = account.burst or account.qps * 2
+                kwargs["limiter"] = binance_client.AdaptiveRateLimiter(account.qps, burst, max_qps=account.qps * 2)
+            client = binance_client.BinanceClient(account.api_key, account.secret_key or "", **kwargs)
+            session = _sessions[account.name] = AccountSession(
+                client, balance.BalanceService(), guard.guard_for(account.name)
+            )
+    return session
+
+
+@contextmanager
+def activate(account: Account, *, seed_guard: bool = False) -> Iterator[AccountSession]:
+    """
+    Робить клієнт, залишки й гард ``account`` поточними для цього контексту.
+
+    ``seed_guard`` — засіяти гард акаунта свіжою оцінкою його портфеля
+    (база просідання для фази trade).
+    """
+
+    session = session_for(account)
+    token = _current.set(account)
+    try:
+        with binance_client.use_client(session.client), balance.use_service(session.balances):
+            with guard.use_guard(session.guard):
+                if seed_guard:
+                    session.guard.seed_from_portfolio(force=True)
+                yield session
+    finally:
+        _current.reset(token)
+
+
+def current_account() -> Optional[Account]:
+    return _current.get()
+
+
+def scoped_wallet(wallet: str) -> str:
+    """Гаманець з префіксом акаунта (``sub1:SPOT``) — для ключів, спільних між акаунтами (дедуп)."""
+
+    wallet = (wallet or "SPOT").upper()
+    account = _current.get()
+    if account is None or account.uses_default_client:
+        return wallet
+    return f"{account.name}:{wallet}"
+
+
+def expand_tasks(tasks: Sequence[T], account: Account) -> List[T]:
+    """Задачі акаунта: кожен маршрут — на кожному з ``account.wallets`` (або як у whitelist)."""
+
+    if not account.wallets:
+        return list(tasks)
+    return [dataclasses.replace(task, wallet=wallet) for task in tasks for wallet in account.wallets]
+
+
+def run_parallel(accounts: Sequence[Account], fn: Callable[[Account], T], *, seed_guard: bool = False) -> Dict[str, T]:
+    """
+    ``fn(account)`` для всіх акаунтів паралельно, кожен — у своєму контексті
+    (``activate``). Помилка одного акаунта не зупиняє інші; перша з них
+    пробрасується в кінці.
+    """
+
+    def run(account: Account) -> T:
+        with activate(account, seed_guard=seed_guard):
+            return fn(account)
+
+    if len(accounts) == 1:
+        return {accounts[0].name: run(accounts[0])}
+    results: Dict[str, T] = {}
+    errors: List[BaseException] = []
+    with ThreadPoolExecutor(max_workers=len(accounts), thread_name_prefix="account") as pool:
+        futures = {account.name: pool.submit(bind_context(run), account) for account in accounts}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as exc:
+                LOGGER.error("account %s failed: %s", name, exc)
+                errors.append(exc)
+    if errors:
+        raise errors[0]
+    return results
+
+
+def close_sessions() -> None:
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.client.close()
+        _sessions.clear()
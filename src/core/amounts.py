@@ -1 +1,173 @@
+"""
+Сума Convert з фіксованою крапкою: ціле число одиниць 1e-8.
 
+``Amount`` — slotted-об'єкт з одним ``int``; розбір рядка біржі —
+``str.partition`` + ``int`` без ``Decimal``; зайві знаки відкидаються
+(``ROUND_DOWN``, до нуля) — так само, як ``utils.norm8``. Додавання,
+віднімання й порівняння — цілочисельні. Порівняння з ``Decimal``/``int``
+підтримуються, тож ``Amount`` можна підставляти туди, де раніше був
+нормалізований ``Decimal``.
+"""
+
+from __future__ import annotations
+
+from decimal import ROUND_DOWN, Decimal, InvalidOperation
+from fractions import Fraction
+from typing import Any
+
+SCALE = 8
+UNIT = 10**SCALE
+
+
+def _units_from_str(text: str) -> int:
+    s = text.strip()
+    if not s:
+        return 0
+    neg = s[0] == "-"
+    if s[0] in "+-":
+        s = s[1:]
+    whole, dot, frac = s.partition(".")
+    if (whole or frac) and (not whole or whole.isdigit()) and (not frac or frac.isdigit()):
+        units = int(whole or "0") * UNIT + (int(frac[:SCALE].ljust(SCALE, "0")) if frac else 0)
+    else:
+        # експонента ("1e-05") тощо — повільний, але точний шлях
+        try:
+            value = Decimal(s)
+        except (InvalidOperation, ValueError):
+            raise ValueError(f"Amount: cannot parse {text!r}") from None
+        if not value.is_finite():
+            raise ValueError(f"Amount: cannot parse {text!r}")
+        units = int(value.scaleb(SCALE).to_integral_value(rounding=ROUND_DOWN))
+    return -units if neg else units
+
+
+class Amount:
+    """Сума з кроком 1e-8 (може бути від'ємною); незмінна."""
+
+    __slots__ = ("units",)
+
+    def __init__(self, units: int = 0) -> None:
+        self.units = units
+
+    # ----- побудова -----
+    @classmethod
+    def parse(cls, value: Any) -> "Amount":
+        """str|int|float|Decimal|Amount|None -> Amount (ROUND_DOWN до 8 знаків; None -> 0)."""
+
+        if isinstance(value, Amount):
+            return value
+        if isinstance(value, str):
+            return cls(_units_from_str(value))
+        if value is None:
+            return cls(0)
+        if isinstance(value, bool):
+            raise ValueError(f"Amount: cannot parse {value!r}")
+        if isinstance(value, int):
+            return cls(value * UNIT)
+        if isinstance(value, Decimal):
+            if not value.is_finite():
+                raise ValueError(f"Amount: cannot parse {value!r}")
+            return cls(int(value.scaleb(SCALE).to_integral_value(rounding=ROUND_DOWN)))
+        return cls(_units_from_str(str(value)))
+
+    # ----- перетворення -----
+    def __str__(self) -> str:
+        q, r = divmod(abs(self.units), UNIT)
+        return f"{'-' if self.units < 0 else ''}{q}.{r:08d}"
+
+    def __repr__(self) -> str:
+        return f"Amount('{self}')"
+
+    def to_decimal(self) -> Decimal:
+        return Decimal(self.units).scaleb(-SCALE)
+
+    def __float__(self) -> float:
+        return self.units / UNIT
+
+    def __bool__(self) -> bool:
+        return self.units != 0
+
+    def __hash__(self) -> int:
+        # узгоджено з hash(Decimal)/hash(int) для рівних значень
+        return hash(Fraction(self.units, UNIT))
+
+    # ----- порівняння -----
+    def _cmp_key(self, other: Any):
+        if isinstance(other, Amount):
+            return self.units, other.units
+        if isinstance(other, int) and not isinstance(other, bool):
+            return self.units, other * UNIT
+        if isinstance(other, Decimal):
+            return self.to_decimal(), other
+        return None
+
+    def __eq__(self, other: Any) -> bool:
+        pair = self._cmp_key(other)
+        return NotImplemented if pair is None else pair[0] == pair[1]
+
+    def __lt__(self, other: Any) -> bool:
+        pair = self._cmp_key(other)
+        return NotImplemented if pair is None else pair[0] < pair[1]
+
+    def __le__(self, other: Any) -> bool:
+        pair = self._cmp_key(other)
+        return NotImplemented if pair is None else pair[0] <= pair[1]
+
+    def __gt__(self, other: Any) -> bool:
+        pair = self._cmp_key(other)
+        return NotImplemented if pair is None else pair[0] > pair[1]
+
+    def __ge__(self, other: Any) -> bool:
+        pair = self._cmp_key(other)
+        return NotImplemented if pair is None else pair[0] >= pair[1]
+
+    # ----- арифметика -----
+    def __add__(self, other: Any) -> "Amount":
+        if isinstance(other, Amount):
+            return Amount(self.units + other.units)
+        if isinstance(other, int) and not isinstance(other, bool):
+            return Amount(self.units + other * UNIT)
+        return NotImplemented
+
+    __radd__ = __add__  # sum([...]) починає з 0
+
+    def __sub__(self, other: Any) -> "Amount":
+        if isinstance(other, Amount):
+            return Amount(self.units - other.units)
+        if isinstance(other, int) and not isinstance(other, bool):
+            return Amount(self.units - other * UNIT)
+        return NotImplemented
+
+    def __neg__(self) -> "Amount":
+        return Amount(-self.units)
+
+    def __abs__(self) -> "Amount":
+        return Amount(abs(self.units))
+
+    def __mul__(self, other: Any) -> "Amount":
+        """``Amount * int`` — точно; ``Amount * ratio`` (Decimal/str) — з ROUND_DOWN."""
+
+        if isinstance(other, int) and not isinstance(other, bool):
+            return Amount(self.units * other)
+        if isinstance(other, (Decimal, str)):
+            ratio = Fraction(Decimal(other)) if isinstance(other, str) else Fraction(other)
+            product = self.units * ratio
+            return Amount(int(product))  # int() відкидає дробову частину до нуля
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other: Any):
+        """``Amount / int`` -> Amount (ROUND_DOWN); ``Amount / Amount|Decimal`` -> Decimal."""
+
+        if isinstance(other, int) and not isinstance(other, bool):
+            q = abs(self.units) // abs(other)
+            return Amount(q if (self.units < 0) == (other < 0) else -q)
+        if isinstance(other, Amount):
+            return Decimal(self.units) / Decimal(other.units)
+        if isinstance(other, Decimal):
+            return self.to_decimal() / other
+        return NotImplemented
+
+
+ZERO = Amount(0)
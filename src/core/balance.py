@@ -1 +1,170 @@
+"""
+Знімок залишків SPOT/FUNDING з коротким TTL.
 
+- обидва гаманці читаються паралельно одним ``refresh``;
+- виконані конвертації (``execute_route``) застосовуються до знімка
+  локально — без повторного запиту після кожного accept;
+- повторна синхронізація лише після TTL або якщо локальний облік
+  розійшовся з реальністю (від'ємний залишок, неповний результат, ``invalidate``).
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Iterator, Mapping, Optional, Sequence
+
+import config_dev3 as config
+
+from .utils import DECIMAL_ZERO, bind_context, decimal_from_any
+
+LOGGER = logging.getLogger(__name__)
+
+WALLETS = ("SPOT", "FUNDING")
+_BALANCE_TTL_SEC: float = float(getattr(config, "BALANCE_TTL_SEC", 30))
+
+Balances = Dict[str, Decimal]
+
+
+def _rows_to_balances(rows: Iterable[Mapping[str, Any]]) -> Balances:
+    out: Balances = {}
+    for row in rows:
+        free = decimal_from_any(row.get("free"))
+        if free > DECIMAL_ZERO:
+            out[str(row.get("asset", "")).upper()] = free
+    return out
+
+
+def fetch_spot() -> Balances:
+    from . import binance_client
+
+    data = binance_client.get("/api/v3/account", {"omitZeroBalances": "true"}, signed=True) or {}
+    return _rows_to_balances(data.get("balances") or [])
+
+
+def fetch_funding() -> Balances:
+    from . import binance_client
+
+    return _rows_to_balances(binance_client.post("/sapi/v1/asset/get-funding-asset", {}, signed=True) or [])
+
+
+class BalanceService:
+    """Кешований знімок ``{wallet: {asset: free}}``; потокобезпечний."""
+
+    def __init__(
+        self,
+        fetchers: Optional[Mapping[str, Callable[[], Balances]]] = None,
+        ttl_sec: float = _BALANCE_TTL_SEC,
+    ) -> None:
+        self.fetchers = dict(fetchers or {"SPOT": fetch_spot, "FUNDING": fetch_funding})
+        self.ttl_sec = float(ttl_sec)
+        self._snapshot: Dict[str, Balances] = {}
+        self._fetched_at = 0.0
+        self._stale = True
+        self._lock = threading.RLock()
+        self.refreshes = 0
+
+    @property
+    def fresh(self) -> bool:
+        return not self._stale and time.monotonic() - self._fetched_at < self.ttl_sec
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._stale = True
+
+    def refresh(self) -> Dict[str, Balances]:
+        """Паралельне читання всіх гаманців у новий знімок."""
+
+        with ThreadPoolExecutor(max_workers=len(self.fetchers), thread_name_prefix="balance") as pool:
+            futures = {wallet: pool.submit(bind_context(fn)) for wallet, fn in self.fetchers.items()}
+            snapshot = {wallet: dict(fut.result()) for wallet, fut in futures.items()}
+        with self._lock:
+            self._snapshot = snapshot
+            self._fetched_at = time.monotonic()
+            self._stale = False
+            self.refreshes += 1
+        return snapshot
+
+    def snapshot(self, force: bool = False) -> Dict[str, Balances]:
+        with self._lock:
+            if not force and self.fresh:
+                return {w: dict(b) for w, b in self._snapshot.items()}
+        snapshot = self.refresh()
+        return {w: dict(b) for w, b in snapshot.items()}
+
+    def get(self, asset: str, wallet: str = "SPOT") -> Decimal:
+        return self.snapshot().get(wallet.upper(), {}).get(asset.upper(), DECIMAL_ZERO)
+
+    def apply(self, from_asset: str, to_asset: str, from_amount: Any, to_amount: Any, wallet: str = "SPOT") -> None:
+        """Локально списує ``from_amount`` і зараховує ``to_amount``."""
+
+        spent, got = decimal_from_any(from_amount), decimal_from_any(to_amount)
+        with self._lock:
+            if not self._snapshot:
+                return
+            if spent <= DECIMAL_ZERO or got <= DECIMAL_ZERO:
+                LOGGER.info("balance: incomplete convert result %s->%s, resync on next read", from_asset, to_asset)
+                self._stale = True
+                return
+            book = self._snapshot.setdefault(wallet.upper(), {})
+            left = book.get(from_asset.upper(), DECIMAL_ZERO) - spent
+            if left < DECIMAL_ZERO:
+                LOGGER.info("balance drift on %s %s (%s), resync on next read", wallet, from_asset, left)
+                self._stale = True
+            book[from_asset.upper()] = max(left, DECIMAL_ZERO)
+            book[to_asset.upper()] = book.get(to_asset.upper(), DECIMAL_ZERO) + got
+
+    def apply_route(
+        self, steps: Sequence[Any], results: Sequence[Optional[Mapping[str, Any]]], wallet: str = "SPOT"
+    ) -> None:
+        """Застосовує результати ``execute_route`` (по одному на крок маршруту)."""
+
+        if len(results) != len(steps):
+            self.invalidate()  # неповний маршрут: застосовуємо виконані кроки, решту дасть resync
+        for step, result in zip(steps, results, strict=False):
+            quote = (result or {}).get("quote") or {}
+            self.apply(
+                step.from_asset,
+                step.to_asset,
+                quote.get("fromAmount"),
+                quote.get("toAmount") or quote.get("toAmountExpected"),
+                wallet,
+            )
+
+
+_default_service: Optional[BalanceService] = None
+_default_lock = threading.Lock()
+# знімок активного акаунта (core/accounts.py)
+_context_service: ContextVar[Optional[BalanceService]] = ContextVar("balance_service", default=None)
+
+
+def default_service() -> BalanceService:
+    service = _context_service.get()
+    if service is not None:
+        return service
+    global _default_service
+    if _default_service is None:
+        with _default_lock:
+            if _default_service is None:
+                _default_service = BalanceService()
+    return _default_service
+
+
+def set_default_service(service: Optional[BalanceService]) -> None:
+    global _default_service
+    with _default_lock:
+        _default_service = service
+
+
+@contextmanager
+def use_service(service: BalanceService) -> Iterator[BalanceService]:
+    token = _context_service.set(service)
+    try:
+        yield service
+    finally:
+        _context_service.reset(token)
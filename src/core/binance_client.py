@@ -1 +1,568 @@
+"""
+HTTP-клієнт Binance: один пул keep-alive з'єднань, HMAC-підпис,
+адаптивний токен-бакет за заголовками used-weight/order-count,
+зсув локального годинника відносно серверного, ретраї на -1021
+та 429/-1003, кеш exchangeInfo.
+"""
 
+from __future__ import annotations
+
+import hashlib
+import hmac
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Mapping, Optional, Tuple
+from urllib.parse import urlencode
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+
+import config_dev3 as config
+
+from . import eventlog, metrics, profiling, replay
+from .utils import rand_jitter
+
+LOGGER = logging.getLogger(__name__)
+
+BASE_URL: str = getattr(config, "BASE", "https://api.binance.com")
+TIMEOUT: float = float(getattr(config, "TIMEOUT", 10))
+RECV_WINDOW_MS: int = int(getattr(config, "RECV_WINDOW_MS", 5000))
+
+_QPS: float = float(getattr(config, "QPS", 5))
+_BURST: float = float(getattr(config, "BURST", 10))
+_QPS_MAX: float = float(getattr(config, "QPS_MAX", _QPS * 2))
+_POOL_SIZE: int = int(getattr(config, "HTTP_POOL_SIZE", 16))
+_RETRY_MAX: int = int(getattr(config, "HTTP_RETRY_MAX", 4))
+_EXCHANGEINFO_TTL_SEC: float = float(getattr(config, "EXCHANGEINFO_TTL_SEC", 3600))
+_CLOCK_SYNC: bool = bool(getattr(config, "CLOCK_SYNC", 1))
+_CLOCK_REFRESH_SEC: float = float(getattr(config, "CLOCK_REFRESH_SEC", 60))
+
+# заголовок -> (ліміт, довжина вікна в секундах)
+RATE_LIMIT_HEADERS: Dict[str, Tuple[int, int]] = {
+    "x-mbx-used-weight-1m": (6000, 60),
+    "x-sapi-used-ip-weight-1m": (12000, 60),
+    "x-sapi-used-uid-weight-1m": (180000, 60),
+    "x-mbx-order-count-10s": (100, 10),
+    "x-mbx-order-count-1d": (200000, 86400),
+}
+RATE_LIMIT_HEADERS.update(getattr(config, "RATE_LIMIT_HEADERS", {}) or {})
+
+# Коди, після яких чекаємо з експоненційним backoff
+_BACKOFF_STATUS = {418, 429}
+_BACKOFF_CODES = {-1003}
+_TIMESTAMP_CODE = -1021
+
+
+class AdaptiveRateLimiter:
+    """
+    Токен-бакет (QPS/BURST), швидкість якого підлаштовується під заголовки
+    використаної ваги та кількості ордерів з відповідей біржі.
+
+    Для кожного лічильника рахуємо залишок у поточному вікні, ділимо на
+    середню вартість запиту та час до кінця вікна — це і є допустима
+    швидкість. Береться мінімум по всіх лічильниках у межах [min_qps, max_qps].
+    Якщо залишок вичерпано — блокуємо до кінця вікна.
+    """
+
+    def __init__(
+        self,
+        qps: float = _QPS,
+        burst: float = _BURST,
+        *,
+        max_qps: float | None = None,
+        min_qps: float = 0.1,
+        safety: float = 0.1,
+        limits: Mapping[str, Tuple[int, int]] | None = None,
+    ) -> None:
+        self._base_rate = max(float(qps), min_qps)
+        self._max_rate = max(float(max_qps if max_qps is not None else qps), self._base_rate)
+        self._min_rate = float(min_qps)
+        self._capacity = max(1.0, float(burst))
+        self._safety = float(safety)
+        self._limits = dict(limits if limits is not None else RATE_LIMIT_HEADERS)
+        self._rate = self._base_rate
+        self._tokens = self._capacity
+        self._stamp = time.monotonic()
+        self._blocked_until = 0.0
+        self._usage: Dict[str, Tuple[int, int]] = {}
+        self._cost: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    @property
+    def blocked_for(self) -> float:
+        return max(0.0, self._blocked_until - time.monotonic())
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._stamp
+        if elapsed > 0:
+            self._tokens = min(self._capacity, self._tokens + elapsed * self._rate)
+            self._stamp = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Блокує до появи токена; повертає сумарний час очікування (с)."""
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._blocked_until > now:
+                    delay = self._blocked_until - now
+                elif self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                else:
+                    delay = (tokens - self._tokens) / self._rate
+            time.sleep(delay)
+            waited += delay
+
+    def penalise(self, seconds: float) -> None:
+        """Повністю зупиняє видачу токенів на ``seconds`` секунд (429/418/-1003)."""
+
+        with self._lock:
+            until = time.monotonic() + max(0.0, float(seconds))
+            self._blocked_until = max(self._blocked_until, until)
+            self._tokens = 0.0
+
+    def observe(self, headers: Mapping[str, Any]) -> None:
+        """Оновлює швидкість за заголовками ``X-*-USED-*`` / ``X-MBX-ORDER-COUNT-*``."""
+
+        lowered = {str(k).lower(): v for k, v in (headers or {}).items()}
+        wall = time.time()
+        rates = []
+        block_for = 0.0
+        with self._lock:
+            for name, (limit, window) in self._limits.items():
+                raw = lowered.get(name)
+                if raw is None:
+                    continue
+                try:
+                    used = int(raw)
+                except (TypeError, ValueError):
+                    continue
+                window_id = int(wall // window)
+                cost = self._cost.get(name, 1.0)
+                prev = self._usage.get(name)
+                if prev is not None and prev[1] == window_id and used > prev[0]:
+                    cost = 0.7 * cost + 0.3 * float(used - prev[0])
+                    self._cost[name] = cost
+                self._usage[name] = (used, window_id)
+
+                secs_left = max(window - (wall % window), 0.001)
+                remaining = limit * (1.0 - self._safety) - used
+                if remaining <= 0:
+                    block_for = max(block_for, secs_left)
+                    continue
+                rates.append(remaining / max(cost, 1.0) / secs_left)
+
+            if rates:
+                self._refill(time.monotonic())
+                self._rate = max(self._min_rate, min(self._max_rate, min(rates)))
+            if block_for > 0:
+                LOGGER.warning("rate limit headroom exhausted, pausing %.1fs", block_for)
+                self._blocked_until = max(self._blocked_until, time.monotonic() + block_for)
+                self._tokens = 0.0
+
+
+class ServerClock:
+    """
+    Оцінка зсуву ``server_time - local_time`` (мс).
+
+    Кожне оновлення робить кілька запитів ``/api/v3/time`` і бере вибірку з
+    найменшим RTT (сервер відповідає приблизно посередині RTT), далі
+    згладжує EWMA. Застарілий зсув оновлюється у фоні, тож гарячий шлях
+    не чекає на мережу; -1021 примушує синхронне оновлення.
+    """
+
+    def __init__(
+        self,
+        fetch_server_time: Callable[[], int],
+        *,
+        refresh_sec: float = _CLOCK_REFRESH_SEC,
+        samples: int = 3,
+        alpha: float = 0.3,
+    ) -> None:
+        self._fetch = fetch_server_time
+        self.refresh_sec = float(refresh_sec)
+        self.samples = max(1, int(samples))
+        self.alpha = float(alpha)
+        self.offset_ms = 0.0
+        self.rtt_ms = 0.0
+        self.synced_at = 0.0
+        self.sample_count = 0
+        self.sync_count = 0
+        self.timestamp_errors = 0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    @property
+    def synced(self) -> bool:
+        return self.synced_at > 0
+
+    def sync(self, force: bool = False) -> float:
+        """Синхронне оновлення; повертає новий зсув. ``force`` — без згладжування (після -1021)."""
+
+        best: Optional[Tuple[float, float]] = None
+        for _ in range(self.samples):
+            t0 = time.time() * 1000.0
+            server = float(self._fetch())
+            t1 = time.time() * 1000.0
+            rtt = t1 - t0
+            estimate = server - (t0 + rtt / 2.0)
+            if best is None or rtt < best[0]:
+                best = (rtt, estimate)
+        assert best is not None
+        with self._lock:
+            rtt, estimate = best
+            if self.synced and not force:
+                self.offset_ms += self.alpha * (estimate - self.offset_ms)
+            else:
+                self.offset_ms = estimate
+            self.rtt_ms = rtt
+            self.synced_at = time.monotonic()
+            self.sample_count += self.samples
+            self.sync_count += 1
+            return self.offset_ms
+
+    def _background_refresh(self) -> None:
+        try:
+            self.sync()
+        except Exception as exc:
+            LOGGER.warning("server time refresh failed: %s", exc)
+        finally:
+            self._refreshing = False
+
+    def now_ms(self, *, sync: bool = True) -> int:
+        """Серверний час. ``sync=False`` — ніколи не ходить у мережу."""
+
+        if sync:
+            if not self.synced:
+                try:
+                    self.sync()
+                except Exception as exc:
+                    # не повторюємо на кожному запиті: наступна спроба — фоном через refresh_sec
+                    LOGGER.warning("server time sync failed, using local clock: %s", exc)
+                    self.synced_at = time.monotonic()
+            elif time.monotonic() - self.synced_at > self.refresh_sec and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(target=self._background_refresh, name="clock-sync", daemon=True).start()
+        return int(time.time() * 1000.0 + self.offset_ms)
+
+    def note_timestamp_error(self) -> None:
+        """-1021: рахуємо і одразу пересинхронізуємось на повний зсув (EWMA виправила б лише частку)."""
+
+        with self._lock:
+            self.timestamp_errors += 1
+        try:
+            self.sync(force=True)
+        except Exception as exc:
+            LOGGER.warning("server time resync after -1021 failed: %s", exc)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "offset_ms": round(self.offset_ms, 3),
+            "rtt_ms": round(self.rtt_ms, 3),
+            "syncs": self.sync_count,
+            "samples": self.sample_count,
+            "timestamp_errors": self.timestamp_errors,
+        }
+
+
+def _error_code(resp: requests.Response) -> Optional[int]:
+    try:
+        data = resp.json()
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or data.get("code") is None:
+        return None
+    try:
+        return int(data["code"])
+    except (TypeError, ValueError):
+        return None
+
+
+_EVENT_PREFIX = "/sapi/v1/convert/"
+_EVENT_FIELDS = ("orderStatus", "fromAmount", "toAmount", "ratio")
+
+
+def _convert_event(path: str, params: Mapping[str, Any], status: str, elapsed_ms: float, body: Any = None) -> None:
+    """Подія ``http`` журналу (core/eventlog.py) для відповіді Convert; без журналу — нічого."""
+
+    if eventlog.default_log() is None or not path.startswith(_EVENT_PREFIX):
+        return
+    body = body if isinstance(body, dict) else {}
+    fields = {
+        "endpoint": path[len(_EVENT_PREFIX) :],
+        "status": status,
+        "ms": round(elapsed_ms, 1),
+        "pair": eventlog.pair_key(
+            params.get("fromAsset") or body.get("fromAsset"), params.get("toAsset") or body.get("toAsset")
+        ),
+        "quoteId": params.get("quoteId") or body.get("quoteId"),
+        "orderId": params.get("orderId") or body.get("orderId"),
+        "code": body.get("code"),
+    }
+    fields.update((k, body[k]) for k in _EVENT_FIELDS if k in body)
+    eventlog.emit("http", **{k: v for k, v in fields.items() if v is not None})
+
+
+def _backoff_delay(attempt: int, resp: requests.Response | None = None) -> float:
+    """Експоненційний backoff 1–16 c + джитер; пріоритет має ``Retry-After``."""
+
+    if resp is not None:
+        retry_after = resp.headers.get("Retry-After")
+        if retry_after is not None:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                pass
+    return rand_jitter(min(16.0, 2.0 ** max(0, attempt - 1)), spread=0.2)
+
+
+class BinanceClient:
+    """
+    Клієнт з власною сесією (пул keep-alive), підписувачем і лімітером.
+
+    ``adapter`` підміняє транспорт ``requests`` (напр. ``replay.ReplayAdapter``).
+    """
+
+    def __init__(
+        self,
+        api_key: str | None = None,
+        secret_key: str | None = None,
+        *,
+        base_url: str | None = None,
+        limiter: AdaptiveRateLimiter | None = None,
+        pool_size: int = _POOL_SIZE,
+        timeout: float = TIMEOUT,
+        retry_max: int = _RETRY_MAX,
+        clock_sync: bool = _CLOCK_SYNC,
+        adapter: BaseAdapter | None = None,
+    ) -> None:
+        if api_key is None:
+            api_key = getattr(config, "BINANCE_API_KEY", "")
+        if secret_key is None:
+            secret_key = getattr(config, "BINANCE_SECRET_KEY", "") or getattr(config, "BINANCE_API_SECRET", "")
+        self.base_url = (base_url or BASE_URL).rstrip("/")
+        self.timeout = timeout
+        self.retry_max = max(0, int(retry_max))
+        self.limiter = limiter or AdaptiveRateLimiter(_QPS, _BURST, max_qps=_QPS_MAX)
+        self._secret = (secret_key or "").encode()
+        self.session = requests.Session()
+        # транспорт: запис/відтворення сесії (core/replay.py) або звичайний пул
+        pool = {"pool_connections": pool_size, "pool_maxsize": pool_size, "max_retries": 0}
+        adapter = adapter or replay.adapter_from_config(**pool) or HTTPAdapter(**pool)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"X-MBX-APIKEY": api_key or "", "Connection": "keep-alive"})
+        self.clock_sync = clock_sync
+        self.clock = ServerClock(self._server_time)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _server_time(self) -> int:
+        return int(self.request("GET", "/api/v3/time")["serverTime"])
+
+    def now_ms(self) -> int:
+        return self.clock.now_ms(sync=self.clock_sync)
+
+    def sign(self, params: Mapping[str, Any]) -> str:
+        """Повертає query-рядок з ``timestamp``/``recvWindow``/``signature``."""
+
+        payload = dict(params)
+        payload.setdefault("recvWindow", RECV_WINDOW_MS)
+        payload["timestamp"] = self.now_ms()
+        query = urlencode(payload)
+        signature = hmac.new(self._secret, query.encode(), hashlib.sha256).hexdigest()
+        return f"{query}&signature={signature}"
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        params: Mapping[str, Any] | None = None,
+        *,
+        signed: bool = False,
+    ) -> Any:
+        params = {k: v for k, v in (params or {}).items() if v is not None}
+        method = method.upper()
+        url = f"{self.base_url}{path}"
+        profile = profiling.active()  # --profile-startup: розклад перших запитів
+        attempt = 0
+        while True:
+            attempt += 1
+            began = time.perf_counter()
+            waited = self.limiter.acquire()
+            if waited:
+                metrics.inc("convert_sleep_seconds_total", waited, reason="limiter")
+            signing = time.perf_counter()
+            query = self.sign(params) if signed else urlencode(params)
+            full_url = f"{url}?{query}" if query else url
+            started = time.perf_counter()
+            try:
+                resp = self.session.request(method, full_url, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                elapsed_ms = (time.perf_counter() - started) * 1000.0
+                metrics.observe(
+                    "convert_http_request_duration_ms", elapsed_ms, endpoint=path, method=method, status="error"
+                )
+                if profile is not None:
+                    profile.note_request(
+                        method, path, began, waited * 1000.0, (started - signing) * 1000.0, elapsed_ms, "error"
+                    )
+                _convert_event(path, params, "error", elapsed_ms)
+                # POST не повторюємо: acceptQuote не можна виконати двічі
+                if method != "GET" or attempt > self.retry_max:
+                    raise
+                delay = _backoff_delay(attempt)
+                metrics.inc("convert_http_retries_total", endpoint=path, reason="connection")
+                metrics.inc("convert_sleep_seconds_total", delay, reason="backoff")
+                time.sleep(delay)
+                continue
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            status = str(resp.status_code)
+            metrics.observe("convert_http_request_duration_ms", elapsed_ms, endpoint=path, method=method, status=status)
+            if profile is not None:
+                profile.note_request(
+                    method, path, began, waited * 1000.0, (started - signing) * 1000.0, elapsed_ms, status
+                )
+            self.limiter.observe(resp.headers)
+
+            if resp.status_code < 400:
+                payload = resp.json() if resp.content else {}
+                _convert_event(path, params, status, elapsed_ms, payload)
+                return payload
+
+            code = _error_code(resp)
+            _convert_event(path, params, status, elapsed_ms, {"code": code})
+            if attempt <= self.retry_max:
+                if resp.status_code in _BACKOFF_STATUS or code in _BACKOFF_CODES:
+                    delay = _backoff_delay(attempt, resp)
+                    LOGGER.warning("%s %s -> %s (code=%s), backoff %.2fs", method, path, resp.status_code, code, delay)
+                    metrics.inc("convert_http_retries_total", endpoint=path, reason="rate_limit")
+                    self.limiter.penalise(delay)
+                    continue
+                if signed and code == _TIMESTAMP_CODE:
+                    metrics.inc("convert_http_retries_total", endpoint=path, reason="timestamp")
+                    LOGGER.warning("%s %s -> -1021, re-syncing clock and re-signing", method, path)
+                    if self.clock_sync:
+                        self.clock.note_timestamp_error()
+                    else:
+                        self.clock.timestamp_errors += 1
+                    continue
+            resp.raise_for_status()
+            return resp.json()
+
+    def get(self, path: str, params: Mapping[str, Any] | None = None, signed: bool = False) -> Any:
+        return self.request("GET", path, params, signed=signed)
+
+    def post(self, path: str, params: Mapping[str, Any] | None = None, signed: bool = False) -> Any:
+        return self.request("POST", path, params, signed=signed)
+
+
+_default_client: BinanceClient | None = None
+_default_lock = threading.Lock()
+# клієнт активного акаунта (core/accounts.py); поза ``use_client`` — спільний
+_context_client: ContextVar[Optional[BinanceClient]] = ContextVar("binance_client", default=None)
+
+
+def default_client() -> BinanceClient:
+    """Клієнт поточного контексту (``use_client``) або спільний клієнт процесу (лінива ініціалізація)."""
+
+    client = _context_client.get()
+    if client is not None:
+        return client
+    global _default_client
+    if _default_client is None:
+        with _default_lock:
+            if _default_client is None:
+                _default_client = BinanceClient()
+    return _default_client
+
+
+def set_default_client(client: BinanceClient | None) -> None:
+    global _default_client
+    with _default_lock:
+        _default_client = client
+
+
+@contextmanager
+def use_client(client: BinanceClient) -> Iterator[BinanceClient]:
+    """Усі ``get``/``post`` у цьому контексті (і в ``bind_context``-задачах) йдуть через ``client``."""
+
+    token = _context_client.set(client)
+    try:
+        yield client
+    finally:
+        _context_client.reset(token)
+
+
+def server_now_ms() -> int:
+    """Серверний час за останнім відомим зсувом (без мережевих запитів)."""
+
+    return default_client().clock.now_ms(sync=False)
+
+
+def get(path: str, params: Mapping[str, Any] | None = None, signed: bool = False) -> Any:
+    return default_client().get(path, params, signed=signed)
+
+
+def post(path: str, params: Mapping[str, Any] | None = None, signed: bool = False) -> Any:
+    return default_client().post(path, params, signed=signed)
+
+
+# Кеш exchangeInfo / assetInfo: ключ -> (момент протухання, payload)
+_info_cache: Dict[Tuple[str, ...], Tuple[float, Any]] = {}
+_info_lock = threading.Lock()
+
+
+def _cached(key: Tuple[str, ...], loader) -> Any:
+    now = time.monotonic()
+    with _info_lock:
+        hit = _info_cache.get(key)
+    if hit is not None and hit[0] > now:
+        return hit[1]
+    value = loader()
+    with _info_lock:
+        _info_cache[key] = (now + _EXCHANGEINFO_TTL_SEC, value)
+    return value
+
+
+def clear_info_cache() -> None:
+    with _info_lock:
+        _info_cache.clear()
+
+
+def get_convert_exchange_info(from_asset: str, to_asset: str) -> Optional[Dict[str, Any]]:
+    """Пара Convert з лімітами ``fromAssetMinAmount``/``fromAssetMaxAmount`` або ``None``."""
+
+    def load() -> Optional[Dict[str, Any]]:
+        payload = get("/sapi/v1/convert/exchangeInfo", {"fromAsset": from_asset, "toAsset": to_asset})
+        if isinstance(payload, list):
+            return payload[0] if payload else None
+        return payload
+
+    return _cached(("exchangeInfo", from_asset, to_asset), load)
+
+
+def get_convert_asset_table() -> Dict[str, Dict[str, Any]]:
+    """Уся таблиця точностей (``fraction``) з ``/sapi/v1/convert/assetInfo``: актив -> рядок."""
+
+    def load() -> Dict[str, Dict[str, Any]]:
+        payload = get("/sapi/v1/convert/assetInfo", signed=True)
+        rows = payload if isinstance(payload, list) else []
+        return {str(row.get("asset", "")).upper(): row for row in rows if isinstance(row, dict)}
+
+    return _cached(("assetInfo",), load)
+
+
+def get_convert_asset_info(asset: str) -> Dict[str, Any]:
+    return get_convert_asset_table().get(asset.upper(), {})
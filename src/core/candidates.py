@@ -0,0 +1,223 @@
+"""
+Потоковий журнал кандидатів analyze/trade.
+
+- ``analyze/candidates.jsonl`` — append-only, один JSON-рядок на котирування,
+  пишеться в момент відповіді (без накопичення рядків у пам'яті);
+- ``analyze/summary.json`` — підсумки останніх прогонів за ``region/phase``,
+  що рахуються інкрементально; кожен містить байтовий ``offset`` початку прогону в журналі,
+  тож читач (фаза trade) переходить одразу до потрібних рядків, і лічильники
+  за акаунтами (``accounts``), якщо фаза йшла на кількох;
+- ``summary.txt`` — той самий підсумок у текстовому вигляді;
+- ``compact`` — необов'язковий колонковий знімок журналу (``.npz``).
+
+Журнал ротується (``.1``) лише перед початком прогону, коли перевищує
+``CANDIDATES_MAX_BYTES``, тож ``offset`` поточного прогону лишається дійсним.
+
+Журнал і ``summary.json`` спільні для всіх регіонів і процесів (asia і us
+можуть іти одночасно), тож ротація, кожен дописаний рядок і
+read-modify-write підсумку йдуть під ``flock`` окремого
+``candidates.jsonl.lock`` (як ``pair_health``). Діапазон ``offset``..``end``
+може містити рядки іншого одночасного прогону: ``iter_candidates`` відкидає
+рядки чужого ``region/phase``, а ``inode`` у підсумку відсікає журнал,
+ротований після прогону.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, Optional
+
+import numpy as np
+
+import config_dev3 as config
+
+JOURNAL_NAME = "candidates.jsonl"
+SUMMARY_NAME = "summary.json"
+_MAX_BYTES: int = int(getattr(config, "CANDIDATES_MAX_BYTES", 64 * 1024 * 1024))
+
+
+def _utc_ts() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _atomic_write(path: Path, text: str) -> None:
+    fd, tmp = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=str(path.parent))
+    with os.fdopen(fd, "w", encoding="utf-8") as fh:
+        fh.write(text)
+    os.replace(tmp, path)
+
+
+@contextmanager
+def _flocked(lock: IO[str]) -> Iterator[None]:
+    fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+class CandidateSink:
+    """Пише рядки кандидатів одразу; потокобезпечний (``fan_out`` викликає з пулу)."""
+
+    def __init__(self, out_dir: Path, region: str, phase: str, *, max_bytes: int = _MAX_BYTES) -> None:
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.path = self.out_dir / JOURNAL_NAME
+        # той самий inode і після ротації журналу — взаємне виключення між процесами
+        self._flock = open(self.path.with_name(JOURNAL_NAME + ".lock"), "a")
+        with _flocked(self._flock):
+            if self.path.exists() and self.path.stat().st_size > max_bytes:
+                os.replace(self.path, self.path.with_name(JOURNAL_NAME + ".1"))
+            self._fh = open(self.path, "ab")
+            offset = self._fh.seek(0, os.SEEK_END)
+        self._lock = threading.Lock()
+        self.summary: Dict[str, Any] = {
+            "run": _utc_ts(),
+            "region": region,
+            "phase": phase,
+            "inode": os.fstat(self._fh.fileno()).st_ino,
+            "offset": offset,
+            "total": 0,
+            "ok": 0,
+            "errors": 0,
+            "skipped": 0,
+            "insufficient": 0,
+            "best": {},
+        }
+
+    def write(self, row: Dict[str, Any]) -> None:
+        line = json.dumps(row, ensure_ascii=False, separators=(",", ":"), default=str).encode() + b"\n"
+        with self._lock:
+            with _flocked(self._flock):
+                self._fh.write(line)
+                self._fh.flush()
+            s = self.summary
+            s["total"] += 1
+            if row.get("skipped"):
+                s["skipped"] += 1
+            elif int(row.get("ok") or 0):
+                s["ok"] += 1
+                pair = f"{row.get('from')}->{row.get('to')}"
+                best = s["best"].get(pair)
+                if row.get("ratio") and (best is None or float(row["ratio"]) > float(best)):
+                    s["best"][pair] = row["ratio"]
+            else:
+                s["errors"] += 1
+            s["insufficient"] += int(row.get("insufficient") or 0)
+            if row.get("account"):
+                per = s.setdefault("accounts", {}).setdefault(row["account"], {"total": 0, "ok": 0})
+                per["total"] += 1
+                per["ok"] += int(bool(int(row.get("ok") or 0)) and not row.get("skipped"))
+
+    def close(self, latency: str = "") -> Dict[str, Any]:
+        with self._lock:
+            if self._fh.closed:
+                return self.summary
+            try:
+                with _flocked(self._flock):
+                    # свій inode: журнал міг бути ротований іншим процесом під час прогону
+                    self.summary.update(end=os.fstat(self._fh.fileno()).st_size, latency=latency)
+                    self._fh.close()
+                    summary = dict(self.summary)
+                    summaries = _read_summaries(self.out_dir)
+                    summaries[f"{summary['region']}/{summary['phase']}"] = summary
+                    _atomic_write(self.out_dir / SUMMARY_NAME, json.dumps(summaries, ensure_ascii=False))
+                    _atomic_write(
+                        self.out_dir / "summary.txt",
+                        f"Region/phase: {summary['region']}/{summary['phase']}\n"
+                        f"Total routes: {summary['total']}\n"
+                        f"OK quotes:    {summary['ok']}\n"
+                        f"Errors:       {summary['errors']}\n"
+                        f"Insufficient: {summary['insufficient']}\n"
+                        f"Latency:      {latency}\n",
+                    )
+            finally:
+                self._flock.close()
+        return summary
+
+    def __enter__(self) -> "CandidateSink":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def _read_summaries(out_dir: Path) -> Dict[str, Dict[str, Any]]:
+    try:
+        with open(Path(out_dir) / SUMMARY_NAME, "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+    except (FileNotFoundError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def load_summary(out_dir: Path, region: str, phase: str) -> Optional[Dict[str, Any]]:
+    """Підсумок останнього прогону ``region/phase`` (маленький файл, журнал не читається)."""
+
+    return _read_summaries(out_dir).get(f"{region}/{phase}")
+
+
+def iter_candidates(out_dir: Path, summary: Optional[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Рядки прогону ``summary``, читаючи лише його діапазон журналу."""
+
+    if not summary:
+        return
+    path = Path(out_dir) / JOURNAL_NAME
+    try:
+        fh = open(path, "rb")
+    except FileNotFoundError:
+        return
+    with fh:
+        inode = summary.get("inode")
+        if fh.seek(0, os.SEEK_END) < int(summary.get("end", 0)) or (
+            inode is not None and os.fstat(fh.fileno()).st_ino != inode
+        ):
+            return  # журнал ротовано після цього прогону
+        fh.seek(int(summary.get("offset", 0)))
+        end = int(summary.get("end", 0)) or None
+        region, phase = summary.get("region"), summary.get("phase")
+        for line in fh:
+            if end is not None and fh.tell() > end:
+                break
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            # рядки одночасного прогону іншого region/phase у тому ж діапазоні
+            if row.get("region", region) == region and row.get("phase", phase) == phase:
+                yield row
+
+
+def compact(out_dir: Path, dest: Optional[Path] = None) -> Path:
+    """Колонковий знімок усього журналу: ``{field: np.ndarray[str]}`` у ``.npz``."""
+
+    out_dir = Path(out_dir)
+    dest = Path(dest or out_dir / "candidates.npz")
+    columns: Dict[str, list] = {}
+    count = 0
+    with open(out_dir / JOURNAL_NAME, "rb") as fh:
+        for line in fh:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            for key in row.keys() - columns.keys():
+                columns[key] = [""] * count
+            for key, values in columns.items():
+                value = row.get(key)
+                values.append("" if value is None else str(value))
+            count += 1
+    tmp = dest.with_name(dest.name + ".tmp.npz")
+    np.savez_compressed(tmp, **{k: np.asarray(v, dtype=str) for k, v in columns.items()})
+    os.replace(tmp, dest)
+    return dest
+
+
+def read_columns(path: Path) -> Dict[str, np.ndarray]:
+    with np.load(path, allow_pickle=False) as data:
+        return {k: data[k] for k in data.files}
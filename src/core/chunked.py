@@ -0,0 +1,117 @@
+"""
+Виконання конвертацій понад ``fromAssetMaxAmount`` частинами.
+
+Сума ділиться на найменшу кількість рівних частин, що вкладаються в
+[minimum, maximum] пари; кожна частина округлюється ``norm8`` вниз, а
+залишок від округлення додається до останньої. Частини котируються й
+приймаються паралельно (темп задає спільний лімітер клієнта), результати
+зводяться в один payload зі slippage кожної частини.
+"""
+
+from __future__ import annotations
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional
+
+import config_dev3 as config
+
+from .utils import DECIMAL_ZERO, QUANT8, bind_context, decimal_from_any, norm8
+
+LOGGER = logging.getLogger(__name__)
+
+_CHUNK_WORKERS: int = int(getattr(config, "CHUNK_WORKERS", 4))
+
+
+def split_amount(amount: Decimal, minimum: Decimal, maximum: Decimal) -> List[Decimal]:
+    """
+    Ділить ``amount`` на частини в межах лімітів; сума частин == ``norm8(amount)``.
+    ``ValueError`` — якщо поділити без порушення ``minimum`` неможливо.
+    """
+
+    total = norm8(amount)
+    if total <= DECIMAL_ZERO:
+        raise ValueError(f"amount must be positive, got {amount}")
+    if maximum <= DECIMAL_ZERO or total <= maximum:
+        return [total]
+    count = int(-(-total // maximum))  # ceil
+    while True:
+        chunk = norm8(total / count)
+        last = total - chunk * (count - 1)
+        if last <= maximum:
+            break
+        count += 1
+    if minimum > DECIMAL_ZERO and chunk < minimum:
+        raise ValueError(f"cannot split {total} into chunks within [{minimum}, {maximum}]")
+    return [chunk] * (count - 1) + [last]
+
+
+def _to_amount(result: Dict[str, Any]) -> Decimal:
+    quote = result.get("quote") or {}
+    return decimal_from_any(quote.get("toAmount") or quote.get("toAmountExpected"))
+
+
+def execute_chunked(
+    amount: Decimal,
+    minimum: Decimal,
+    maximum: Decimal,
+    convert_one: Callable[[Decimal], Optional[Dict[str, Any]]],
+    *,
+    max_workers: int = _CHUNK_WORKERS,
+    reference_ratio: Optional[Decimal] = None,
+) -> Dict[str, Any]:
+    """
+    Виконує ``convert_one(chunk)`` для кожної частини паралельно.
+
+    Повертає зведений payload: ``quote.fromAmount/toAmount/ratio`` — суми по
+    виконаних частинах (щоб ``execute_route`` міг іти далі), ``orderIds``,
+    ``chunks`` зі slippage у bps відносно ``reference_ratio`` (або найкращої
+    частини) та ``failed``. Якщо не вдалася жодна частина — пробрасує помилку.
+    """
+
+    chunks = split_amount(amount, minimum, maximum)
+    LOGGER.info("chunked convert: %s split into %d chunk(s) of <= %s", amount, len(chunks), maximum)
+
+    def run(chunk: Decimal) -> Dict[str, Any]:
+        try:
+            return {"amount": chunk, "result": convert_one(chunk)}
+        except Exception as exc:
+            return {"amount": chunk, "error": exc}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks))), thread_name_prefix="chunk") as pool:
+        outcomes = list(pool.map(bind_context(run), chunks))
+
+    filled = [o for o in outcomes if o.get("result")]
+    failed = [o for o in outcomes if not o.get("result")]
+    if not filled:
+        error = next((o["error"] for o in failed if "error" in o), None)
+        if error is not None:
+            raise error
+        raise RuntimeError("all chunks were skipped")
+
+    ratios = [_to_amount(o["result"]) / o["amount"] for o in filled]
+    reference = decimal_from_any(reference_ratio) if reference_ratio else max(ratios)
+    total_from = sum((o["amount"] for o in filled), DECIMAL_ZERO)
+    total_to = sum((_to_amount(o["result"]) for o in filled), DECIMAL_ZERO)
+    report = []
+    for outcome, ratio in zip(filled, ratios, strict=True):
+        slippage = (ratio - reference) / reference * 10000 if reference > DECIMAL_ZERO else DECIMAL_ZERO
+        report.append(
+            {
+                "fromAmount": str(outcome["amount"]),
+                "toAmount": str(_to_amount(outcome["result"])),
+                "ratio": str(ratio),
+                "slippage_bps": str(slippage.quantize(Decimal("0.01"))),
+                "orderId": outcome["result"].get("orderId"),
+            }
+        )
+    for outcome in failed:
+        LOGGER.error("chunk %s failed: %s", outcome["amount"], outcome.get("error", "skipped"))
+    avg = (total_to / total_from).quantize(QUANT8) if total_from > DECIMAL_ZERO else DECIMAL_ZERO
+    return {
+        "orderIds": [r["orderId"] for r in report],
+        "quote": {"fromAmount": str(total_from), "toAmount": str(total_to), "ratio": str(avg)},
+        "chunks": report,
+        "failed": [{"fromAmount": str(o["amount"]), "error": str(o.get("error", "skipped"))} for o in failed],
+    }
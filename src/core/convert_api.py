@@ -2,27 +2,42 @@
 
 from __future__ import annotations
 
-import json
 import logging
 import time
 from dataclasses import dataclass
 from decimal import Decimal
 from functools import lru_cache
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from itertools import pairwise
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 import requests
 
 import config_dev3 as config
 
-from . import binance_client
+from . import (
+    accept_pipeline,
+    accounts,
+    balance,
+    binance_client,
+    chunked,
+    dedup,
+    guard,
+    meta_cache,
+    metrics,
+    pair_health,
+    route_graph,
+)
+from .amounts import Amount
+from .convert_errors import _extract_code
 from .utils import (
-    DECIMAL_ZERO,
     decimal_from_any,
     ensure_amount_and_limits,
-    now_ms,
     rand_jitter,
 )
 
+if TYPE_CHECKING:
+    from .quote_engine import QuoteBudget
+
 LOGGER = logging.getLogger(__name__)
 
 
@@ -47,9 +62,6 @@ _JITTER_RANGE_SEC: Tuple[float, float] = tuple(
 _QUOTE_TTL_SAFETY_MS = getattr(config, "QUOTE_TTL_SAFETY_MS", 1200)
 _QUOTE_RETRY_MAX = getattr(config, "QUOTE_RETRY_MAX", 2)
 
-# Deduplication cache within process execution
-_executed_keys: set[str] = set()
-
 
 @dataclass(frozen=True)
 class ConvertStep:
@@ -82,8 +94,8 @@ class ConvertRoute:
 class ConvertLimits:
     """Convert limits (min/max) in *from* asset units."""
 
-    minimum: Decimal
-    maximum: Decimal
+    minimum: Amount
+    maximum: Amount
 
 
 @dataclass
@@ -93,8 +105,8 @@ class ConvertQuote:
     quote_id: str
     from_asset: str
     to_asset: str
-    from_amount: Decimal
-    to_amount: Decimal
+    from_amount: Amount
+    to_amount: Amount
     price: Decimal
     expire_time_ms: int
     raw: Dict[str, Any]
@@ -102,12 +114,13 @@ class ConvertQuote:
     def expired(self, safety_ms: int = _QUOTE_TTL_SAFETY_MS) -> bool:
         if not self.expire_time_ms:
             return False
-        return now_ms() >= max(0, self.expire_time_ms - int(abs(safety_ms)))
+        return binance_client.server_now_ms() >= max(0, self.expire_time_ms - int(abs(safety_ms)))
 
 
 def _sleep_with_jitter() -> None:
     jitter = rand_jitter(_JITTER_RANGE_SEC)
     if jitter > 0:
+        metrics.inc("convert_sleep_seconds_total", jitter, reason="jitter")
         time.sleep(jitter)
 
 
@@ -116,47 +129,100 @@ def _normalise_asset(value: str) -> str:
 
 
 def _safe_exchange_info(from_asset: str, to_asset: str) -> Optional[Dict[str, Any]]:
+    cache = meta_cache.default_cache()
+    hit, cached = cache.get_pair(from_asset, to_asset)
+    if hit:
+        return cached
     try:
-        return binance_client.get_convert_exchange_info(from_asset, to_asset)
+        info = binance_client.get_convert_exchange_info(from_asset, to_asset)
     except requests.HTTPError as exc:
         if exc.response is not None and exc.response.status_code in (400, 404):
+            cache.put_pair(from_asset, to_asset, None)
             return None
         raise
     except requests.RequestException:
         raise
+    cache.put_pair(from_asset, to_asset, info or None)
+    return info
 
 
 def _extract_limits(info: Optional[Dict[str, Any]]) -> ConvertLimits:
     if not info:
-        return ConvertLimits(DECIMAL_ZERO, DECIMAL_ZERO)
+        return ConvertLimits(Amount(), Amount())
     payload: Any = info
     if isinstance(info, dict) and "data" in info:
         payload = info.get("data")
     if not isinstance(payload, dict):
         payload = {}
-    minimum = decimal_from_any(payload.get("fromAssetMinAmount"))
-    maximum = decimal_from_any(payload.get("fromAssetMaxAmount"))
+    minimum = Amount.parse(payload.get("fromAssetMinAmount"))
+    maximum = Amount.parse(payload.get("fromAssetMaxAmount"))
     return ConvertLimits(minimum, maximum)
 
 
+def _graph() -> Optional[route_graph.RouteGraph]:
+    """Граф пар; холодний кеш спершу заповнюється одним exchangeInfo (``meta_cache.ensure_preloaded``)."""
+
+    graph = route_graph.default_graph()
+    if graph is None and meta_cache.ensure_preloaded():
+        graph = route_graph.default_graph()
+    return graph
+
+
+def _graph_for(from_asset: str) -> Optional[route_graph.RouteGraph]:
+    """
+    Граф, у якому список пар ``from_asset`` повний: за потреби один
+    ``exchangeInfo?fromAsset=`` (``meta_cache.ensure_complete``); інакше ``None``.
+    """
+
+    graph = _graph()
+    if graph is not None and graph.is_complete(from_asset):
+        return graph
+    if meta_cache.ensure_complete(from_asset):
+        graph = route_graph.default_graph()
+        if graph is not None and graph.is_complete(from_asset):
+            return graph
+    return None
+
+
+def _has_pair(from_asset: str, to_asset: str) -> bool:
+    """Пара доступна? Спершу граф (без мережі), далі кеш/exchangeInfo пари."""
+
+    graph = _graph_for(from_asset)
+    if graph is not None:
+        return graph.has_pair(from_asset, to_asset)
+    return bool(_safe_exchange_info(from_asset, to_asset))
+
+
+def _route_from_path(path: Tuple[str, ...]) -> ConvertRoute:
+    return ConvertRoute(tuple(ConvertStep(a, b) for a, b in pairwise(path)))
+
+
 @lru_cache(maxsize=8192)
 def _route_steps(from_asset: str, to_asset: str) -> Optional[ConvertRoute]:
     if from_asset == to_asset:
         return ConvertRoute((ConvertStep(from_asset, to_asset),))
-    info = _safe_exchange_info(from_asset, to_asset)
-    if info:
-        return ConvertRoute((ConvertStep(from_asset, to_asset),))
+    routes = candidate_routes(from_asset, to_asset)
+    return routes[0] if routes else None
+
+
+def candidate_routes(from_asset: str, to_asset: str) -> List[ConvertRoute]:
+    """
+    Усі маршрути на 1–2 кроки: прямий, далі через ``HUB_ASSETS`` у їхньому
+    порядку. Пари перевіряються графом без мережі, щойно список пар
+    from-активу повний (``_has_pair``).
+    """
+
+    from_asset = _normalise_asset(from_asset)
+    to_asset = _normalise_asset(to_asset)
+    if not from_asset or not to_asset or from_asset == to_asset:
+        return []
+    paths: List[Tuple[str, ...]] = []
+    if _has_pair(from_asset, to_asset):
+        paths.append((from_asset, to_asset))
     for hub in HUB_ASSETS:
-        if hub in (from_asset, to_asset):
-            continue
-        first = _safe_exchange_info(from_asset, hub)
-        if not first:
-            continue
-        second = _safe_exchange_info(hub, to_asset)
-        if not second:
-            continue
-        return ConvertRoute((ConvertStep(from_asset, hub), ConvertStep(hub, to_asset)))
-    return None
+        if hub not in (from_asset, to_asset) and _has_pair(from_asset, hub) and _has_pair(hub, to_asset):
+            paths.append((from_asset, hub, to_asset))
+    return [_route_from_path(path) for path in paths]
 
 
 def route_exists(from_asset: str, to_asset: str) -> Optional[ConvertRoute]:
@@ -166,7 +232,37 @@ def route_exists(from_asset: str, to_asset: str) -> Optional[ConvertRoute]:
     to_asset = _normalise_asset(to_asset)
     if not from_asset or not to_asset:
         return None
-    return _route_steps(from_asset, to_asset)
+    route = _route_steps(from_asset, to_asset)
+    health = pair_health.default_health()
+    if route is None or health.allow_route(route):
+        return route
+    # breaker на кроці кешованого маршруту -> інший маршрут з відкритими парами
+    return next((r for r in candidate_routes(from_asset, to_asset) if health.allow_route(r)), None)
+
+
+def best_route(
+    from_asset: str,
+    to_asset: str,
+    amount: Decimal,
+    wallet: str = "SPOT",
+    budget: Optional[QuoteBudget] = None,
+) -> Optional[ConvertRoute]:
+    """
+    Маршрут для виконання: прямий, якщо пара є й breaker закритий; інакше з
+    маршрутів через хаби — з найкращим живим курсом (``quote_engine.rank_routes``,
+    котирування хабів паралельно). Котирування йдуть з ``budget`` прогону
+    (без нього — не більше двох на маршрут); без жодного котирування — перший маршрут.
+    """
+
+    health = pair_health.default_health()
+    routes = [r for r in candidate_routes(from_asset, to_asset) if health.allow_route(r)]
+    if len(routes) <= 1 or routes[0].is_direct:
+        return routes[0] if routes else None
+    from .quote_engine import QuoteBudget, rank_routes
+
+    budget = budget if budget is not None else QuoteBudget(2 * len(routes))
+    ranked = rank_routes(routes, amount, wallet, budget=budget)
+    return ranked[0][0] if ranked else routes[0]
 
 
 def limits_for_pair(from_asset: str, to_asset: str) -> ConvertLimits:
@@ -174,7 +270,14 @@ def limits_for_pair(from_asset: str, to_asset: str) -> ConvertLimits:
 
 
 def get_asset_precision(asset: str) -> Dict[str, Any]:
-    return binance_client.get_convert_asset_info(asset)
+    asset = _normalise_asset(asset)
+    cache = meta_cache.default_cache()
+    cached = cache.get_asset(asset)
+    if cached is not None:
+        return cached
+    table = binance_client.get_convert_asset_table()
+    cache.put_assets(table)
+    return table.get(asset, {})
 
 
 def _quote_once(
@@ -199,13 +302,12 @@ def _quote_once(
     expire_raw = payload.get("expireTime") or payload.get("validTimestamp")
     expire_ms = int(expire_raw) if expire_raw else 0
     price = decimal_from_any(payload.get("ratio") or payload.get("price"))
-    to_amount = decimal_from_any(payload.get("toAmount") or payload.get("toAmountExpected"))
     quote = ConvertQuote(
         quote_id=str(payload.get("quoteId", "")),
         from_asset=from_asset,
         to_asset=to_asset,
-        from_amount=decimal_from_any(amount),
-        to_amount=to_amount,
+        from_amount=Amount.parse(amount),
+        to_amount=Amount.parse(payload.get("toAmount") or payload.get("toAmountExpected")),
         price=price,
         expire_time_ms=expire_ms,
         raw=payload,
@@ -266,46 +368,58 @@ def execute_conversion(
     wallet: str = "SPOT",
     retry: int | None = None,
 ) -> Dict[str, Any]:
-    """Execute direct conversion (single hop) with 1-shot auto-requote on expired (345231)."""
+    """
+    Execute direct conversion (single hop) via the TTL-aware accept pipeline:
+    accept right after the quote arrives, shadow re-quote in flight when the TTL is short,
+    auto-requote on expired (345231).
+
+    Amounts above ``fromAssetMaxAmount`` are split and executed in parallel chunks
+    (see ``chunked.execute_chunked``); the aggregated payload keeps the same ``quote`` shape.
 
+    Raises ``pair_health.CircuitOpenError`` without a network call while the pair's breaker is open.
+    """
+
+    pair_health.default_health().check(from_asset, to_asset)
     info = _safe_exchange_info(from_asset, to_asset)
+    limits = _extract_limits(info)
+    if limits.maximum and Amount.parse(amount) > limits.maximum:
+        return chunked.execute_chunked(
+            decimal_from_any(amount),
+            limits.minimum.to_decimal(),
+            limits.maximum.to_decimal(),
+            lambda chunk: _execute_single(from_asset, to_asset, chunk, wallet, retry),
+        )
     if info:
-        ensure_amount_and_limits(info, amount)
-
-    quote = get_quote(from_asset, to_asset, amount, wallet, retry=retry)
-    if not quote:
-        raise RuntimeError(f"quote failed for {from_asset}->{to_asset}")
-    if quote.expired():
-        LOGGER.warning("Quote %s expired immediately, requesting a new one", quote.quote_id)
-        quote = get_quote(from_asset, to_asset, amount, wallet, retry=retry)
-        if not quote:
-            raise RuntimeError("quote failed after retry")
-        if quote.expired():
-            raise RuntimeError("fresh quote already expired")
-
-    # Try accept; if server says "expired" (code 345231), get a fresh quote once and accept again.
+        ensure_amount_and_limits(amount, info)
+    return _execute_single(from_asset, to_asset, amount, wallet, retry)
+
+
+def _execute_single(
+    from_asset: str,
+    to_asset: str,
+    amount: Decimal,
+    wallet: str,
+    retry: int | None,
+    quote: Optional[ConvertQuote] = None,
+    accept: Callable[[str], Optional[Dict[str, Any]]] = accept_quote,
+    budget: Optional[QuoteBudget] = None,
+) -> Optional[Dict[str, Any]]:
+    pipeline = accept_pipeline.QuotePipeline(
+        lambda: get_quote(from_asset, to_asset, amount, wallet, retry=retry),
+        accept,
+        safety_ms=_QUOTE_TTL_SAFETY_MS,
+        label=f"{from_asset}->{to_asset}",
+        guard=guard.default_guard(),
+        budget=budget,
+    )
+    health = pair_health.default_health()
     try:
-        result = accept_quote(quote.quote_id)
-    except Exception as e:
-        resp = getattr(e, "response", None)
-        code = None
-        try:
-            code = (resp.json() or {}).get("code") if resp is not None else None
-        except Exception:
-            code = None
-
-        if code == 345231:
-            LOGGER.warning("acceptQuote says expired (345231), re-quoting once for %s->%s", from_asset, to_asset)
-            quote = get_quote(from_asset, to_asset, amount, wallet, retry=1)
-            if not quote:
-                raise RuntimeError("re-quote failed after 345231") from e
-            if quote.expired():
-                raise RuntimeError("re-quoted quote already expired") from e
-            result = accept_quote(quote.quote_id)
-        else:
-            raise
-
-    result.setdefault("quote", quote.raw)
+        result = pipeline.run(quote)
+    except Exception as exc:
+        health.record_error(from_asset, to_asset, exc)
+        raise
+    if result:
+        health.record_success(from_asset, to_asset)
     return result
 
 
@@ -314,61 +428,141 @@ def execute_route(
     amount: Decimal,
     wallet: str = "SPOT",
     retry: int | None = None,
+    *,
+    executed: Optional[List[Dict[str, Any]]] = None,
 ) -> List[Dict[str, Any]]:
-    """Execute route (direct or hub) returning list of order payloads."""
+    """
+    Execute route (direct or hub) returning list of order payloads.
 
-    executed: List[Dict[str, Any]] = []
+    ``executed`` — список, куди додаються виконані кроки (видно й після винятку).
+    """
+
+    executed = [] if executed is None else executed
     current_amount = amount
-    for step in route.steps:
-        response = execute_conversion(step.from_asset, step.to_asset, current_amount, wallet, retry)
-        executed.append(response)
-        quote = response.get("quote", {})
-        current_amount = decimal_from_any(quote.get("toAmount") or quote.get("toAmountExpected"))
-        wallet = (wallet or "SPOT").upper()
+    guard.default_guard().seed_from_portfolio(wallet)
+    try:
+        for step in route.steps:
+            response = execute_conversion(step.from_asset, step.to_asset, current_amount, wallet, retry)
+            executed.append(response)
+            quote = response.get("quote", {})
+            current_amount = decimal_from_any(quote.get("toAmount") or quote.get("toAmountExpected"))
+            wallet = (wallet or "SPOT").upper()
+    except Exception:
+        # частковий маршрут: знімок залишків більше не відповідає дійсності
+        balance.default_service().invalidate()
+        raise
+    balance.default_service().apply_route(route.steps, executed, wallet)
+    return executed
+
+
+def _maybe_executed(exc: BaseException) -> bool:
+    """
+    Чи могла конвертація відбутися попри виняток: таймаут, обрив з'єднання або
+    5xx на acceptQuote. Відмова біржі з кодом (4xx), помилка котирування, вето
+    guard і відкритий breaker трапляються до виконання.
+    """
+
+    if not isinstance(exc, requests.RequestException):
+        return False
+    url = str(getattr(exc.request, "url", "") or "")
+    if url and "/convert/acceptQuote" not in url:
+        return False
+    status = int(getattr(exc.response, "status_code", 0) or 0)
+    return not (400 <= status < 500 and _extract_code(exc) is not None)
+
+
+def _run_claimed(
+    route: ConvertRoute,
+    amount: Amount | Decimal,
+    wallet: str,
+    tolerance: float,
+    run: Callable[[List[Dict[str, Any]]], Any],
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    ``run(executed)`` під claim дедупу; ``None`` — дубль. Якщо жоден крок не
+    виконано (відмова біржі, вето guard, breaker, business skip), claim
+    знімається. Невідомий результат acceptQuote (``_maybe_executed``) claim
+    залишає: повтор можливий лише після вікна дедупу.
+    """
+
+    steps = [f"{step.from_asset}->{step.to_asset}" for step in route.steps]
+    # дедуп окремо для кожного акаунта: однакові конвертації на різних субакаунтах — не дублі
+    scoped = accounts.scoped_wallet(wallet)
+    amount = Amount.parse(amount)
+    index = dedup.default_index()
+    if not index.claim(steps, scoped, amount, tolerance):
+        LOGGER.info("Skip duplicate convert %s (within %.2f%%)", route.description, tolerance * 100)
+        return None
+    executed: List[Dict[str, Any]] = []
+    unknown = False
+    try:
+        run(executed)
+    except Exception as exc:
+        unknown = not executed and _maybe_executed(exc)
+        if unknown:
+            LOGGER.warning("Keep dedup claim for %s: acceptQuote outcome unknown (%s)", route.description, exc)
+        raise
+    finally:
+        if not executed and not unknown:
+            index.release(steps, scoped, amount)
     return executed
 
 
 def execute_unique(
     route: ConvertRoute, amount: Decimal, wallet: str, tolerance: float = 0.01
 ) -> Optional[List[Dict[str, Any]]]:
-    key = json.dumps(
-        {
-            "route": [f"{step.from_asset}->{step.to_asset}" for step in route.steps],
-            "amount": float(amount),
-            "wallet": wallet,
-        },
-        sort_keys=True,
+    return _run_claimed(
+        route, amount, wallet, tolerance, lambda executed: execute_route(route, amount, wallet, executed=executed)
     )
-    for existing in list(_executed_keys):
-        try:
-            payload = json.loads(existing)
-        except Exception:
-            continue
-        if payload.get("wallet") != wallet:
-            continue
-        if payload.get("route") != [f"{step.from_asset}->{step.to_asset}" for step in route.steps]:
-            continue
-        prev_amount = float(payload.get("amount", 0.0))
-        if prev_amount <= 0:
-            continue
-        diff = abs(prev_amount - float(amount)) / prev_amount
-        if diff <= tolerance:
-            LOGGER.info("Skip duplicate convert %s (within %.2f%%)", route.description, tolerance * 100)
-            return None
-    _executed_keys.add(key)
-    return execute_route(route, amount, wallet)
+
+
+def accept_unique(
+    quote: ConvertQuote,
+    wallet: str = "SPOT",
+    tolerance: float = 0.01,
+    accept: Callable[[str], Optional[Dict[str, Any]]] = accept_quote,
+    budget: Optional[QuoteBudget] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Приймає вже отримане котирування (фаза trade після fan-out) тим самим
+    шляхом, що й ``execute_unique``: breaker пари, дедуп між процесами, guard,
+    облік у ``pair_health`` і знімку залишків; на 345231 — свіже котирування.
+    ``None`` — дубль або accept без результату (business skip). Тіньові
+    котирування конвеєра списуються з ``budget`` фази.
+    """
+
+    pair_health.default_health().check(quote.from_asset, quote.to_asset)
+    route = ConvertRoute((ConvertStep(quote.from_asset, quote.to_asset),))
+    amount = quote.from_amount.to_decimal()
+
+    def run(executed: List[Dict[str, Any]]) -> None:
+        result = _execute_single(quote.from_asset, quote.to_asset, amount, wallet, None, quote, accept, budget)
+        if result:
+            executed.append(result)
+            balance.default_service().apply_route(route.steps, executed, wallet)
+
+    executed = _run_claimed(route, amount, wallet, tolerance, run)
+    return executed[0] if executed else None
 
 
 def reset_dedup_cache() -> None:
-    _executed_keys.clear()
+    dedup.default_index().reset()
+
 
+def preferred_route(
+    from_assets: Iterable[str],
+    target: str,
+    amount: Optional[Decimal] = None,
+    wallet: str = "SPOT",
+    budget: Optional[QuoteBudget] = None,
+) -> Optional[ConvertRoute]:
+    """Перший актив з маршрутом до ``target``; з ``amount`` маршрут обирає ``best_route`` за живим курсом."""
 
-def preferred_route(from_assets: Iterable[str], target: str) -> Optional[ConvertRoute]:
     target = _normalise_asset(target)
     for asset in {_normalise_asset(a) for a in from_assets}:
         if not asset:
             continue
-        route = route_exists(asset, target)
+        route = route_exists(asset, target) if amount is None else best_route(asset, target, amount, wallet, budget)
         if route:
             return route
     return None
@@ -2,11 +2,12 @@ from __future__ import annotations
 
 import logging
 import time
-from decimal import Decimal, ROUND_DOWN
+from decimal import Decimal
 from typing import Any, Optional
 
 from . import convert_api as _real
-from .utils import rand_jitter
+from . import metrics, pair_health
+from .utils import norm8, rand_jitter
 from .convert_errors import classify
 
 log = logging.getLogger(__name__)
@@ -17,10 +18,7 @@ _orig_accept_quote = _real.accept_quote
 
 
 # Нормалізація до 8 знаків (вниз)
-def _norm8(x: Decimal) -> Decimal:
-    if not isinstance(x, Decimal):
-        x = Decimal(str(x))
-    return x.quantize(Decimal("0.00000001"), rounding=ROUND_DOWN)
+_norm8 = norm8
 
 
 def _wrapped_get_quote(
@@ -32,9 +30,19 @@ def _wrapped_get_quote(
 ):
     """
     Обгортка get_quote:
-    - нормалізує amount до 8 знаків (ROUND_DOWN) перед викликом.
+    - нормалізує amount до 8 знаків (ROUND_DOWN) перед викликом;
+    - бізнес-помилки пари йдуть у ``pair_health`` (circuit breaker).
     """
-    return _orig_get_quote(from_asset, to_asset, _norm8(amount), *args, **kwargs)
+    try:
+        quote = _orig_get_quote(from_asset, to_asset, _norm8(amount), *args, **kwargs)
+    except Exception as e:
+        metrics.inc("convert_calls_total", op="getQuote", result=classify(e))
+        pair_health.default_health().record_error(from_asset, to_asset, e)
+        raise
+    metrics.inc("convert_calls_total", op="getQuote", result="ok" if quote else "empty")
+    if quote:
+        pair_health.default_health().record_quote_success(from_asset, to_asset)
+    return quote
 
 
 def _wrapped_accept_quote(quote: Any, *args: Any, **kwargs: Any):
@@ -43,12 +51,16 @@ def _wrapped_accept_quote(quote: Any, *args: Any, **kwargs: Any):
     - приймає або рядковий quoteId, або об’єкт/словник з полем quoteId/quote_id;
     - при кодах -1021/-429 робить один ретрай із невеликим джитером;
     - при бізнес-кодах (-2010 тощо) — WARN+пропуск (повертає None);
-    - інакше — проброс помилки.
+    - інакше — проброс помилки;
+    - результат для пари (якщо quote — ConvertQuote) фіксується в ``pair_health``.
     """
     # Узгоджуємо ідентифікатор котирування
+    pair = None
     if isinstance(quote, str):
         pass_arg = quote
     else:
+        if getattr(quote, "from_asset", None) and getattr(quote, "to_asset", None):
+            pair = (quote.from_asset, quote.to_asset)
         qid: Optional[str] = None
         try:
             qid = getattr(quote, "quote_id", None) or getattr(quote, "quoteId", None)
@@ -62,12 +74,20 @@ def _wrapped_accept_quote(quote: Any, *args: Any, **kwargs: Any):
 
     # Перший виклик
     try:
-        return _orig_accept_quote(pass_arg, *args, **kwargs)
+        result = _orig_accept_quote(pass_arg, *args, **kwargs)
+        metrics.inc("convert_calls_total", op="acceptQuote", result="ok")
+        if pair:
+            pair_health.default_health().record_success(*pair)
+        return result
     except Exception as e:
         kind = classify(e)
+        metrics.inc("convert_calls_total", op="acceptQuote", result=kind)
+        if pair:
+            pair_health.default_health().record_error(pair[0], pair[1], e)
         if kind == "retry":
             # Невелика пауза з джитером і одна спроба повтору
             delay = rand_jitter(0.3, spread=0.2)  # ~0.24..0.36s
+            metrics.inc("convert_sleep_seconds_total", delay, reason="jitter")
             time.sleep(delay)
             return _orig_accept_quote(pass_arg, *args, **kwargs)
         if kind == "business":
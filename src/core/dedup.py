@@ -0,0 +1,214 @@
+"""
+Індекс ідемпотентності для ``execute_unique``.
+
+Ключ — (маршрут, гаманець), значення — відсортовані суми, тож перевірка
+допуску (за замовчуванням 1%) — це ``bisect``, а не перебір усіх ключів.
+Індекс підкріплено append-only журналом (JSONL) під ``flock``: фази
+asia/us та повторні ``cspot`` бачать виконання одне одного між процесами
+та перезапусками. Записи старші за ``DEDUP_WINDOW_SEC`` ігноруються.
+Claim, за яким нічого не виконано, знімається ``release`` (рядок-відміна
+в тому ж журналі), тож повтор упалої конвертації не вважається дублем.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from decimal import Decimal
+from fractions import Fraction
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import config_dev3 as config
+
+from .amounts import Amount
+
+DEFAULT_PATH = Path(
+    getattr(config, "DEDUP_JOURNAL_PATH", Path(__file__).resolve().parents[2] / "state" / "dedup_journal.jsonl")
+)
+# коротше за проміжок між запусками: вікна asia/us щодня, і trade з розподіленими
+# котируваннями наступного дня може настати раніше, ніж через 24 год — це не дубль
+_WINDOW_SEC: float = float(getattr(config, "DEDUP_WINDOW_SEC", 3600))
+# перезаписуємо журнал, коли прострочених рядків більше за живі й файл помітного розміру
+_COMPACT_MIN_BYTES = 256 * 1024
+
+DedupKey = Tuple[Tuple[str, ...], str]
+
+
+class DedupIndex:
+    """(маршрут, гаманець) -> відсортовані пари (сума, час виконання)."""
+
+    def __init__(self, path: str | os.PathLike[str] | None = None, window_sec: float = _WINDOW_SEC) -> None:
+        self.path = Path(path or DEFAULT_PATH)
+        self.window_sec = float(window_sec)
+        self._entries: Dict[DedupKey, List[Tuple[int, float]]] = {}
+        self._offset = 0
+        self._inode: Optional[int] = None
+        self._stale = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(route: Sequence[str], wallet: str) -> DedupKey:
+        return tuple(route), (wallet or "SPOT").upper()
+
+    def _cutoff(self) -> float:
+        return time.time() - self.window_sec
+
+    def _add(self, key: DedupKey, units: int, ts: float) -> None:
+        insort(self._entries.setdefault(key, []), (units, ts))
+
+    def _remove(self, key: DedupKey, units: int, ts: float) -> None:
+        """Прибирає найпізніший claim суми ``units``, зроблений не пізніше ``ts``."""
+
+        items = self._entries.get(key)
+        if not items:
+            return
+        idx = bisect_right(items, (units, ts)) - 1
+        if idx >= 0 and items[idx][0] == units:
+            del items[idx]
+
+    def _sync(self, fh) -> None:
+        """Дочитує нові рядки журналу (інших процесів) від останнього зсуву."""
+
+        st = os.fstat(fh.fileno())
+        if st.st_ino != self._inode or st.st_size < self._offset:
+            self._entries.clear()
+            self._offset, self._inode, self._stale = 0, st.st_ino, 0
+        fh.seek(self._offset)
+        cutoff = self._cutoff()
+        for line in fh:
+            if not line.endswith("\n"):
+                break
+            self._offset += len(line.encode())
+            try:
+                rec = json.loads(line)
+                ts = float(rec["ts"])
+                key = self.key(rec["route"], rec["wallet"])
+                units = Amount.parse(rec["amount"]).units
+            except (ValueError, KeyError, TypeError):
+                continue
+            if rec.get("release"):
+                self._remove(key, units, ts)
+                self._stale += 2
+                continue
+            if ts < cutoff:
+                self._stale += 1
+                continue
+            self._add(key, units, ts)
+
+    def _find(self, key: DedupKey, units: int, tolerance: float) -> Optional[int]:
+        """Сума (в одиницях 1e-8) в межах ``|prev - amount| / prev <= tolerance`` або ``None``."""
+
+        items = self._entries.get(key)
+        if not items or units <= 0:
+            return None
+        # межі точні в цілих одиницях: prev >= amount / (1 + tol), prev <= amount / (1 - tol)
+        tol = Fraction(str(tolerance))
+        lo = -((-units * tol.denominator) // (tol.denominator + tol.numerator))  # ceil
+        hi = (units * tol.denominator) // (tol.denominator - tol.numerator) if tol < 1 else None
+        cutoff = self._cutoff()
+        idx = bisect_left(items, (lo, float("-inf")))
+        while idx < len(items):
+            prev, ts = items[idx]
+            if hi is not None and prev > hi:
+                break
+            if ts >= cutoff and prev > 0:
+                return prev
+            idx += 1
+        return None
+
+    def _compact(self, fh) -> None:
+        cutoff = self._cutoff()
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp, "w") as out:
+            for (route, wallet), items in self._entries.items():
+                for units, ts in items:
+                    if ts >= cutoff:
+                        out.write(_record(route, wallet, Amount(units), ts))
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, self.path)
+        self._inode = None  # наступний _sync перечитає новий файл
+
+    def _append(self, fh, line: str) -> None:
+        fh.seek(0, os.SEEK_END)
+        fh.write(line)
+        fh.flush()
+        self._offset += len(line.encode())
+
+    def claim(self, route: Sequence[str], wallet: str, amount: Amount | Decimal | str, tolerance: float = 0.01) -> bool:
+        """
+        Атомарно (між потоками й процесами) перевіряє дубль і записує виконання.
+        ``False`` — така ж операція в межах допуску вже була.
+        """
+
+        key = self.key(route, wallet)
+        amount = Amount.parse(amount)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(self.path, "a+") as fh:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            try:
+                self._sync(fh)
+                if self._find(key, amount.units, tolerance) is not None:
+                    return False
+                ts = time.time()
+                self._append(fh, _record(key[0], key[1], amount, ts))
+                self._add(key, amount.units, ts)
+                if self._stale > sum(map(len, self._entries.values())) and self._offset > _COMPACT_MIN_BYTES:
+                    self._compact(fh)
+                return True
+            finally:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+    def release(self, route: Sequence[str], wallet: str, amount: Amount | Decimal | str) -> None:
+        """Знімає останній ``claim`` цієї операції: виконання не відбулося, повтор — не дубль."""
+
+        key = self.key(route, wallet)
+        amount = Amount.parse(amount)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(self.path, "a+") as fh:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            try:
+                self._sync(fh)
+                ts = time.time()
+                self._append(fh, _record(key[0], key[1], amount, ts, release=True))
+                self._remove(key, amount.units, ts)
+                self._stale += 2
+            finally:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+    def reset(self) -> None:
+        """Очищає індекс і журнал."""
+
+        with self._lock:
+            self._entries.clear()
+            self._offset, self._stale = 0, 0
+            if self.path.exists():
+                with open(self.path, "a") as fh:
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+                    fh.truncate(0)
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+def _record(route: Sequence[str], wallet: str, amount: Amount, ts: float, release: bool = False) -> str:
+    rec = {"ts": ts, "route": list(route), "wallet": wallet, "amount": str(amount)}
+    if release:
+        rec["release"] = True
+    return json.dumps(rec) + "\n"
+
+
+_default_index: DedupIndex | None = None
+_default_lock = threading.Lock()
+
+
+def default_index() -> DedupIndex:
+    global _default_index
+    if _default_index is None:
+        with _default_lock:
+            if _default_index is None:
+                _default_index = DedupIndex()
+    return _default_index
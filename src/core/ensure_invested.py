@@ -1 +1,271 @@
+"""
+Ребалансування до цільових ваг одним пакетом конвертацій.
 
+``plan_rebalance`` бере знімок залишків гаманця, ціни (USDT) і вектор
+цільових ваг і рахує відхилення кожного активу від цілі у USDT. Надлишки
+й нестачі зводяться між собою (netting) замість «продати все в USDT,
+купити з USDT»:
+
+1. спершу жадібно зводяться пари з прямим маршрутом Convert — щоразу
+   найбільший можливий потік, тож кожна нога закриває надлишок або
+   нестачу повністю і ніг не більше ``надлишки + нестачі - 1``;
+2. залишок іде маршрутами через хаб (``convert_api.route_exists``, з
+   урахуванням circuit breaker); сам хаб для виконання ``execute_plan``
+   обирає за живим курсом (``convert_api.best_route``).
+
+Нога, сума якої менша за ``fromAssetMinAmount`` першого кроку (або
+оцінка для кроку через хаб), пропускається; понад ``fromAssetMaxAmount``
+її поділить ``execute_conversion`` (``chunked``). Відхилення в межах
+``REBALANCE_BAND`` від вартості портфеля або менші за
+``REBALANCE_MIN_TRADE_USDT`` не торгуються.
+
+``execute_plan`` групує ноги за джерелом: жадібне зведення може розкласти
+один надлишок на кілька нестач, тож ноги з одного активу виконуються
+послідовно, а різні джерела — паралельно. Кожна нога списує лише свою
+частку залишку, проміжна сума хаба належить своїй нозі. Активи поза
+цільовими вагами не чіпаються; вага 0 — продати актив повністю.
+
+``REBALANCE_TARGETS`` у ``config_dev3``::
+
+    REBALANCE_TARGETS = {"BTC": 0.5, "ETH": 0.3, "USDT": 0.2}
+"""
+
+from __future__ import annotations
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import config_dev3 as config
+
+from . import balance, convert_api
+from .amounts import Amount
+from .convert_api import ConvertLimits, ConvertRoute
+from .utils import bind_context, decimal_from_any, norm8
+
+LOGGER = logging.getLogger(__name__)
+
+BAND: float = float(getattr(config, "REBALANCE_BAND", 0.01))
+MIN_TRADE_USDT: float = float(getattr(config, "REBALANCE_MIN_TRADE_USDT", 10))
+_WORKERS: int = int(getattr(config, "REBALANCE_WORKERS", 4))
+
+
+@dataclass
+class Leg:
+    """Одна конвертація плану: ``amount`` у одиницях ``from_asset``."""
+
+    from_asset: str
+    to_asset: str
+    amount: Decimal
+    value_usdt: float
+    route: ConvertRoute
+
+    @property
+    def label(self) -> str:
+        return f"{self.from_asset}->{self.to_asset}"
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "leg": self.label,
+            "amount": str(self.amount),
+            "value_usdt": round(self.value_usdt, 2),
+            "route": self.route.description,
+        }
+
+
+@dataclass
+class RebalancePlan:
+    total_usdt: float
+    deltas: Dict[str, float]  # asset -> ціль мінус поточна вартість (USDT)
+    legs: List[Leg] = field(default_factory=list)
+    skipped: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def quotes(self) -> int:
+        """Котирувань/accept на весь план (по одному на крок маршруту)."""
+
+        return sum(len(leg.route.steps) for leg in self.legs)
+
+    @property
+    def naive_quotes(self) -> int:
+        """Те саме для «по активу»: кожен надлишок — у USDT, кожна нестача — з USDT."""
+
+        return sum(1 for asset, delta in self.deltas.items() if delta and asset != "USDT")
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "total_usdt": round(self.total_usdt, 2),
+            "deltas": {a: round(d, 2) for a, d in self.deltas.items()},
+            "legs": [leg.as_dict() for leg in self.legs],
+            "skipped": self.skipped,
+            "quotes": self.quotes,
+            "naive_quotes": self.naive_quotes,
+        }
+
+
+def _normalise_targets(targets: Mapping[str, Any]) -> Dict[str, float]:
+    weights = {str(a).upper(): float(w) for a, w in targets.items()}
+    if any(w < 0 for w in weights.values()):
+        raise ValueError(f"negative target weight in {targets}")
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("target weights must sum to a positive value")
+    return {a: w / total for a, w in weights.items()}
+
+
+def plan_rebalance(
+    balances: Mapping[str, Any],
+    targets: Mapping[str, Any],
+    prices: Mapping[str, float],
+    *,
+    band: float = BAND,
+    min_trade_usdt: float = MIN_TRADE_USDT,
+    route_for: Optional[Callable[[str, str], Optional[ConvertRoute]]] = None,
+    limits_for: Optional[Callable[[str, str], ConvertLimits]] = None,
+) -> RebalancePlan:
+    """
+    План конвертацій від ``balances`` (``{asset: free}``) до ``targets``
+    (ваги, нормуються до 1) за цінами ``prices`` (USDT за одиницю).
+    ``route_for``/``limits_for`` — за замовчуванням ``convert_api``.
+    """
+
+    route_for = route_for or convert_api.route_exists
+    limits_for = limits_for or convert_api.limits_for_pair
+    weights = _normalise_targets(targets)
+    balances = {str(a).upper(): v for a, v in balances.items()}
+    missing = sorted(a for a in weights if not prices.get(a))
+    if missing:
+        raise ValueError(f"no price for {', '.join(missing)}")
+    held = {a: decimal_from_any(balances.get(a)) for a in weights}
+    values = {a: float(held[a]) * float(prices[a]) for a in weights}
+    total = sum(values.values())
+    threshold = max(min_trade_usdt, band * total)
+    deltas = {a: weights[a] * total - values[a] for a in weights}
+    plan = RebalancePlan(total, {a: (d if abs(d) >= threshold else 0.0) for a, d in deltas.items()})
+
+    surplus = {a: -d for a, d in plan.deltas.items() if d < 0}
+    deficit = {a: d for a, d in plan.deltas.items() if d > 0}
+    routes: Dict[Tuple[str, str], Optional[ConvertRoute]] = {(s, d): route_for(s, d) for s in surplus for d in deficit}
+
+    def match(direct_only: bool) -> None:
+        while True:
+            best: Optional[Tuple[float, str, str]] = None
+            for (s, d), route in routes.items():
+                if route is None or (direct_only and not route.is_direct):
+                    continue
+                flow = min(surplus.get(s, 0.0), deficit.get(d, 0.0))
+                if flow > 0 and (best is None or flow > best[0]):
+                    best = (flow, s, d)
+            if best is None:
+                return
+            flow, s, d = best
+            surplus[s] -= flow
+            deficit[d] -= flow
+            route = routes.pop((s, d))
+            assert route is not None
+            # вага 0 і надлишок вичерпано -> увесь залишок, без пилу від округлення
+            sell_all = weights[s] == 0 and surplus[s] <= 1e-9
+            amount = held[s] if sell_all else min(held[s], norm8(Decimal(repr(flow / prices[s]))))
+            _add_leg(plan, Leg(s, d, amount, flow, route), prices, limits_for)
+
+    match(direct_only=True)
+    match(direct_only=False)
+    for asset, left in list(surplus.items()) + list(deficit.items()):
+        if left >= threshold:
+            plan.skipped.append({"asset": asset, "value_usdt": round(left, 2), "reason": "no route"})
+    return plan
+
+
+def _add_leg(
+    plan: RebalancePlan, leg: Leg, prices: Mapping[str, float], limits_for: Callable[[str, str], ConvertLimits]
+) -> None:
+    for i, step in enumerate(leg.route.steps):
+        if i == 0:
+            amount = leg.amount
+        elif prices.get(step.from_asset):
+            amount = norm8(Decimal(repr(leg.value_usdt / prices[step.from_asset])))
+        else:
+            continue  # ціни хаба немає: мінімум перевірить сама біржа
+        minimum = limits_for(step.from_asset, step.to_asset).minimum
+        if minimum and Amount.parse(amount) < minimum:
+            reason = f"below minimum {minimum} {step.from_asset} on {step.from_asset}->{step.to_asset}"
+            plan.skipped.append(dict(leg.as_dict(), reason=reason))
+            return
+    plan.legs.append(leg)
+
+
+def execute_plan(plan: RebalancePlan, wallet: str = "SPOT", *, max_workers: int = _WORKERS) -> List[Dict[str, Any]]:
+    """
+    Виконує ноги (``execute_route``): групи за джерелом — паралельно, ноги
+    всередині групи — послідовно; помилка ноги не зупиняє інші.
+    """
+
+    from .quote_engine import QuoteBudget
+
+    budget = QuoteBudget()  # котирування вибору хабів — у межах QUOTE_BUDGET_PER_RUN
+
+    def run(leg: Leg) -> Dict[str, Any]:
+        try:
+            if not leg.route.is_direct:
+                # хаб для ноги обирається за живими котируваннями на момент виконання
+                leg.route = (
+                    convert_api.best_route(leg.from_asset, leg.to_asset, leg.amount, wallet, budget) or leg.route
+                )
+            orders = convert_api.execute_route(leg.route, leg.amount, wallet)
+        except Exception as exc:
+            LOGGER.error("rebalance %s failed: %s", leg.label, exc)
+            return dict(leg.as_dict(), error=str(exc))
+        return dict(leg.as_dict(), orders=[o.get("orderId") or o.get("orderIds") for o in orders if o])
+
+    if not plan.legs:
+        return []
+    groups: Dict[str, List[int]] = {}
+    for idx, leg in enumerate(plan.legs):
+        groups.setdefault(leg.from_asset, []).append(idx)
+
+    def run_group(indices: List[int]) -> List[Tuple[int, Dict[str, Any]]]:
+        return [(idx, run(plan.legs[idx])) for idx in indices]
+
+    results: List[Dict[str, Any]] = [{} for _ in plan.legs]
+    workers = max(1, min(max_workers, len(groups)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rebalance") as pool:
+        for done in pool.map(bind_context(run_group), groups.values()):
+            for idx, result in done:
+                results[idx] = result
+    return results
+
+
+def ensure_invested(
+    targets: Optional[Mapping[str, Any]] = None,
+    wallet: str = "SPOT",
+    *,
+    dry_run: bool = True,
+    balances: Optional[Mapping[str, Any]] = None,
+    prices: Optional[Mapping[str, float]] = None,
+) -> Dict[str, Any]:
+    """
+    Знімок залишків (``balance.default_service``) і ціни одним запитом
+    (``portfolio.fetch_prices``) -> план -> виконання (якщо не ``dry_run``).
+    """
+
+    targets = targets if targets is not None else getattr(config, "REBALANCE_TARGETS", None)
+    if not targets:
+        raise ValueError("no target weights (REBALANCE_TARGETS)")
+    wallet = (wallet or "SPOT").upper()
+    if balances is None:
+        balances = balance.default_service().snapshot().get(wallet, {})
+    if prices is None:
+        from .portfolio import fetch_prices
+
+        prices = fetch_prices(set(_normalise_targets(targets)) | set(convert_api.HUB_ASSETS))
+    plan = plan_rebalance(balances, targets, prices)
+    report = dict(plan.as_dict(), wallet=wallet, dry_run=bool(dry_run))
+    if plan.legs:
+        LOGGER.info(
+            "rebalance %s: %d leg(s), %d quote(s) instead of %d", wallet, len(plan.legs), plan.quotes, plan.naive_quotes
+        )
+    if not dry_run:
+        report["results"] = execute_plan(plan, wallet)
+    return report
@@ -0,0 +1,400 @@
+"""
+Структурований журнал подій поруч із текстовим логом.
+
+Події — JSONL-сегменти ``EVENT_LOG_DIR/events-<час>-<pid>-<n>.jsonl`` (кожен
+процес пише у власний сегмент, ротація за ``EVENT_LOG_SEGMENT_MB``) і
+спільний для процесів індекс SQLite (WAL) ``events.sqlite``: для кожної
+події — ``ts``, ``kind``, ``pair``, ``code``, ``quoteId``, ``orderId`` і
+``(segment, offset, length)``. ``query`` знаходить події за індексом і
+читає лише їхні рядки, без лінійного проходу сегментами.
+
+``emit`` на гарячому шляху лише кладе словник у чергу; серіалізацію,
+запис сегмента й індексу робить фоновий потік раз на
+``EVENT_LOG_FLUSH_SEC``. Подія ``acceptQuote`` не має пари в запиті — пару
+підставляє writer за ``quoteId`` з попереднього ``getQuote``.
+
+Джерела подій:
+
+- ``http`` — кожна відповідь ``/sapi/v1/convert/*`` (``binance_client``):
+  endpoint, статус, код помилки, quoteId/orderId, латентність;
+- ``log`` — записи logging від WARNING (``install`` додає handler);
+- ``phase`` — підсумок фази analyze/trade (``app.run_phase``).
+
+``install`` вмикає журнал для процесу (``src.cli``, ``src.app``,
+``src.daemon``); без нього ``emit`` — порожня операція.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import config_dev3 as config
+
+EVENT_DIR: str = str(getattr(config, "EVENT_LOG_DIR", Path(__file__).resolve().parents[2] / "state" / "events"))
+_SEGMENT_BYTES: int = int(float(getattr(config, "EVENT_LOG_SEGMENT_MB", 64)) * 1024 * 1024)
+_FLUSH_SEC: float = float(getattr(config, "EVENT_LOG_FLUSH_SEC", 1.0))
+_RETENTION_DAYS: float = float(getattr(config, "EVENT_LOG_RETENTION_DAYS", 30))
+
+INDEX_NAME = "events.sqlite"
+_QUOTE_PAIRS_MAX = 4096
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    ts       INTEGER NOT NULL,
+    kind     TEXT NOT NULL,
+    pair     TEXT,
+    code     INTEGER,
+    quote_id TEXT,
+    order_id TEXT,
+    segment  TEXT NOT NULL,
+    offset   INTEGER NOT NULL,
+    length   INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+CREATE INDEX IF NOT EXISTS events_pair ON events (pair, ts);
+CREATE INDEX IF NOT EXISTS events_code ON events (code, ts);
+CREATE INDEX IF NOT EXISTS events_quote ON events (quote_id);
+CREATE INDEX IF NOT EXISTS events_order ON events (order_id);
+"""
+
+
+def _connect(directory: Path) -> Any:
+    import sqlite3  # лише writer і query: не на шляху холодного старту
+
+    directory.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(directory / INDEX_NAME), timeout=5.0, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _int_or_none(value: Any) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def pair_key(from_asset: Any, to_asset: Any) -> Optional[str]:
+    if not from_asset or not to_asset:
+        return None
+    return f"{str(from_asset).upper()}/{str(to_asset).upper()}"
+
+
+class EventLog:
+    """Буферизований writer: ``emit`` не блокує, фоновий потік пише пачками."""
+
+    def __init__(
+        self,
+        directory: str | os.PathLike[str] | None = None,
+        *,
+        segment_bytes: int = _SEGMENT_BYTES,
+        flush_sec: float = _FLUSH_SEC,
+        retention_days: float = _RETENTION_DAYS,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.dir = Path(directory or EVENT_DIR)
+        self.segment_bytes = int(segment_bytes)
+        self.flush_sec = float(flush_sec)
+        self.retention_days = float(retention_days)
+        self.clock = clock
+        self.written = 0
+        self._queue: "queue.SimpleQueue[Dict[str, Any]]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._db: Any = None
+        self._segment: Optional[Any] = None
+        self._segment_name = ""
+        self._segment_seq = 0
+        self._quote_pairs: "OrderedDict[str, str]" = OrderedDict()
+
+    # --- гарячий шлях -------------------------------------------------------
+    def emit(self, kind: str, **fields: Any) -> None:
+        fields["kind"] = kind
+        fields.setdefault("ts", int(self.clock() * 1000))
+        self._queue.put(fields)
+        if self._thread is None:
+            self._start()
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._thread is None and not self._stop.is_set():
+                self._thread = threading.Thread(target=self._run, name="eventlog", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_sec):
+            self.flush()
+
+    # --- writer -------------------------------------------------------------
+    def flush(self) -> int:
+        """Записує все, що накопичилось у черзі; повертає кількість подій."""
+
+        batch: List[Dict[str, Any]] = []
+        with self._write_lock:
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception as exc:  # журнал не повинен валити торгівлю
+                    logging.getLogger(__name__).error("event log write failed (%d events): %s", len(batch), exc)
+                    return 0
+        return len(batch)
+
+    def _open(self) -> None:
+        if self._db is None:
+            self._db = _connect(self.dir)
+            self.prune()
+        if self._segment is None or self._segment.tell() >= self.segment_bytes:
+            if self._segment is not None:
+                self._segment.close()
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+            self._segment_seq += 1  # кілька ротацій за секунду не дописують у той самий файл
+            self._segment_name = f"events-{stamp}-{os.getpid()}-{self._segment_seq}.jsonl"
+            self._segment = open(self.dir / self._segment_name, "ab")
+
+    def _write(self, batch: Sequence[Dict[str, Any]]) -> None:
+        self._open()
+        assert self._segment is not None
+        offset = self._segment.tell()
+        lines: List[bytes] = []
+        rows: List[Tuple[Any, ...]] = []
+        for event in batch:
+            quote_id, order_id = event.get("quoteId"), event.get("orderId")
+            pair = event.get("pair")
+            if quote_id and pair:
+                self._quote_pairs[str(quote_id)] = pair
+                if len(self._quote_pairs) > _QUOTE_PAIRS_MAX:
+                    self._quote_pairs.popitem(last=False)
+            elif quote_id and not pair:
+                pair = event["pair"] = self._quote_pairs.get(str(quote_id))
+            line = (json.dumps(event, ensure_ascii=False, separators=(",", ":"), default=str) + "\n").encode()
+            rows.append(
+                (
+                    int(event["ts"]),
+                    event["kind"],
+                    pair,
+                    _int_or_none(event.get("code")),
+                    str(quote_id) if quote_id else None,
+                    str(order_id) if order_id else None,
+                    self._segment_name,
+                    offset,
+                    len(line),
+                )
+            )
+            lines.append(line)
+            offset += len(line)
+        # спершу дані, потім індекс: індекс ніколи не вказує за кінець сегмента
+        self._segment.write(b"".join(lines))
+        self._segment.flush()
+        self._db.execute("BEGIN")
+        try:
+            self._db.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+        self.written += len(rows)
+
+    def prune(self) -> List[str]:
+        """Видаляє сегменти, всі події яких старші за ``retention_days``."""
+
+        if self.retention_days <= 0 or self._db is None:
+            return []
+        cutoff = int((self.clock() - self.retention_days * 86400) * 1000)
+        old = [
+            row[0]
+            for row in self._db.execute("SELECT segment FROM events GROUP BY segment HAVING MAX(ts) < ?", (cutoff,))
+        ]
+        for name in old:
+            self._db.execute("DELETE FROM events WHERE segment = ?", (name,))
+            try:
+                os.unlink(self.dir / name)
+            except FileNotFoundError:
+                pass
+        return old
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+        with self._write_lock:
+            if self._segment is not None:
+                self._segment.close()
+                self._segment = None
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class EventLogHandler(logging.Handler):
+    """Записи logging (за замовчуванням від WARNING) як події ``log``."""
+
+    def __init__(self, log: EventLog, level: int = logging.WARNING) -> None:
+        super().__init__(level)
+        self.log = log
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if record.name == __name__:
+            return
+        try:
+            message = record.getMessage()
+        except Exception:
+            message = str(record.msg)
+        self.log.emit("log", ts=int(record.created * 1000), level=record.levelname, logger=record.name, msg=message)
+
+
+# --- запити ------------------------------------------------------------------
+def _parse_pair(value: str) -> str:
+    value = value.upper().replace("->", "/")
+    from_asset, _, to_asset = value.partition("/")
+    return f"{from_asset.strip()}/{to_asset.strip()}"
+
+
+def _where(
+    *,
+    kind: Optional[str] = None,
+    pair: Optional[str] = None,
+    code: Optional[int] = None,
+    quote_id: Optional[str] = None,
+    order_id: Optional[str] = None,
+    since_ms: Optional[int] = None,
+    until_ms: Optional[int] = None,
+) -> Tuple[str, List[Any]]:
+    clauses: List[str] = []
+    args: List[Any] = []
+    for column, value in (
+        ("quote_id", quote_id),
+        ("order_id", order_id),
+        ("pair", pair),
+        ("code", code),
+        ("kind", kind),
+    ):
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            args.append(_parse_pair(value) if column == "pair" else value)
+    if since_ms is not None:
+        clauses.append("ts >= ?")
+        args.append(int(since_ms))
+    if until_ms is not None:
+        clauses.append("ts <= ?")
+        args.append(int(until_ms))
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+
+def query(
+    directory: str | os.PathLike[str] | None = None,
+    *,
+    limit: int = 1000,
+    **filters: Any,
+) -> List[Dict[str, Any]]:
+    """
+    Події за фільтрами ``kind``/``pair`` (``BTC/USDT`` або ``BTC->USDT``)/
+    ``code``/``quote_id``/``order_id``/``since_ms``/``until_ms`` у порядку часу.
+    """
+
+    directory = Path(directory or EVENT_DIR)
+    if not (directory / INDEX_NAME).exists():
+        return []
+    where, args = _where(**filters)
+    conn = _connect(directory)
+    try:
+        rows = conn.execute(
+            f"SELECT segment, offset, length FROM events{where} ORDER BY ts LIMIT ?", (*args, int(limit))
+        ).fetchall()
+    finally:
+        conn.close()
+    return list(_read(directory, rows))
+
+
+def explain(directory: str | os.PathLike[str] | None = None, **filters: Any) -> List[str]:
+    """План SQLite для ``query`` з тими самими фільтрами (перевірка, що йде індекс)."""
+
+    where, args = _where(**filters)
+    conn = _connect(Path(directory or EVENT_DIR))
+    try:
+        plan = conn.execute(f"EXPLAIN QUERY PLAN SELECT segment, offset, length FROM events{where} ORDER BY ts", args)
+        return [str(row[-1]) for row in plan]
+    finally:
+        conn.close()
+
+
+def _read(directory: Path, rows: Iterable[Tuple[str, int, int]]) -> Iterable[Dict[str, Any]]:
+    handles: Dict[str, Any] = {}
+    try:
+        for segment, offset, length in rows:
+            fh = handles.get(segment)
+            if fh is None:
+                try:
+                    fh = handles[segment] = open(directory / segment, "rb")
+                except FileNotFoundError:
+                    continue
+            fh.seek(offset)
+            yield json.loads(fh.read(length))
+    finally:
+        for fh in handles.values():
+            fh.close()
+
+
+# --- процес ------------------------------------------------------------------
+_default_log: Optional[EventLog] = None
+_default_handler: Optional[EventLogHandler] = None
+_default_lock = threading.Lock()
+
+
+def install(directory: str | os.PathLike[str] | None = None) -> Optional[EventLog]:
+    """Вмикає журнал для процесу: ``emit`` + handler на root logger + flush при виході."""
+
+    global _default_log, _default_handler
+    directory = directory if directory is not None else EVENT_DIR
+    if not directory:
+        return None
+    with _default_lock:
+        if _default_log is None:
+            _default_log = EventLog(directory)
+            _default_handler = EventLogHandler(_default_log)
+            logging.getLogger().addHandler(_default_handler)
+            atexit.register(_default_log.close)
+        return _default_log
+
+
+def default_log() -> Optional[EventLog]:
+    return _default_log
+
+
+def set_default_log(log: Optional[EventLog]) -> None:
+    """Замінює журнал процесу (тести); ``None`` — вимикає ``emit`` і handler."""
+
+    global _default_log, _default_handler
+    with _default_lock:
+        if _default_handler is not None:
+            logging.getLogger().removeHandler(_default_handler)
+            _default_handler = None
+        _default_log = log
+        if log is not None:
+            _default_handler = EventLogHandler(log)
+            logging.getLogger().addHandler(_default_handler)
+
+
+def emit(kind: str, **fields: Any) -> None:
+    log = _default_log
+    if log is not None:
+        log.emit(kind, **fields)
@@ -1 +1,457 @@
+"""
+Ризик-гард на потоці виконань (fills).
 
+Кожен прийнятий accept (крок ``execute_route``/``convert_now``, частина
+``execute_chunked``, accept фази trade) подається в ``RiskGuard.on_fill`` і
+оновлює агрегати за O(1):
+
+- ``exposure`` — нетто-вартість (USDT за цінами виконань) нестабільних активів,
+  набраних через Convert, і її сума по додатних позиціях;
+- ``turnover`` — обіг у USDT за ковзне вікно ``GUARD_TURNOVER_WINDOW_SEC``
+  (кільце з ``_BUCKETS`` кошиків, фіксований розмір);
+- ``value``/``peak``/``drawdown`` — оцінка портфеля (``seed`` з
+  ``Portfolio.mark``), скоригована на різницю вартості віддано/отримано.
+  Поки гард не засіяно (``seeded``), просідання не перевіряється: P&L від
+  нуля — не частка портфеля. ``seed_from_portfolio`` засіває на старті фази
+  trade і перед першим ``execute_route``.
+
+``check`` перед кожним acceptQuote рахує лише кілька арифметичних операцій
+над цими агрегатами і повертає причину вето (``GuardVeto`` у ``enforce``).
+Вихід у стейбли (зниження ризику) не ветується просіданням чи експозицією.
+
+Стан: кожен fill дописується рядком у ``quote_guard/fills.jsonl`` (append-only,
+інші процеси дочитують хвіст), а компактний знімок агрегатів із зсувом журналу
+раз на ``GUARD_SNAPSHOT_EVERY`` fills атомарно перезаписує
+``quote_guard/state.json`` (tempfile + ``os.replace``). Акаунт з власними
+ключами має окремий гард ``quote_guard/<account>/state.json`` (``guard_for``),
+поточний через ``use_guard`` так само, як клієнт і залишки акаунта. Завантаження — знімок
+плюс хвіст журналу після зсуву. Усе — під ``flock`` окремого
+``fills.jsonl.lock`` (як ``pair_health``): журнал відкривається вже під ним,
+тож ротація журналу (новий inode) не ламає взаємного виключення; процес, що
+побачив новий inode, перечитує знімок, який уже містить увесь старий журнал.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterator, List, Mapping, Optional
+
+import config_dev3 as config
+
+from .utils import STABLE_ASSETS
+
+LOGGER = logging.getLogger(__name__)
+
+STATE_PATH = Path(
+    getattr(config, "GUARD_STATE_PATH", Path(__file__).resolve().parents[2] / "quote_guard" / "state.json")
+)
+MAX_EXPOSURE_USDT: float = float(getattr(config, "GUARD_MAX_EXPOSURE_USDT", 0))
+MAX_ASSET_EXPOSURE_USDT: float = float(getattr(config, "GUARD_MAX_ASSET_EXPOSURE_USDT", 0))
+MAX_TURNOVER_USDT: float = float(getattr(config, "GUARD_MAX_TURNOVER_USDT", 0))
+MAX_DRAWDOWN: float = float(getattr(config, "GUARD_MAX_DRAWDOWN", 0))
+TURNOVER_WINDOW_SEC: float = float(getattr(config, "GUARD_TURNOVER_WINDOW_SEC", 24 * 3600))
+SNAPSHOT_EVERY: int = int(getattr(config, "GUARD_SNAPSHOT_EVERY", 50))
+
+_BUCKETS = 24
+# журнал перевідкривається (новий inode) після знімка, коли більший за це
+_ROTATE_BYTES = 1024 * 1024
+
+
+class GuardVeto(RuntimeError):
+    """Accept заблоковано ризик-гардом; ``reason`` — яке обмеження."""
+
+    def __init__(self, reason: str) -> None:
+        super().__init__(f"risk guard veto: {reason}")
+        self.reason = reason
+
+
+def _amounts(result: Mapping[str, Any]) -> tuple[float, float]:
+    quote = result.get("quote") if isinstance(result.get("quote"), Mapping) else {}
+    src = quote or result
+    from_amount = src.get("fromAmount") or result.get("fromAmount") or 0
+    to_amount = src.get("toAmount") or src.get("toAmountExpected") or result.get("toAmount") or 0
+    return float(from_amount), float(to_amount)
+
+
+class RiskGuard:
+    """Агрегати експозиції/обігу/просідання з O(1) оновленням на fill і O(1) перевіркою."""
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str] | None = None,
+        *,
+        max_exposure: float = MAX_EXPOSURE_USDT,
+        max_asset_exposure: float = MAX_ASSET_EXPOSURE_USDT,
+        max_turnover: float = MAX_TURNOVER_USDT,
+        max_drawdown: float = MAX_DRAWDOWN,
+        window_sec: float = TURNOVER_WINDOW_SEC,
+        snapshot_every: int = SNAPSHOT_EVERY,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = Path(path or STATE_PATH)
+        self.journal_path = self.path.with_name("fills.jsonl")
+        self.max_exposure = float(max_exposure)
+        self.max_asset_exposure = float(max_asset_exposure)
+        self.max_turnover = float(max_turnover)
+        self.max_drawdown = float(max_drawdown)
+        self.bucket_sec = max(1.0, float(window_sec) / _BUCKETS)
+        self.snapshot_every = max(1, int(snapshot_every))
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._reset_state()
+        self._journal_offset = 0
+        self._journal_inode: Optional[int] = None
+        self._since_snapshot = 0
+        self._loaded = False
+
+    def _reset_state(self) -> None:
+        self.prices: Dict[str, float] = {}
+        self.exposure: Dict[str, float] = {}
+        self.total_exposure = 0.0
+        self._buckets: List[float] = [0.0] * _BUCKETS
+        self._bucket_epoch = 0  # номер останнього кошика, що містить дані
+        self.turnover_sum = 0.0
+        self.value = 0.0
+        self.peak = 0.0
+        self.seeded = False
+        self.fills = 0
+
+    # ----- агрегати -----
+    def price(self, asset: str) -> Optional[float]:
+        return 1.0 if asset in STABLE_ASSETS else self.prices.get(asset)
+
+    def _advance(self, now: float) -> None:
+        """Зсуває кільце обігу до ``now``; прострочені кошики обнуляються (не більше ``_BUCKETS`` кроків)."""
+
+        epoch = int(now // self.bucket_sec)
+        gap = epoch - self._bucket_epoch
+        if gap <= 0:
+            return
+        for step in range(1, min(gap, _BUCKETS) + 1):
+            idx = (self._bucket_epoch + step) % _BUCKETS
+            self.turnover_sum -= self._buckets[idx]
+            self._buckets[idx] = 0.0
+        self._bucket_epoch = epoch
+        if gap >= _BUCKETS:
+            self.turnover_sum = 0.0
+
+    @property
+    def drawdown(self) -> float:
+        return max(0.0, (self.peak - self.value) / self.peak) if self.peak > 0 else 0.0
+
+    def turnover(self, now: Optional[float] = None) -> float:
+        with self._lock:
+            self._advance(self.clock() if now is None else now)
+            return self.turnover_sum
+
+    def _notional(self, from_asset: str, to_asset: str, from_amount: float, to_amount: float) -> tuple[float, float]:
+        """(вартість відданого, вартість отриманого) у USDT; невідома ціна -> за іншою стороною."""
+
+        pf, pt = self.price(from_asset), self.price(to_asset)
+        given = from_amount * pf if pf is not None else None
+        got = to_amount * pt if pt is not None else None
+        if given is None:
+            given = got or 0.0
+        if got is None:
+            got = given
+        return given, got
+
+    def _apply(self, from_asset: str, to_asset: str, from_amount: float, to_amount: float, ts: float) -> None:
+        # оцінка за попередніми цінами: різниця і є втратою/виграшем на виконанні
+        given, got = self._notional(from_asset, to_asset, from_amount, to_amount)
+        # нова ціна нестабільної сторони з виконання відносно стейбла
+        if from_asset in STABLE_ASSETS and to_amount > 0 and to_asset not in STABLE_ASSETS:
+            self.prices[to_asset] = from_amount / to_amount
+        elif to_asset in STABLE_ASSETS and from_amount > 0 and from_asset not in STABLE_ASSETS:
+            self.prices[from_asset] = to_amount / from_amount
+        for asset, delta in ((from_asset, -given), (to_asset, got)):
+            if asset in STABLE_ASSETS:
+                continue
+            old = self.exposure.get(asset, 0.0)
+            new = old + delta
+            self.exposure[asset] = new
+            self.total_exposure += max(0.0, new) - max(0.0, old)
+        self._advance(ts)
+        idx = int(ts // self.bucket_sec) % _BUCKETS
+        if int(ts // self.bucket_sec) > self._bucket_epoch - _BUCKETS:
+            self._buckets[idx] += given
+            self.turnover_sum += given
+        self.value += got - given
+        self.peak = max(self.peak, self.value)
+        self.fills += 1
+
+    # ----- перевірка -----
+    def check(self, from_asset: str, to_asset: str, from_amount: Any, to_amount: Any = 0) -> Optional[str]:
+        """Причина вето для обміну ``from_amount`` -> ``to_amount`` або ``None``."""
+
+        from_asset, to_asset = from_asset.upper(), to_asset.upper()
+        given, got = self._notional(from_asset, to_asset, float(from_amount or 0), float(to_amount or 0))
+        with self._lock:
+            self._advance(self.clock())
+            if self.max_turnover > 0 and self.turnover_sum + given > self.max_turnover:
+                return f"turnover {self.turnover_sum + given:.2f} > {self.max_turnover:.2f} USDT"
+            if to_asset in STABLE_ASSETS:
+                return None  # зниження ризику дозволене завжди
+            if self.max_drawdown > 0 and self.seeded and self.drawdown >= self.max_drawdown:
+                return f"drawdown {self.drawdown:.2%} >= {self.max_drawdown:.2%}"
+            asset_after = self.exposure.get(to_asset, 0.0) + got
+            if self.max_asset_exposure > 0 and asset_after > self.max_asset_exposure:
+                return f"{to_asset} exposure {asset_after:.2f} > {self.max_asset_exposure:.2f} USDT"
+            if self.max_exposure > 0:
+                total = self.total_exposure + max(0.0, asset_after) - max(0.0, self.exposure.get(to_asset, 0.0))
+                if from_asset not in STABLE_ASSETS:
+                    released = self.exposure.get(from_asset, 0.0)
+                    total += max(0.0, released - given) - max(0.0, released)
+                if total > self.max_exposure:
+                    return f"exposure {total:.2f} > {self.max_exposure:.2f} USDT"
+        return None
+
+    def enforce(self, quote: Any) -> None:
+        """``check`` для ``ConvertQuote``; ``GuardVeto`` при порушенні."""
+
+        reason = self.check(quote.from_asset, quote.to_asset, quote.from_amount, quote.to_amount)
+        if reason:
+            raise GuardVeto(reason)
+
+    # ----- потік виконань -----
+    def _apply_event(self, ev: Mapping[str, Any]) -> None:
+        if "seed" in ev:
+            self.value = float(ev["seed"])
+            # пік із P&L до першого seed не має сенсу
+            self.peak = max(self.peak, self.value) if self.seeded else self.value
+            self.seeded = True
+            return
+        self._apply(ev["from"], ev["to"], float(ev["fromAmount"]), float(ev["toAmount"]), float(ev["ts"]))
+
+    def _record(self, event: Dict[str, Any]) -> None:
+        """Дописує подію в журнал під ``flock`` і застосовує її; раз на ``snapshot_every`` — знімок."""
+
+        with self._journal(fcntl.LOCK_EX) as fh:
+            self._load_locked(fh)
+            line = json.dumps(event, separators=(",", ":")) + "\n"
+            fh.seek(0, os.SEEK_END)
+            fh.write(line)
+            fh.flush()
+            self._journal_offset += len(line.encode())
+            self._apply_event(event)
+            self._since_snapshot += 1
+            if self._since_snapshot >= self.snapshot_every:
+                self._snapshot_locked()
+
+    def seed(self, value: float) -> None:
+        """Оцінка портфеля (напр. ``Portfolio.mark().value``) як база для просідання."""
+
+        self._record({"ts": round(self.clock(), 3), "seed": float(value)})
+
+    def seed_from_portfolio(self, wallet: str = "SPOT", *, force: bool = False) -> None:
+        """
+        ``seed`` оцінкою залишків ``wallet`` за цінами ``/api/v3/ticker/price``.
+
+        Лише коли задано ``max_drawdown``; без ``force`` — тільки для ще не
+        засіяного гарда. Помилка оцінки не зупиняє торгівлю: гард лишається
+        незасіяним і просідання не перевіряє.
+        """
+
+        if self.max_drawdown <= 0 or (self.seeded and not force):
+            return
+        from . import balance
+        from .portfolio import Portfolio, fetch_prices
+
+        try:
+            held = {a: float(v) for a, v in balance.default_service().snapshot().get(wallet.upper(), {}).items() if v}
+            book = Portfolio.from_state({"assets": held})
+            value = book.mark(fetch_prices(held)).value
+        except Exception as exc:  # оцінка не критична для виконання
+            LOGGER.warning("risk guard seed failed: %s", exc)
+            return
+        self.seed(value)
+
+    def update_prices(self, prices: Mapping[str, Any]) -> None:
+        with self._lock:
+            self.prices.update({a.upper(): float(p) for a, p in prices.items() if p})
+
+    def on_fill(self, from_asset: str, to_asset: str, result: Optional[Mapping[str, Any]]) -> None:
+        """Застосовує результат accept; порожній/неповний результат ігнорується."""
+
+        if not isinstance(result, Mapping):
+            return
+        from_amount, to_amount = _amounts(result)
+        if from_amount <= 0 and to_amount <= 0:
+            return
+        self._record(
+            {
+                "ts": round(self.clock(), 3),
+                "from": from_asset.upper(),
+                "to": to_asset.upper(),
+                "fromAmount": from_amount,
+                "toAmount": to_amount,
+            }
+        )
+
+    def on_route(self, steps: Any, results: Any) -> None:
+        for step, result in zip(steps, results, strict=False):  # обірваний маршрут: лише виконані кроки
+            self.on_fill(step.from_asset, step.to_asset, result)
+
+    # ----- стан на диску -----
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "prices": self.prices,
+            "exposure": self.exposure,
+            "buckets": self._buckets,
+            "bucket_epoch": self._bucket_epoch,
+            "value": self.value,
+            "peak": self.peak,
+            "seeded": self.seeded,
+            "fills": self.fills,
+            "journal": {"inode": self._journal_inode, "offset": self._journal_offset},
+        }
+
+    def _restore(self, state: Mapping[str, Any]) -> None:
+        self._reset_state()
+        self.prices = {k: float(v) for k, v in (state.get("prices") or {}).items()}
+        self.exposure = {k: float(v) for k, v in (state.get("exposure") or {}).items()}
+        self.total_exposure = sum(max(0.0, v) for v in self.exposure.values())
+        buckets = [float(v) for v in state.get("buckets") or []]
+        if len(buckets) == _BUCKETS:
+            self._buckets = buckets
+            self.turnover_sum = sum(buckets)
+        self._bucket_epoch = int(state.get("bucket_epoch") or 0)
+        self.value = float(state.get("value") or 0.0)
+        self.peak = float(state.get("peak") or 0.0)
+        self.seeded = bool(state.get("seeded"))
+        self.fills = int(state.get("fills") or 0)
+
+    @contextmanager
+    def _journal(self, mode: int) -> Iterator[IO[str]]:
+        """Журнал, відкритий під ``flock`` файлу ``fills.jsonl.lock`` (той самий inode, що й після ротації)."""
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        lock_path = self.journal_path.with_suffix(self.journal_path.suffix + ".lock")
+        with self._lock, open(lock_path, "a") as lock:
+            fcntl.flock(lock.fileno(), mode)
+            try:
+                with open(self.journal_path, "a+") as fh:
+                    yield fh
+            finally:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def _load_locked(self, fh) -> None:
+        """
+        Знімок + рядки журналу, дописані після нього (у т.ч. іншими процесами).
+
+        Знімок читається при першому завантаженні та після ротації журналу
+        іншим процесом (новий inode): тоді знімок уже містить увесь старий журнал.
+        """
+
+        st = os.fstat(fh.fileno())
+        if not self._loaded or st.st_ino != self._journal_inode:
+            try:
+                with open(self.path, "r", encoding="utf-8") as snap:
+                    state = json.load(snap)
+            except (FileNotFoundError, ValueError):
+                state = {}
+            state = state if isinstance(state, dict) else {}
+            self._restore(state)
+            journal = state.get("journal") or {}
+            same = journal.get("inode") == st.st_ino and int(journal.get("offset") or 0) <= st.st_size
+            self._journal_offset = int(journal.get("offset") or 0) if same else 0
+            self._journal_inode = st.st_ino
+            self._loaded = True
+        if st.st_size <= self._journal_offset:
+            return
+        fh.seek(self._journal_offset)
+        for line in fh:
+            if not line.endswith("\n"):
+                break
+            self._journal_offset += len(line.encode())
+            try:
+                self._apply_event(json.loads(line))
+            except (ValueError, KeyError, TypeError):
+                continue
+
+    def _snapshot_locked(self) -> None:
+        if self._journal_offset > _ROTATE_BYTES:
+            # знімок уже містить увесь журнал: новий порожній файл (новий inode)
+            fd, tmp = tempfile.mkstemp(prefix="fills.", suffix=".tmp", dir=str(self.path.parent))
+            os.close(fd)
+            self._write_snapshot()
+            os.replace(tmp, self.journal_path)
+            self._journal_inode, self._journal_offset = os.stat(self.journal_path).st_ino, 0
+        self._write_snapshot()
+        self._since_snapshot = 0
+
+    def _write_snapshot(self) -> None:
+        fd, tmp = tempfile.mkstemp(prefix=self.path.name + ".", suffix=".tmp", dir=str(self.path.parent))
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(self.to_state(), fh, separators=(",", ":"))
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def load(self) -> "RiskGuard":
+        """Підтягує стан з диска (знімок + хвіст журналу)."""
+
+        with self._journal(fcntl.LOCK_SH) as fh:
+            self._load_locked(fh)
+        return self
+
+    def flush(self) -> None:
+        """Примусовий знімок (кінець фази)."""
+
+        if not self._loaded:
+            return
+        with self._journal(fcntl.LOCK_EX) as fh:
+            self._load_locked(fh)
+            self._snapshot_locked()
+
+
+_default_guard: RiskGuard | None = None
+_default_lock = threading.Lock()
+_context_guard: ContextVar[Optional[RiskGuard]] = ContextVar("risk_guard", default=None)
+
+
+def default_guard() -> RiskGuard:
+    guard = _context_guard.get()
+    if guard is not None:
+        return guard
+    global _default_guard
+    if _default_guard is None:
+        with _default_lock:
+            if _default_guard is None:
+                _default_guard = RiskGuard().load()
+    return _default_guard
+
+
+def set_default_guard(guard: RiskGuard | None) -> None:
+    global _default_guard
+    _default_guard = guard
+
+
+def guard_for(name: str) -> RiskGuard:
+    """Гард акаунта ``name``: власні журнал і знімок у підкаталозі поруч зі спільним."""
+
+    base = _default_guard.path if _default_guard is not None else STATE_PATH
+    return RiskGuard(base.parent / name / base.name).load()
+
+
+@contextmanager
+def use_guard(guard: RiskGuard) -> Iterator[RiskGuard]:
+    token = _context_guard.set(guard)
+    try:
+        yield guard
+    finally:
+        _context_guard.reset(token)
@@ -0,0 +1,216 @@
+"""
+Локальний журнал Convert-ордерів (SQLite) з інкрементальною синхронізацією tradeFlow.
+
+- пам'ятає синхронізований інтервал ``[synced_from, synced_until]`` і останній
+  ``createTime``: наступний ``sync`` тягне лише нові сторінки (плюс догрузку
+  старішого інтервалу, якщо його попросили вперше);
+- вікна понад 30 днів ріжуться на частини, сторінки з ``moreData`` — навпіл;
+- ``orderStatus`` запитується лише для ордерів без фінального статусу,
+  паралельно й пачкою;
+- ``query`` відповідає з індексу за ``create_time`` без мережі.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import config_dev3 as config
+
+from . import convert_api
+from .utils import bind_context
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_PATH = Path(
+    getattr(config, "LEDGER_PATH", Path(__file__).resolve().parents[2] / "state" / "convert_ledger.sqlite")
+)
+_PAGE_LIMIT = 1000
+_MAX_WINDOW_MS = 30 * 24 * 3600 * 1000
+# ордери можуть з'являтися у tradeFlow із запізненням — перекриваємо хвіст
+_OVERLAP_MS = 5 * 60 * 1000
+_STATUS_WORKERS = int(getattr(config, "LEDGER_STATUS_WORKERS", 4))
+FINAL_STATUSES = {"SUCCESS", "FAIL", "FAILED", "EXPIRED", "CANCELED"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    order_id    TEXT PRIMARY KEY,
+    create_time INTEGER NOT NULL,
+    from_asset  TEXT,
+    to_asset    TEXT,
+    from_amount TEXT,
+    to_amount   TEXT,
+    ratio       TEXT,
+    status      TEXT,
+    payload     TEXT NOT NULL,
+    detail      TEXT
+);
+CREATE INDEX IF NOT EXISTS orders_create_time ON orders (create_time);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key   TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+class Ledger:
+    def __init__(self, path: str | os.PathLike[str] | None = None) -> None:
+        self.path = Path(path or DEFAULT_PATH)
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    # --- стан синхронізації ---------------------------------------------------------
+    def state(self) -> Dict[str, int]:
+        return dict(self._conn().execute("SELECT key, value FROM sync_state"))
+
+    def _set_state(self, **values: int) -> None:
+        self._conn().executemany("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", list(values.items()))
+
+    # --- запис ---------------------------------------------------------------------
+    def upsert(self, rows: Iterable[Dict[str, Any]]) -> int:
+        records = []
+        for row in rows:
+            order_id = str(row.get("orderId") or "")
+            if not order_id:
+                continue
+            records.append(
+                (
+                    order_id,
+                    int(row.get("createTime") or 0),
+                    row.get("fromAsset"),
+                    row.get("toAsset"),
+                    str(row.get("fromAmount", "")),
+                    str(row.get("toAmount", "")),
+                    str(row.get("ratio", "")),
+                    row.get("orderStatus"),
+                    json.dumps(row, separators=(",", ":")),
+                )
+            )
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # detail зберігаємо, якщо статус не змінився
+            conn.executemany(
+                """
+                INSERT INTO orders (order_id, create_time, from_asset, to_asset, from_amount, to_amount, ratio, status, payload)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(order_id) DO UPDATE SET
+                    create_time=excluded.create_time, from_asset=excluded.from_asset, to_asset=excluded.to_asset,
+                    from_amount=excluded.from_amount, to_amount=excluded.to_amount, ratio=excluded.ratio,
+                    payload=excluded.payload,
+                    detail=CASE WHEN orders.status IS excluded.status THEN orders.detail ELSE NULL END,
+                    status=excluded.status
+                """,
+                records,
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(records)
+
+    def set_details(self, details: Dict[str, Dict[str, Any]]) -> None:
+        self._conn().executemany(
+            "UPDATE orders SET detail=?, status=COALESCE(?, status) WHERE order_id=?",
+            [(json.dumps(d, separators=(",", ":")), d.get("orderStatus"), oid) for oid, d in details.items()],
+        )
+
+    # --- синхронізація ---------------------------------------------------------------
+    def _fetch_window(self, start: int, end: int, fetch: Callable[..., Any]) -> List[Dict[str, Any]]:
+        payload = fetch(start, end, _PAGE_LIMIT)
+        rows = payload.get("list", []) if isinstance(payload, dict) else list(payload or [])
+        more = bool(payload.get("moreData")) if isinstance(payload, dict) else len(rows) >= _PAGE_LIMIT
+        if more and end - start > 1:
+            mid = (start + end) // 2
+            return self._fetch_window(start, mid, fetch) + self._fetch_window(mid + 1, end, fetch)
+        return rows
+
+    def _fetch_range(self, start: int, end: int, fetch: Callable[..., Any]) -> List[Dict[str, Any]]:
+        rows: List[Dict[str, Any]] = []
+        while start <= end:
+            chunk_end = min(end, start + _MAX_WINDOW_MS - 1)
+            rows.extend(self._fetch_window(start, chunk_end, fetch))
+            start = chunk_end + 1
+        return rows
+
+    def sync(self, since_ms: int, now: Optional[int] = None, fetch: Callable[..., Any] | None = None) -> int:
+        """Догружає tradeFlow так, щоб інтервал ``[since_ms, now]`` був у журналі."""
+
+        fetch = fetch or convert_api.get_trade_flow
+        now = int(now if now is not None else time.time() * 1000)
+        state = self.state()
+        synced_from, synced_until = state.get("synced_from"), state.get("synced_until")
+        ranges: List[Tuple[int, int]] = []
+        if synced_from is None or synced_until is None:
+            ranges.append((since_ms, now))
+            synced_from = since_ms
+        else:
+            if since_ms < synced_from:
+                ranges.append((since_ms, synced_from - 1))
+                synced_from = since_ms
+            ranges.append((max(synced_from, synced_until - _OVERLAP_MS), now))
+        rows: List[Dict[str, Any]] = []
+        for start, end in ranges:
+            rows.extend(self._fetch_range(start, end, fetch))
+        count = self.upsert(rows)
+        last_ct = max([int(r.get("createTime") or 0) for r in rows] + [state.get("last_create_time", 0)])
+        self._set_state(synced_from=synced_from, synced_until=now, last_create_time=last_ct)
+        LOGGER.info("ledger sync: %d rows in %d window(s), last createTime=%s", count, len(ranges), last_ct)
+        return count
+
+    def fill_details(self, since_ms: int, status_fn: Callable[[str], Dict[str, Any]] | None = None) -> int:
+        """Паралельно тягне ``orderStatus`` для ордерів без фінального статусу/деталей."""
+
+        status_fn = status_fn or convert_api.order_status
+        placeholders = ",".join("?" * len(FINAL_STATUSES))
+        pending = [
+            oid
+            for (oid,) in self._conn().execute(
+                f"SELECT order_id FROM orders WHERE create_time>=? AND (detail IS NULL OR status NOT IN ({placeholders}))",
+                (since_ms, *sorted(FINAL_STATUSES)),
+            )
+        ]
+        if not pending:
+            return 0
+
+        def load(order_id: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+            try:
+                return order_id, status_fn(order_id)
+            except Exception as exc:
+                LOGGER.warning("orderStatus %s failed: %s", order_id, exc)
+                return order_id, None
+
+        with ThreadPoolExecutor(max_workers=max(1, min(_STATUS_WORKERS, len(pending)))) as pool:
+            details = {oid: d for oid, d in pool.map(bind_context(load), pending) if isinstance(d, dict)}
+        self.set_details(details)
+        return len(details)
+
+    # --- запити ----------------------------------------------------------------------
+    def query(self, since_ms: int, until_ms: Optional[int] = None) -> List[Dict[str, Any]]:
+        until_ms = until_ms if until_ms is not None else 2**62
+        out = []
+        for payload, detail in self._conn().execute(
+            "SELECT payload, detail FROM orders WHERE create_time BETWEEN ? AND ? ORDER BY create_time",
+            (since_ms, until_ms),
+        ):
+            row = json.loads(payload)
+            if detail:
+                row["detail"] = json.loads(detail)
+            out.append(row)
+        return out
@@ -0,0 +1,315 @@
+"""
+Персистентний кеш exchangeInfo/assetInfo у SQLite (WAL), спільний для всіх
+процесів (``auto-asia``, ``auto-us``, ``cspot`` ...).
+
+- записи живуть ``EXCHANGEINFO_TTL_SEC`` секунд;
+- ``payload IS NULL`` — негативний запис (пара повернула 400/404);
+- ``preload_pairs`` зберігає рядки exchangeInfo однією транзакцією; активи,
+  для яких список пар повний, позначаються в ``complete_from``: відсутня пара
+  для такого активу — теж негатив;
+- поверх SQLite тримаємо in-process словник, тож повторні звернення — O(1);
+- холодний кеш (``ensure_preloaded``) заповнюється одним ``exchangeInfo`` без
+  фільтрів при першій перевірці пари. Binance повертає так лише частину пар,
+  тож цей дамп дає тільки позитивні записи;
+- повним актив стає після ``exchangeInfo?fromAsset=`` (``ensure_complete``) —
+  один запит на from-актив за TTL замість запиту на кожну пару.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import config_dev3 as config
+
+from . import binance_client
+
+LOGGER = logging.getLogger(__name__)
+_TTL_SEC: float = float(getattr(config, "EXCHANGEINFO_TTL_SEC", 3600))
+DEFAULT_PATH = Path(
+    getattr(config, "META_CACHE_PATH", Path(__file__).resolve().parents[2] / "state" / "convert_meta.sqlite")
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pairs (
+    from_asset TEXT NOT NULL,
+    to_asset   TEXT NOT NULL,
+    payload    TEXT,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (from_asset, to_asset)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS complete_from (
+    from_asset TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS assets (
+    asset      TEXT PRIMARY KEY,
+    payload    TEXT NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+_MISS: Tuple[bool, None] = (False, None)
+# невдалий preload (мережа, ліміт ваги) повторюємо не частіше
+_PRELOAD_RETRY_SEC = 60.0
+
+
+class MetaCache:
+    """Кеш метаданих Convert; одне з'єднання SQLite на потік."""
+
+    def __init__(self, path: str | os.PathLike[str] | None = None, ttl_sec: float = _TTL_SEC) -> None:
+        self.path = Path(path or DEFAULT_PATH)
+        self.ttl_sec = float(ttl_sec)
+        self._local = threading.local()
+        self._memo: Dict[Tuple[str, str], Tuple[float, Optional[Dict[str, Any]]]] = {}
+        self._complete: Dict[str, float] = {}
+        self._assets: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        # зростає після кожного масового завантаження — сигнал перебудувати граф маршрутів
+        self.generation = 0
+        self._preload_tried = float("-inf")
+        self._complete_tried: Dict[str, float] = {}
+
+    # --- SQLite -------------------------------------------------------------
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # --- пари -----------------------------------------------------------------
+    def get_pair(self, from_asset: str, to_asset: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """``(hit, payload)``; ``(True, None)`` — пара відома як недоступна."""
+
+        now = time.time()
+        key = (from_asset, to_asset)
+        memo = self._memo.get(key)
+        if memo is not None and memo[0] > now:
+            return True, memo[1]
+        row = (
+            self._conn()
+            .execute(
+                "SELECT payload, expires_at FROM pairs WHERE from_asset=? AND to_asset=? AND expires_at>?",
+                (from_asset, to_asset, now),
+            )
+            .fetchone()
+        )
+        if row is not None:
+            payload = json.loads(row[0]) if row[0] is not None else None
+            self._memo[key] = (row[1], payload)
+            return True, payload
+        if self._is_complete(from_asset, now):
+            return True, None
+        return _MISS
+
+    def is_complete(self, from_asset: str) -> bool:
+        return self._is_complete(from_asset, time.time())
+
+    def _is_complete(self, from_asset: str, now: float) -> bool:
+        expires = self._complete.get(from_asset)
+        if expires is None or expires <= now:
+            row = (
+                self._conn()
+                .execute("SELECT expires_at FROM complete_from WHERE from_asset=? AND expires_at>?", (from_asset, now))
+                .fetchone()
+            )
+            if row is None:
+                return False
+            self._complete[from_asset] = expires = row[0]
+        return expires > now
+
+    def put_pair(self, from_asset: str, to_asset: str, payload: Optional[Dict[str, Any]]) -> None:
+        expires = time.time() + self.ttl_sec
+        raw = json.dumps(payload, separators=(",", ":")) if payload is not None else None
+        self._conn().execute(
+            "INSERT OR REPLACE INTO pairs (from_asset, to_asset, payload, expires_at) VALUES (?, ?, ?, ?)",
+            (from_asset, to_asset, raw, expires),
+        )
+        self._memo[(from_asset, to_asset)] = (expires, payload)
+
+    def preload_pairs(self, rows: Iterable[Dict[str, Any]], complete: bool | Iterable[str] = True) -> int:
+        """
+        Масово зберігає рядки exchangeInfo. ``complete=True`` — список пар для
+        їхніх from-активів повний; набір активів — повний саме для них (навіть
+        без жодного рядка); ``False`` — лише позитивні записи.
+        """
+
+        expires = time.time() + self.ttl_sec
+        records = []
+        for row in rows:
+            from_asset = str(row.get("fromAsset", "")).upper()
+            to_asset = str(row.get("toAsset", "")).upper()
+            if from_asset and to_asset:
+                records.append((from_asset, to_asset, json.dumps(row, separators=(",", ":")), expires))
+        if complete is True:
+            done = {r[0] for r in records}
+        else:
+            done = {str(a).upper() for a in complete or ()}
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO pairs (from_asset, to_asset, payload, expires_at) VALUES (?, ?, ?, ?)",
+                records,
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO complete_from (from_asset, expires_at) VALUES (?, ?)",
+                [(asset, expires) for asset in done],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        for from_asset, to_asset, raw, _ in records:
+            self._memo[(from_asset, to_asset)] = (expires, json.loads(raw))
+        for asset in done:
+            self._complete[asset] = expires
+        self.generation += 1
+        return len(records)
+
+    def pairs(self) -> Iterable[Tuple[str, str]]:
+        """Усі живі позитивні пари (для побудови графа маршрутів)."""
+
+        now = time.time()
+        yield from self._conn().execute(
+            "SELECT from_asset, to_asset FROM pairs WHERE payload IS NOT NULL AND expires_at>?", (now,)
+        )
+
+    def complete_assets(self) -> Iterable[str]:
+        now = time.time()
+        for (asset,) in self._conn().execute("SELECT from_asset FROM complete_from WHERE expires_at>?", (now,)):
+            yield asset
+
+    # --- активи ---------------------------------------------------------------
+    def get_asset(self, asset: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        memo = self._assets.get(asset)
+        if memo is not None and memo[0] > now:
+            return memo[1]
+        row = (
+            self._conn()
+            .execute("SELECT payload, expires_at FROM assets WHERE asset=? AND expires_at>?", (asset, now))
+            .fetchone()
+        )
+        if row is None:
+            return None
+        payload = json.loads(row[0])
+        self._assets[asset] = (row[1], payload)
+        return payload
+
+    def put_assets(self, table: Dict[str, Dict[str, Any]]) -> int:
+        expires = time.time() + self.ttl_sec
+        records = [(asset, json.dumps(row, separators=(",", ":")), expires) for asset, row in table.items()]
+        self._conn().executemany("INSERT OR REPLACE INTO assets (asset, payload, expires_at) VALUES (?, ?, ?)", records)
+        for asset, row in table.items():
+            self._assets[asset] = (expires, row)
+        return len(records)
+
+    def clear(self) -> None:
+        conn = self._conn()
+        conn.executescript("DELETE FROM pairs; DELETE FROM complete_from; DELETE FROM assets;")
+        self._memo.clear()
+        self._complete.clear()
+        self._assets.clear()
+        self.generation += 1
+
+
+_default_cache: MetaCache | None = None
+_default_lock = threading.Lock()
+
+
+def default_cache() -> MetaCache:
+    global _default_cache
+    if _default_cache is None:
+        with _default_lock:
+            if _default_cache is None:
+                _default_cache = MetaCache()
+    return _default_cache
+
+
+def set_default_cache(cache: MetaCache | None) -> None:
+    global _default_cache
+    with _default_lock:
+        _default_cache = cache
+
+
+def preload_exchange_info(cache: MetaCache | None = None) -> int:
+    """
+    Один виклик ``exchangeInfo`` без фільтрів -> пари в кеш. Відповідь без
+    фільтрів неповна, тому from-активи не позначаються повними.
+    """
+
+    payload = binance_client.get("/sapi/v1/convert/exchangeInfo")
+    rows = payload if isinstance(payload, list) else []
+    return (cache or default_cache()).preload_pairs(rows, complete=False)
+
+
+def preload_from_asset(asset: str, cache: MetaCache | None = None) -> int:
+    """``exchangeInfo?fromAsset=`` -> усі пари ``asset``; актив позначається повним."""
+
+    asset = asset.upper()
+    payload = binance_client.get("/sapi/v1/convert/exchangeInfo", {"fromAsset": asset})
+    if not isinstance(payload, list):
+        return 0
+    return (cache or default_cache()).preload_pairs(payload, complete=[asset])
+
+
+def ensure_complete(asset: str, cache: MetaCache | None = None) -> bool:
+    """
+    Повний список пар ``asset`` як from-активу (``preload_from_asset``);
+    невдача повторюється не частіше ніж раз на ``_PRELOAD_RETRY_SEC``.
+    ``True``, якщо список повний.
+    """
+
+    cache = cache or default_cache()
+    asset = asset.upper()
+    if cache.is_complete(asset):
+        return True
+    with _default_lock:
+        now = time.monotonic()
+        if now - cache._complete_tried.get(asset, float("-inf")) < _PRELOAD_RETRY_SEC:
+            return False
+        cache._complete_tried[asset] = now
+    try:
+        preload_from_asset(asset, cache)
+    except Exception as exc:
+        LOGGER.warning("exchangeInfo for %s failed, falling back to per-pair lookups: %s", asset, exc)
+        return False
+    return cache.is_complete(asset)
+
+
+def ensure_preloaded(cache: MetaCache | None = None) -> bool:
+    """
+    Для холодного кешу — один ``preload_exchange_info`` замість запиту на кожну
+    пару; невдала спроба повторюється не частіше ніж раз на ``_PRELOAD_RETRY_SEC``.
+    ``True``, якщо список пар завантажено.
+    """
+
+    cache = cache or default_cache()
+    with _default_lock:
+        now = time.monotonic()
+        if now - cache._preload_tried < _PRELOAD_RETRY_SEC:
+            return False
+        cache._preload_tried = now
+    try:
+        return preload_exchange_info(cache) > 0
+    except Exception as exc:
+        LOGGER.warning("exchangeInfo preload failed, falling back to per-pair lookups: %s", exc)
+        return False
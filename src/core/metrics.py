@@ -0,0 +1,173 @@
+"""
+Інструментація гарячого шляху: лічильники й гістограми з експортом
+у форматі OpenMetrics (textfile collector node_exporter).
+
+Запис без блокувань: кожен потік пише у власний шард (``threading.local``),
+реєстр шардів лише доповнюється; експорт зливає копії шардів. Імена
+метрик — з префіксом ``convert_``, мітки — кортеж пар ``(name, value)``.
+
+Метрики:
+- ``convert_http_request_duration_ms{endpoint,method,status}`` — латентність HTTP;
+- ``convert_http_retries_total{endpoint,reason}`` — ретраї клієнта;
+- ``convert_sleep_seconds_total{reason}`` — сон у лімітері/backoff/джитері;
+- ``convert_calls_total{op,result}`` — getQuote/acceptQuote за ``convert_errors.classify``;
+- ``convert_quote_accept_gap_ms`` / ``convert_quote_ttl_remaining_ms`` — конвеєр accept;
+- ``convert_shadow_quotes_total{result}`` — тіньові котирування: used/unused/error/cancelled.
+"""
+
+from __future__ import annotations
+
+import bisect
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import config_dev3 as config
+
+Labels = Tuple[Tuple[str, str], ...]
+Key = Tuple[str, Labels]
+
+LATENCY_BUCKETS_MS: Tuple[float, ...] = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+TTL_BUCKETS_MS: Tuple[float, ...] = (0, 1000, 2000, 5000, 10000, 30000)
+
+TEXTFILE_PATH: str = getattr(config, "METRICS_TEXTFILE", "")
+
+_HELP = {
+    "convert_http_request_duration_ms": "HTTP request latency per endpoint (ms)",
+    "convert_http_retries_total": "HTTP retries by reason",
+    "convert_sleep_seconds_total": "Time spent sleeping in limiter/backoff/jitter (s)",
+    "convert_calls_total": "Convert calls by result class",
+    "convert_quote_accept_gap_ms": "Delay between quote arrival and acceptQuote (ms)",
+    "convert_quote_ttl_remaining_ms": "Quote TTL remaining at acceptQuote (ms)",
+    "convert_shadow_quotes_total": "Shadow re-quotes by outcome",
+}
+
+
+class _Shard:
+    __slots__ = ("counters", "histograms", "generation")
+
+    def __init__(self, generation: int) -> None:
+        self.counters: Dict[Key, float] = {}
+        self.histograms: Dict[Key, Tuple[Tuple[float, ...], List[float]]] = {}
+        self.generation = generation
+
+
+_local = threading.local()
+_shards: List[_Shard] = []
+_generation = 0
+
+
+def _shard() -> _Shard:
+    shard = getattr(_local, "shard", None)
+    if shard is None or shard.generation != _generation:
+        shard = _Shard(_generation)
+        _local.shard = shard
+        _shards.append(shard)  # list.append атомарний під GIL
+    return shard
+
+
+def inc(name: str, value: float = 1.0, **labels: str) -> None:
+    counters = _shard().counters
+    key = (name, tuple(sorted(labels.items())))
+    counters[key] = counters.get(key, 0.0) + value
+
+
+def observe(name: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS_MS, **labels: str) -> None:
+    """Гістограма: ``counts[i]`` — кількість ``value <= buckets[i]``-кошика, далі +Inf, sum."""
+
+    histograms = _shard().histograms
+    key = (name, tuple(sorted(labels.items())))
+    entry = histograms.get(key)
+    if entry is None:
+        entry = histograms[key] = (buckets, [0.0] * (len(buckets) + 2))
+    data = entry[1]
+    data[bisect.bisect_left(entry[0], value)] += 1
+    data[-1] += value
+
+
+def reset() -> None:
+    global _generation
+    _generation += 1
+    del _shards[:]
+
+
+def snapshot() -> Tuple[Dict[Key, float], Dict[Key, Tuple[Tuple[float, ...], List[float]]]]:
+    """Злиті лічильники та гістограми з усіх шардів."""
+
+    counters: Dict[Key, float] = {}
+    histograms: Dict[Key, Tuple[Tuple[float, ...], List[float]]] = {}
+    for shard in list(_shards):
+        for key, value in shard.counters.copy().items():
+            counters[key] = counters.get(key, 0.0) + value
+        for key, (buckets, data) in shard.histograms.copy().items():
+            merged = histograms.get(key)
+            if merged is None:
+                histograms[key] = (buckets, list(data))
+            else:
+                for i, v in enumerate(list(data)):
+                    merged[1][i] += v
+    return counters, histograms
+
+
+def _fmt_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    parts = []
+    for name, value in labels:
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{name}="{escaped}"')
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_num(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def render() -> str:
+    """Дамп у форматі OpenMetrics (закінчується ``# EOF``)."""
+
+    counters, histograms = snapshot()
+    lines: List[str] = []
+    by_name: Dict[str, List[Tuple[Labels, float]]] = {}
+    for (name, labels), value in sorted(counters.items()):
+        by_name.setdefault(name, []).append((labels, value))
+    for name, rows in by_name.items():
+        family = name[: -len("_total")] if name.endswith("_total") else name
+        if name in _HELP:
+            lines.append(f"# HELP {family} {_HELP[name]}")
+        lines.append(f"# TYPE {family} counter")
+        for labels, value in rows:
+            lines.append(f"{family}_total{_fmt_labels(labels)} {_fmt_num(value)}")
+    hist_by_name: Dict[str, List[Tuple[Labels, Tuple[float, ...], List[float]]]] = {}
+    for (name, labels), (buckets, data) in sorted(histograms.items()):
+        hist_by_name.setdefault(name, []).append((labels, buckets, data))
+    for name, rows in hist_by_name.items():
+        if name in _HELP:
+            lines.append(f"# HELP {name} {_HELP[name]}")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, buckets, data in rows:
+            cumulative = 0.0
+            for bound, count in zip(list(buckets) + ["+Inf"], data[:-1], strict=True):
+                cumulative += count
+                le = bound if isinstance(bound, str) else _fmt_num(bound)
+                lines.append(f"{name}_bucket{_fmt_labels(labels + (('le', le),))} {_fmt_num(cumulative)}")
+            lines.append(f"{name}_count{_fmt_labels(labels)} {_fmt_num(cumulative)}")
+            lines.append(f"{name}_sum{_fmt_labels(labels)} {_fmt_num(data[-1])}")
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path: Optional[str | os.PathLike[str]] = None) -> Optional[Path]:
+    """Атомарно пише ``render()`` у ``path`` (типово ``METRICS_TEXTFILE``); без шляху — нічого."""
+
+    path = path or TEXTFILE_PATH
+    if not path:
+        return None
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=target.name + ".", suffix=".tmp", dir=str(target.parent))
+    with os.fdopen(fd, "w", encoding="utf-8") as fh:
+        fh.write(render())
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, target)
+    return target
@@ -0,0 +1,266 @@
+"""
+Здоров'я пар Convert: circuit breaker і негативний кеш для маршрутів, що падають.
+
+Для кожної пари ``FROM/TO`` зберігаються останні класи помилок
+(``convert_errors.classify`` + ``expired`` для 345231). Після
+``PAIR_BREAKER_THRESHOLD`` поспіль помилок, що стосуються самої пари
+(``business``/``expired``), breaker відкривається на
+``PAIR_BREAKER_COOLDOWN_SEC × 2^(trips-1)`` (не більше
+``PAIR_BREAKER_MAX_COOLDOWN_SEC``). Поки він відкритий, ``route_exists``,
+fan-out котирувань і ``execute_conversion`` пропускають пару без мережевого
+виклику. Після cool-down пара напіввідкрита: одна невдача знову відкриває
+breaker з подвоєним cool-down, успішний accept скидає стан.
+
+«Поспіль» — без успішного котирування чи accept між помилками і з
+проміжками не довшими за ``PAIR_BREAKER_WINDOW_SEC``: рідкі помилки з
+інтервалом у дні breaker не відкривають.
+
+Стан — компактний JSON (``state/pair_health.json``), запис атомарний під
+``flock``, тож фази asia/us і CLI бачать один і той самий стан.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import config_dev3 as config
+
+from .convert_errors import _extract_code, classify
+
+DEFAULT_PATH = Path(
+    getattr(config, "PAIR_HEALTH_PATH", Path(__file__).resolve().parents[2] / "state" / "pair_health.json")
+)
+THRESHOLD: int = int(getattr(config, "PAIR_BREAKER_THRESHOLD", 3))
+COOLDOWN_SEC: float = float(getattr(config, "PAIR_BREAKER_COOLDOWN_SEC", 600))
+MAX_COOLDOWN_SEC: float = float(getattr(config, "PAIR_BREAKER_MAX_COOLDOWN_SEC", 24 * 3600))
+WINDOW_SEC: float = float(getattr(config, "PAIR_BREAKER_WINDOW_SEC", 3600))
+
+EXPIRED_CODE = 345231
+# класи, що свідчать про проблему самої пари; retry/other — мережа чи ліміти, їх не рахуємо
+TRIP_CLASSES = frozenset({"business", "expired"})
+_RECENT = 10
+
+
+class CircuitOpenError(RuntimeError):
+    """Breaker пари відкритий — виклик пропущено без звернення до біржі."""
+
+
+def error_class(exc: Exception) -> str:
+    """``classify`` з окремим класом ``expired`` для 345231 (і коли accept-конвеєр обгорнув його)."""
+
+    if EXPIRED_CODE in (_extract_code(exc), _extract_code(exc.__cause__) if exc.__cause__ else None):
+        return "expired"
+    return classify(exc)
+
+
+def pair_key(from_asset: str, to_asset: str) -> str:
+    return f"{(from_asset or '').upper()}/{(to_asset or '').upper()}"
+
+
+class PairHealth:
+    """``FROM/TO`` -> {fails, trips, open_until, recent: [[ts, class], ...]}."""
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str] | None = None,
+        *,
+        threshold: int = THRESHOLD,
+        cooldown_sec: float = COOLDOWN_SEC,
+        max_cooldown_sec: float = MAX_COOLDOWN_SEC,
+        window_sec: float = WINDOW_SEC,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = Path(path or DEFAULT_PATH)
+        self.threshold = max(1, int(threshold))
+        self.cooldown_sec = float(cooldown_sec)
+        self.max_cooldown_sec = float(max_cooldown_sec)
+        self.window_sec = float(window_sec)
+        self.clock = clock
+        self._pairs: Dict[str, Dict[str, Any]] = {}
+        self._stamp: Optional[tuple] = None
+        self._lock = threading.Lock()
+
+    # ----- диск -----
+    def _load(self) -> None:
+        """Перечитує файл, лише якщо він змінився (один ``stat`` на виклик)."""
+
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._pairs, self._stamp = {}, None
+            return
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if stamp == self._stamp:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (FileNotFoundError, ValueError):
+            data = {}
+        self._pairs = data if isinstance(data, dict) else {}
+        self._stamp = stamp
+
+    def _write(self) -> None:
+        fd, tmp = tempfile.mkstemp(prefix=self.path.name + ".", suffix=".tmp", dir=str(self.path.parent))
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(self._pairs, fh, separators=(",", ":"), sort_keys=True)
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        st = os.stat(self.path)
+        self._stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _update(self, fn: Callable[[Dict[str, Dict[str, Any]]], bool]) -> None:
+        """Read-modify-write під ``flock``; ``fn`` повертає ``True``, якщо стан змінено."""
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        lock_path = self.path.with_suffix(self.path.suffix + ".lock")
+        with self._lock, open(lock_path, "a") as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                self._load()
+                if fn(self._pairs):
+                    self._write()
+            finally:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    # ----- запити -----
+    def allow(self, from_asset: str, to_asset: str) -> bool:
+        """``False`` — breaker пари відкритий (без мережі й без блокування файлу)."""
+
+        with self._lock:
+            self._load()
+            entry = self._pairs.get(pair_key(from_asset, to_asset))
+        return not entry or float(entry.get("open_until", 0)) <= self.clock()
+
+    def allow_route(self, route: Any) -> bool:
+        return all(self.allow(step.from_asset, step.to_asset) for step in route.steps)
+
+    def check(self, from_asset: str, to_asset: str) -> None:
+        if not self.allow(from_asset, to_asset):
+            raise CircuitOpenError(f"circuit open for {pair_key(from_asset, to_asset)}")
+
+    def state(self, from_asset: str | None = None, to_asset: str | None = None) -> Dict[str, Dict[str, Any]]:
+        """Знімок стану (усіх пар або однієї) з полями ``state`` (open/half-open/closed) і ``retry_in``."""
+
+        with self._lock:
+            self._load()
+            pairs = dict(self._pairs)
+        if from_asset and to_asset:
+            key = pair_key(from_asset, to_asset)
+            pairs = {key: pairs[key]} if key in pairs else {}
+        now = self.clock()
+        out = {}
+        for key, entry in sorted(pairs.items()):
+            open_until = float(entry.get("open_until", 0))
+            if open_until > now:
+                status = "open"
+            elif entry.get("trips"):
+                status = "half-open"
+            else:
+                status = "closed"
+            out[key] = dict(entry, state=status, retry_in=max(0.0, round(open_until - now, 1)))
+        return out
+
+    # ----- запис результатів -----
+    def record_error(self, from_asset: str, to_asset: str, exc: Exception | str) -> str:
+        """Фіксує помилку; повертає її клас. Відкриває breaker за порогом."""
+
+        kind = exc if isinstance(exc, str) else error_class(exc)
+        if kind not in TRIP_CLASSES:
+            return kind
+        key = pair_key(from_asset, to_asset)
+
+        def apply(pairs: Dict[str, Dict[str, Any]]) -> bool:
+            now = self.clock()
+            entry = pairs.setdefault(key, {"fails": 0, "trips": 0, "open_until": 0.0, "recent": []})
+            recent = list(entry.get("recent", []))
+            fails = int(entry.get("fails", 0))
+            if fails and recent and now - float(recent[-1][0]) > self.window_sec:
+                fails = 0  # попередня помилка надто давня — серія почалася заново
+            entry["fails"] = fails + 1
+            entry["recent"] = (recent + [[round(now, 3), kind]])[-_RECENT:]
+            half_open = int(entry.get("trips", 0)) > 0 and float(entry.get("open_until", 0)) <= now
+            if half_open or entry["fails"] >= self.threshold:
+                entry["trips"] = int(entry.get("trips", 0)) + 1
+                cooldown = min(self.max_cooldown_sec, self.cooldown_sec * 2 ** (entry["trips"] - 1))
+                entry["open_until"] = round(now + cooldown, 3)
+                entry["fails"] = 0
+            return True
+
+        self._update(apply)
+        return kind
+
+    def record_success(self, from_asset: str, to_asset: str) -> None:
+        """Успішний accept закриває breaker; для здорових пар файл не чіпаємо."""
+
+        key = pair_key(from_asset, to_asset)
+        with self._lock:
+            self._load()
+            if key not in self._pairs:
+                return
+        self._update(lambda pairs: pairs.pop(key, None) is not None)
+
+    def record_quote_success(self, from_asset: str, to_asset: str) -> None:
+        """Успішне котирування обриває серію помилок (``fails``), але не закриває відкритий breaker."""
+
+        key = pair_key(from_asset, to_asset)
+        with self._lock:
+            self._load()
+            if not self._pairs.get(key, {}).get("fails"):
+                return
+
+        def apply(pairs: Dict[str, Dict[str, Any]]) -> bool:
+            entry = pairs.get(key)
+            if not entry or not entry.get("fails"):
+                return False
+            entry["fails"] = 0
+            return True
+
+        self._update(apply)
+
+    def reset(self, keys: Iterable[str] | None = None) -> List[str]:
+        """Скидає вказані пари (``FROM/TO``) або всі; повертає скинуті ключі."""
+
+        removed: List[str] = []
+        wanted = None if keys is None else {k.upper() for k in keys}
+
+        def apply(pairs: Dict[str, Dict[str, Any]]) -> bool:
+            for key in list(pairs):
+                if wanted is None or key in wanted:
+                    removed.append(key)
+                    del pairs[key]
+            return bool(removed)
+
+        self._update(apply)
+        return removed
+
+
+_default_health: PairHealth | None = None
+_default_lock = threading.Lock()
+
+
+def default_health() -> PairHealth:
+    global _default_health
+    if _default_health is None:
+        with _default_lock:
+            if _default_health is None:
+                _default_health = PairHealth()
+    return _default_health
+
+
+def set_default_health(health: PairHealth | None) -> None:
+    global _default_health
+    _default_health = health
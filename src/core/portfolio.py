@@ -1 +1,176 @@
+"""
+Векторизована оцінка портфеля і просідання.
 
+Баланси, ціни (USDT) і пікові ціни активів тримаються в масивах NumPy,
+проіндексованих за активом; вартість усього портфеля — один скалярний
+добуток, піки оновлюються ``np.maximum`` лише для змінених цін.
+Стан зберігається у ``state/position.json`` (див. ``position``).
+
+Ціни для всього портфеля — один запит ``/api/v3/ticker/price``
+(``fetch_prices``) замість котирування на кожен актив.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional
+
+import numpy as np
+
+from . import position
+from .utils import STABLE_ASSETS, now_ms
+
+QUOTE_ASSET = "USDT"
+
+
+@dataclass(frozen=True)
+class Valuation:
+    value: float
+    peak: float
+    drawdown: float
+
+
+class Portfolio:
+    """Баланси/ціни/піки як масиви ``float64`` з індексом ``asset -> i``."""
+
+    def __init__(self, capacity: int = 16) -> None:
+        self._index: Dict[str, int] = {}
+        self._assets: list[str] = []
+        capacity = max(1, int(capacity))
+        self.balances = np.zeros(capacity)
+        self.prices = np.zeros(capacity)
+        self.peaks = np.zeros(capacity)
+        self.portfolio_peak = 0.0
+        self.ts = 0
+
+    # ----- індекс -----
+    def __len__(self) -> int:
+        return len(self._assets)
+
+    @property
+    def assets(self) -> tuple[str, ...]:
+        return tuple(self._assets)
+
+    def index(self, asset: str) -> int:
+        asset = asset.upper()
+        idx = self._index.get(asset)
+        if idx is not None:
+            return idx
+        idx = len(self._assets)
+        if idx >= self.balances.shape[0]:
+            grow = self.balances.shape[0] * 2
+            for name in ("balances", "prices", "peaks"):
+                arr = np.zeros(grow)
+                arr[:idx] = getattr(self, name)[:idx]
+                setattr(self, name, arr)
+        self._index[asset] = idx
+        self._assets.append(asset)
+        if asset in STABLE_ASSETS:
+            self.prices[idx] = self.peaks[idx] = 1.0
+        return idx
+
+    def _indices(self, assets: Iterable[str]) -> np.ndarray:
+        return np.fromiter((self.index(a) for a in assets), dtype=np.intp)
+
+    # ----- оновлення -----
+    def set_balances(self, balances: Mapping[str, Any], *, replace: bool = True) -> None:
+        """``replace=True`` — активи поза ``balances`` обнуляються."""
+
+        idx = self._indices(balances.keys())
+        values = np.fromiter((float(v) for v in balances.values()), dtype=np.float64, count=len(idx))
+        if replace:
+            self.balances[: len(self)] = 0.0
+        self.balances[idx] = values
+
+    def update_prices(self, prices: Mapping[str, Any]) -> None:
+        """Нові ціни в USDT; піки змінених активів оновлюються інкрементально."""
+
+        idx = self._indices(prices.keys())
+        values = np.fromiter((float(v) for v in prices.values()), dtype=np.float64, count=len(idx))
+        self.prices[idx] = values
+        self.peaks[idx] = np.maximum(self.peaks[idx], values)
+
+    # ----- оцінка -----
+    def values(self) -> np.ndarray:
+        n = len(self)
+        return self.balances[:n] * self.prices[:n]
+
+    def value(self) -> float:
+        n = len(self)
+        return float(self.balances[:n] @ self.prices[:n])
+
+    def drawdown(self, value: Optional[float] = None) -> float:
+        """Частка просідання від ``portfolio_peak`` (0.0 — на піку)."""
+
+        value = self.value() if value is None else value
+        if self.portfolio_peak <= 0.0:
+            return 0.0
+        return max(0.0, 1.0 - value / self.portfolio_peak)
+
+    def asset_drawdowns(self) -> Dict[str, float]:
+        n = len(self)
+        peaks = self.peaks[:n]
+        dd = np.where(peaks > 0.0, 1.0 - self.prices[:n] / np.where(peaks > 0.0, peaks, 1.0), 0.0)
+        return dict(zip(self._assets, np.maximum(dd, 0.0).tolist(), strict=True))
+
+    def mark(self, prices: Optional[Mapping[str, Any]] = None) -> Valuation:
+        """Оновлює ціни (якщо передано), пік портфеля і повертає оцінку."""
+
+        if prices:
+            self.update_prices(prices)
+        value = self.value()
+        if value > self.portfolio_peak:
+            self.portfolio_peak = value
+        self.ts = now_ms()
+        return Valuation(value, self.portfolio_peak, self.drawdown(value))
+
+    # ----- стан -----
+    def to_state(self) -> Dict[str, Any]:
+        n = len(self)
+        held = self.balances[:n] != 0.0
+        tracked = self.peaks[:n] > 0.0
+        return {
+            "assets": {a: float(b) for a, b, keep in zip(self._assets, self.balances[:n], held, strict=True) if keep},
+            "peaks": {a: float(p) for a, p, keep in zip(self._assets, self.peaks[:n], tracked, strict=True) if keep},
+            "portfolio_peak": float(self.portfolio_peak),
+            "ts": int(self.ts),
+        }
+
+    @classmethod
+    def from_state(cls, state: Mapping[str, Any]) -> "Portfolio":
+        assets = dict(state.get("assets") or {})
+        peaks = dict(state.get("peaks") or {})
+        book = cls(capacity=max(16, len(set(assets) | set(peaks))))
+        if peaks:
+            idx = book._indices(peaks.keys())
+            book.peaks[idx] = np.fromiter((float(v) for v in peaks.values()), dtype=np.float64, count=len(idx))
+        book.set_balances(assets)
+        book.portfolio_peak = float(state.get("portfolio_peak") or 0.0)
+        book.ts = int(state.get("ts") or 0)
+        return book
+
+    @classmethod
+    def load(cls, path=None) -> "Portfolio":
+        return cls.from_state(position.read_position(path))
+
+    def save(self, path=None) -> None:
+        position.write_position(self.to_state(), path)
+
+
+def fetch_prices(assets: Iterable[str], get: Optional[Callable[..., Any]] = None) -> Dict[str, float]:
+    """Ціни активів у USDT одним запитом ``/api/v3/ticker/price``."""
+
+    if get is None:
+        from . import binance_client
+
+        get = binance_client.get
+    wanted = {a.upper() for a in assets}
+    prices = {a: 1.0 for a in wanted & STABLE_ASSETS}
+    rows = get("/api/v3/ticker/price") or []
+    for row in rows:
+        symbol = str(row.get("symbol", ""))
+        if symbol.endswith(QUOTE_ASSET):
+            asset = symbol[: -len(QUOTE_ASSET)]
+            if asset in wanted and asset not in prices:
+                prices[asset] = float(row.get("price") or 0.0)
+    return prices
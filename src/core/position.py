@@ -1 +1,59 @@
+"""
+Файл стану портфеля ``state/position.json``.
 
+Формат (компактний JSON, один рядок)::
+
+    {"assets": {"BTC": 0.00035203, ...},      # баланси
+     "peaks": {"BTC": 113924.37, ...},        # пікові ціни активів у USDT
+     "portfolio_peak": 50.09,                 # пікова вартість портфеля у USDT
+     "ts": 1759232468112}
+
+Запис атомарний: тимчасовий файл у тій самій теці + ``os.replace``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict
+
+import config_dev3 as config
+
+POSITION_PATH = Path(getattr(config, "POSITION_PATH", Path(__file__).resolve().parents[2] / "state" / "position.json"))
+
+
+def empty_position() -> Dict[str, Any]:
+    return {"assets": {}, "peaks": {}, "portfolio_peak": 0.0, "ts": 0}
+
+
+def read_position(path: Path | str | None = None) -> Dict[str, Any]:
+    """Стан з диска; відсутній або пошкоджений файл -> порожній стан."""
+
+    path = Path(path or POSITION_PATH)
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+    except (FileNotFoundError, ValueError):
+        return empty_position()
+    state = empty_position()
+    if isinstance(data, dict):
+        state.update({k: data[k] for k in state if k in data})
+    return state
+
+
+def write_position(state: Dict[str, Any], path: Path | str | None = None) -> None:
+    path = Path(path or POSITION_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(state, fh, separators=(",", ":"))
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
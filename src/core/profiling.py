@@ -0,0 +1,215 @@
+"""
+Профіль холодного старту для ``--profile-startup`` (``src.cli``, ``src.app``).
+
+``StartupProfile`` збирає три частини звіту:
+
+- ``phases`` — час виконання команди (``command``) і ``before_main_ms`` —
+  від старту процесу до увімкнення профілю: інтерпретатор, site, імпорт
+  точки входу й розбір аргументів (лише Linux, з ``/proc``);
+- ``imports`` — кожен модуль, імпортований під час профілю, з власним і
+  кумулятивним часом (як ``python -X importtime``); збирає meta-path finder,
+  який обгортає loader знайденого модуля;
+- ``requests`` — перші HTTP-запити ``BinanceClient`` з розкладом: очікування
+  лімітера, підпис (разом із синхронізацією годинника) і сам HTTP.
+
+Модуль тільки на stdlib, щоб не додавати ваги старту, який він вимірює.
+Поза профілем ``binance_client`` платить одну перевірку ``active() is None``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, TextIO, TypeVar
+
+MAX_REQUESTS = 20
+TOP_IMPORTS = 25
+T = TypeVar("T")
+
+
+def _process_age_ms() -> Optional[float]:
+    """Скільки мілісекунд процес уже живе (``/proc``; ``None`` деінде)."""
+
+    try:
+        with open("/proc/self/stat", "rb") as fh:
+            # поле 22 (starttime) — після назви процесу в дужках
+            start_ticks = int(fh.read().rsplit(b")", 1)[1].split()[19])
+        with open("/proc/uptime", "rb") as fh:
+            uptime = float(fh.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return max(0.0, (uptime - start_ticks / os.sysconf("SC_CLK_TCK")) * 1000.0)
+
+
+class _TimedLoader:
+    """Проксі loader'а: міряє ``create_module``/``exec_module``, решту делегує."""
+
+    def __init__(self, loader: Any, name: str, profile: "StartupProfile") -> None:
+        self._loader = loader
+        self._name = name
+        self._profile = profile
+
+    def __getattr__(self, item: str) -> Any:
+        return getattr(self._loader, item)
+
+    def create_module(self, spec: Any) -> Any:
+        create = getattr(self._loader, "create_module", None)
+        if create is None:
+            return None
+        # розширення (numpy._core._multiarray_umath) виконуються саме тут
+        with self._profile._timing(self._name):
+            return create(spec)
+
+    def exec_module(self, module: Any) -> None:
+        with self._profile._timing(self._name):
+            self._loader.exec_module(module)
+
+
+class _ImportTimer:
+    """Meta-path finder: знаходить spec іншими finder'ами й підміняє loader на ``_TimedLoader``."""
+
+    def __init__(self, profile: "StartupProfile") -> None:
+        self._profile = profile
+        self._local = threading.local()
+
+    def find_spec(self, fullname: str, path: Any, target: Any = None) -> Any:
+        if getattr(self._local, "busy", False):
+            return None
+        self._local.busy = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._local.busy = False
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, fullname, self._profile)
+        return spec
+
+
+class StartupProfile:
+    """Збір профілю старту; ``start()`` вмикає його для процесу, ``stop()`` — вимикає."""
+
+    def __init__(self, entry: str = "") -> None:
+        self.entry = entry
+        self.before_main_ms = _process_age_ms()
+        self.preloaded = len(sys.modules)
+        self.phases: Dict[str, float] = {}
+        self.imports: Dict[str, List[float]] = {}  # name -> [self_ms, cumulative_ms]
+        self.requests: List[Dict[str, Any]] = []
+        self._started = time.perf_counter()
+        self._finder = _ImportTimer(self)
+        self._stack = threading.local()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _timing(self, name: str) -> Iterator[None]:
+        stack = self._stack.__dict__.setdefault("frames", [])
+        frame = [0.0]  # кумулятивний час дочірніх імпортів
+        stack.append(frame)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000.0
+            stack.pop()
+            if stack:
+                stack[-1][0] += elapsed
+            with self._lock:
+                entry = self.imports.setdefault(name, [0.0, 0.0])
+                entry[0] += elapsed - frame[0]
+                entry[1] += elapsed
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + (time.perf_counter() - started) * 1000.0
+
+    def note_request(
+        self, method: str, path: str, started: float, wait_ms: float, sign_ms: float, http_ms: float, status: str
+    ) -> None:
+        """Запит ``BinanceClient`` (``started`` — ``perf_counter`` початку, до лімітера)."""
+
+        with self._lock:
+            if len(self.requests) >= MAX_REQUESTS:
+                return
+            self.requests.append(
+                {
+                    "at_ms": round((started - self._started) * 1000.0, 2),
+                    "method": method,
+                    "path": path,
+                    "wait_ms": round(wait_ms, 2),
+                    "sign_ms": round(sign_ms, 2),
+                    "http_ms": round(http_ms, 2),
+                    "status": status,
+                }
+            )
+
+    def start(self) -> "StartupProfile":
+        global _active
+        sys.meta_path.insert(0, self._finder)
+        _active = self
+        return self
+
+    def stop(self) -> "StartupProfile":
+        global _active
+        if self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+        if _active is self:
+            _active = None
+        return self
+
+    def report(self, top: int = TOP_IMPORTS) -> Dict[str, Any]:
+        imports = sorted(self.imports.items(), key=lambda kv: kv[1][1], reverse=True)
+        requests = sorted(self.requests, key=lambda r: r["at_ms"])
+        # перший запит команди; для підписаного sign_ms включає синхронізацію
+        # годинника — вкладений /api/v3/time, що йде в списку наступним
+        first = requests[0] if requests else None
+        return {
+            "entry": self.entry,
+            "total_ms": round((time.perf_counter() - self._started) * 1000.0, 2),
+            "before_main_ms": round(self.before_main_ms, 1) if self.before_main_ms is not None else None,
+            "phases": {k: round(v, 2) for k, v in self.phases.items()},
+            "imports": {
+                "preloaded": self.preloaded,
+                "count": len(imports),
+                "total_ms": round(sum(v[0] for _, v in imports), 2),
+                "top": [
+                    {"module": name, "self_ms": round(v[0], 2), "cumulative_ms": round(v[1], 2)}
+                    for name, v in imports[:top]
+                ],
+            },
+            "first_request": first,
+            "requests": requests,
+        }
+
+
+_active: Optional[StartupProfile] = None
+
+
+def active() -> Optional[StartupProfile]:
+    return _active
+
+
+def profiled(entry: str, fn: Callable[..., T], *args: Any, stream: Optional[TextIO] = None) -> T:
+    """Виконує ``fn(*args)`` як фазу ``command`` і друкує звіт JSON у stderr (також після винятку)."""
+
+    profile = StartupProfile(entry).start()
+    try:
+        with profile.phase("command"):
+            return fn(*args)
+    finally:
+        profile.stop()
+        print(json.dumps(profile.report(), indent=2, ensure_ascii=False), file=stream or sys.stderr)
@@ -0,0 +1,298 @@
+"""
+Паралельне котирування маршрутів (fan-out) для фаз analyze/trade.
+
+Усі маршрути з whitelist котируються одночасно в обмеженому пулі потоків.
+Темп запитів і далі задає спільний лімітер ``binance_client``, кількість
+котирувань — ``QUOTE_BUDGET_PER_RUN``, а суми нормалізуються ``_norm8``
+через ``convert_middleware.get_quote``.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import config_dev3 as config
+
+from . import convert_middleware, pair_health
+from .convert_api import ConvertQuote, ConvertRoute
+from .utils import DECIMAL_ZERO, bind_context, decimal_from_any
+
+LOGGER = logging.getLogger(__name__)
+
+_MAX_WORKERS: int = int(getattr(config, "QUOTE_FANOUT_WORKERS", 8))
+_BUDGET_PER_RUN: int = int(getattr(config, "QUOTE_BUDGET_PER_RUN", 0))
+
+
+@dataclass(frozen=True)
+class QuoteTask:
+    """Один маршрут з whitelist, який треба прокотирувати."""
+
+    from_asset: str
+    to_asset: str
+    amount: Decimal
+    wallet: str = "SPOT"
+
+
+@dataclass
+class QuoteOutcome:
+    task: QuoteTask
+    quote: Optional[ConvertQuote] = None
+    error: str = ""
+    latency_ms: float = 0.0
+    skipped: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.quote is not None
+
+
+@dataclass
+class LatencySummary:
+    """Підсумок прогону: кількості та перцентилі латентності котирувань (мс)."""
+
+    total: int = 0
+    ok: int = 0
+    errors: int = 0
+    skipped: int = 0
+    p50_ms: float = 0.0
+    p90_ms: float = 0.0
+    p99_ms: float = 0.0
+    max_ms: float = 0.0
+    wall_ms: float = 0.0
+
+    def as_text(self) -> str:
+        return (
+            f"quotes={self.total} ok={self.ok} errors={self.errors} skipped={self.skipped} "
+            f"p50={self.p50_ms:.1f}ms p90={self.p90_ms:.1f}ms p99={self.p99_ms:.1f}ms "
+            f"max={self.max_ms:.1f}ms wall={self.wall_ms:.1f}ms"
+        )
+
+
+@dataclass
+class QuoteRun:
+    outcomes: List[QuoteOutcome] = field(default_factory=list)
+    summary: LatencySummary = field(default_factory=LatencySummary)
+
+    @property
+    def quotes(self) -> List[ConvertQuote]:
+        return [o.quote for o in self.outcomes if o.quote is not None]
+
+
+class QuoteBudget:
+    """Потокобезпечний лічильник котирувань на прогін; ``limit <= 0`` — без ліміту."""
+
+    def __init__(self, limit: int = _BUDGET_PER_RUN) -> None:
+        self.limit = int(limit)
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self._lock:
+            if self.limit > 0 and self.used >= self.limit:
+                return False
+            self.used += 1
+            return True
+
+    def charge(self) -> bool:
+        """Позапланове котирування (тіньове в конвеєрі accept): рахується одразу, без очікування слота."""
+
+        return QuoteBudget.take(self)
+
+    def fork(self) -> "QuoteBudget":
+        """Такий самий, але окремий бюджет (напр. на кожен акаунт)."""
+
+        return QuoteBudget(self.limit)
+
+
+class PacedBudget(QuoteBudget):
+    """
+    Бюджет, розподілений у часі: ``limit`` котирувань рівномірно на
+    ``duration_sec`` від створення. ``take`` чекає на свій слот (з випадковим
+    зсувом усередині слота) — замість одного стартового джитера.
+    """
+
+    def __init__(
+        self,
+        limit: int = _BUDGET_PER_RUN,
+        duration_sec: float = 0.0,
+        *,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        super().__init__(limit)
+        self.duration_sec = max(0.0, float(duration_sec))
+        self._sleep = sleep
+        self._clock = clock
+        self._started = clock()
+        self.slots = max(0, self.limit)
+        self._next_slot = 0  # ``charge`` витрачає ліміт, але не зсуває розклад
+
+    def fork(self) -> "PacedBudget":
+        return PacedBudget(self.limit, self.duration_sec, sleep=self._sleep, clock=self._clock)
+
+    def plan(self, count: int) -> None:
+        """Скільки котирувань реально буде (``min(limit, count)``); відлік слотів — з цього моменту."""
+
+        self.slots = count if self.limit <= 0 else min(self.limit, count)
+        self._started = self._clock()
+
+    def take(self) -> bool:
+        with self._lock:
+            if self.limit > 0 and self.used >= self.limit:
+                return False
+            slot = self._next_slot
+            self._next_slot += 1
+            self.used += 1
+        if self.slots > 0 and self.duration_sec > 0:
+            width = self.duration_sec / self.slots
+            delay = self._started + (slot + random.random()) * width - self._clock()
+            if delay > 0:
+                self._sleep(delay)
+        return True
+
+
+def _percentile(sorted_values: Sequence[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+
+def summarise(outcomes: Sequence[QuoteOutcome], wall_ms: float = 0.0) -> LatencySummary:
+    latencies = sorted(o.latency_ms for o in outcomes if not o.skipped)
+    return LatencySummary(
+        total=len(outcomes),
+        ok=sum(1 for o in outcomes if o.ok),
+        errors=sum(1 for o in outcomes if not o.ok and not o.skipped),
+        skipped=sum(1 for o in outcomes if o.skipped),
+        p50_ms=_percentile(latencies, 50),
+        p90_ms=_percentile(latencies, 90),
+        p99_ms=_percentile(latencies, 99),
+        max_ms=latencies[-1] if latencies else 0.0,
+        wall_ms=wall_ms,
+    )
+
+
+def tasks_from_whitelist(routes: Iterable[Dict[str, Any]], wallet: str = "SPOT") -> List[QuoteTask]:
+    """``ROUTES_WHITELIST`` (``from``/``to``/``amount``/``wallet``) -> список задач."""
+
+    tasks: List[QuoteTask] = []
+    for route in routes:
+        tasks.append(
+            QuoteTask(
+                from_asset=str(route.get("from", "")).upper().strip(),
+                to_asset=str(route.get("to", "")).upper().strip(),
+                amount=decimal_from_any(route.get("amount")),
+                wallet=str(route.get("wallet") or wallet).upper(),
+            )
+        )
+    return tasks
+
+
+def fan_out(
+    tasks: Sequence[QuoteTask],
+    *,
+    max_workers: int = _MAX_WORKERS,
+    budget: QuoteBudget | None = None,
+    quote_fn: Callable[..., Optional[ConvertQuote]] | None = None,
+    on_outcome: Callable[[QuoteOutcome], None] | None = None,
+) -> QuoteRun:
+    """
+    Котирує всі ``tasks`` паралельно, зберігаючи порядок результатів.
+
+    ``on_outcome`` викликається в робочому потоці одразу після відповіді —
+    фаза trade використовує це, щоб приймати котирування без очікування решти.
+    """
+
+    quote_fn = quote_fn or convert_middleware.get_quote
+    budget = budget or QuoteBudget()
+    health = pair_health.default_health()
+
+    def run_one(task: QuoteTask) -> QuoteOutcome:
+        if not health.allow(task.from_asset, task.to_asset):
+            # breaker відкритий: ні бюджету, ні запиту до біржі
+            outcome = QuoteOutcome(task, error="circuit open", skipped=True)
+        elif not budget.take():
+            outcome = QuoteOutcome(task, error="budget exhausted", skipped=True)
+        else:
+            started = time.perf_counter()
+            try:
+                quote = quote_fn(task.from_asset, task.to_asset, task.amount, task.wallet)
+                outcome = QuoteOutcome(task, quote=quote, error="" if quote else "no quote")
+            except Exception as exc:  # мережеві/біржові помилки не зупиняють решту маршрутів
+                outcome = QuoteOutcome(task, error=str(exc) or exc.__class__.__name__)
+            outcome.latency_ms = (time.perf_counter() - started) * 1000.0
+        if on_outcome is not None:
+            on_outcome(outcome)
+        return outcome
+
+    started = time.perf_counter()
+    if not tasks:
+        return QuoteRun()
+    workers = max(1, min(int(max_workers), len(tasks)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="quote") as pool:
+        outcomes = list(pool.map(bind_context(run_one), tasks))
+    run = QuoteRun(outcomes, summarise(outcomes, (time.perf_counter() - started) * 1000.0))
+    LOGGER.info("quote fan-out: %s", run.summary.as_text())
+    return run
+
+
+def rank_routes(
+    routes: Sequence[ConvertRoute],
+    amount: Decimal,
+    wallet: str = "SPOT",
+    *,
+    max_workers: int = _MAX_WORKERS,
+    budget: QuoteBudget | None = None,
+    quote_fn: Callable[..., Optional[ConvertQuote]] | None = None,
+) -> List[Tuple[ConvertRoute, Decimal]]:
+    """
+    Ранжує маршрути за живим ефективним курсом ``кінцева сума / amount`` (спадання).
+
+    Перші кроки всіх маршрутів котируються паралельно (однакові пари — один раз),
+    потім так само паралельно — другі кроки на суму з першого котирування.
+    Маршрути без котирування відкидаються.
+    """
+
+    amount = decimal_from_any(amount)
+    if amount <= DECIMAL_ZERO or not routes:
+        return []
+    budget = budget or QuoteBudget(0)
+    wallet = (wallet or "SPOT").upper()
+
+    def quote_legs(legs: Iterable[Tuple[str, str, Decimal]]) -> Dict[Tuple[str, str, Decimal], ConvertQuote]:
+        tasks = [QuoteTask(f, t, a, wallet) for f, t, a in dict.fromkeys(legs)]
+        run = fan_out(tasks, max_workers=max_workers, budget=budget, quote_fn=quote_fn)
+        return {(o.task.from_asset, o.task.to_asset, o.task.amount): o.quote for o in run.outcomes if o.quote}
+
+    first = quote_legs((r.steps[0].from_asset, r.steps[0].to_asset, amount) for r in routes)
+    amounts: Dict[int, Decimal] = {}
+    pending: List[Tuple[int, Tuple[str, str, Decimal]]] = []
+    for idx, route in enumerate(routes):
+        step = route.steps[0]
+        quote = first.get((step.from_asset, step.to_asset, amount))
+        if quote is None or quote.to_amount <= DECIMAL_ZERO:
+            continue
+        if route.is_direct:
+            amounts[idx] = quote.to_amount
+        else:
+            nxt = route.steps[1]
+            pending.append((idx, (nxt.from_asset, nxt.to_asset, quote.to_amount)))
+
+    if pending:
+        second = quote_legs(leg for _, leg in pending)
+        for idx, leg in pending:
+            quote = second.get(leg)
+            if quote is not None and quote.to_amount > DECIMAL_ZERO:
+                amounts[idx] = quote.to_amount
+
+    ranked = [(routes[idx], final / amount) for idx, final in amounts.items()]
+    ranked.sort(key=lambda item: item[1], reverse=True)
+    return ranked
@@ -0,0 +1,213 @@
+"""
+Запис і відтворення HTTP-сесій Binance для офлайн-профілювання.
+
+``RecordingAdapter`` (транспорт ``requests``) дописує кожну пару
+запит/відповідь з латентністю в стиснутий append-only журнал
+(gzip JSONL; кожен процес — окремий gzip-member, тож файл можна
+дописувати й читати як один потік). ``ReplayAdapter`` віддає ці відповіді
+назад через той самий ``BinanceClient`` — ``convert_api``/``convert_middleware``
+працюють без біржі, із записаною латентністю (``speed=1``), прискорено
+(``speed=10``) або без пауз (``speed=0``).
+
+Запит зіставляється за (метод, шлях, параметри без
+``timestamp``/``signature``/``recvWindow``); однакові запити отримують
+відповіді в записаному порядку. Рядок журналу::
+
+    {"t": 0.412, "method": "POST", "path": "/sapi/v1/convert/getQuote",
+     "params": {"fromAsset": "USDT", ...}, "status": 200, "ms": 84.1,
+     "headers": {"x-sapi-used-ip-weight-1m": "12"}, "body": "{...}"}
+
+Увімкнення: ``HTTP_RECORD_PATH`` або ``HTTP_REPLAY_PATH`` (+ ``HTTP_REPLAY_SPEED``).
+"""
+
+from __future__ import annotations
+
+import atexit
+import gzip
+import json
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+import config_dev3 as config
+
+RECORD_PATH: str = getattr(config, "HTTP_RECORD_PATH", "")
+REPLAY_PATH: str = getattr(config, "HTTP_REPLAY_PATH", "")
+REPLAY_SPEED: float = float(getattr(config, "HTTP_REPLAY_SPEED", 1.0))
+
+# змінні між прогонами параметри підпису не входять у ключ і не пишуться в журнал
+_VOLATILE = frozenset({"timestamp", "signature", "recvWindow"})
+# заголовки, які читає клієнт (лімітер, backoff)
+_KEEP_HEADERS = ("retry-after", "content-type", "x-mbx-used-weight", "x-mbx-order-count", "x-sapi-used")
+_FLUSH_EVERY = 64
+
+ReplayKey = Tuple[str, str, Tuple[Tuple[str, str], ...]]
+
+
+class ReplayMiss(RuntimeError):
+    """У журналі немає відповіді на такий запит."""
+
+
+def _split(method: str, url: str) -> Tuple[str, Dict[str, str]]:
+    parts = urlsplit(url)
+    params = {k: v for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in _VOLATILE}
+    return parts.path, params
+
+
+def _key(method: str, path: str, params: Dict[str, Any]) -> ReplayKey:
+    return method.upper(), path, tuple(sorted((str(k), str(v)) for k, v in params.items() if k not in _VOLATILE))
+
+
+def read_log(path: str | Path) -> Iterator[Dict[str, Any]]:
+    """Записи журналу по порядку; обірваний хвіст (аварійне завершення) ігнорується."""
+
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            for line in fh:
+                if line.endswith("\n"):
+                    yield json.loads(line)
+    except (EOFError, gzip.BadGzipFile):
+        return
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Звичайний пул з'єднань, що дописує кожну відповідь у журнал ``path``."""
+
+    def __init__(self, path: str | Path, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = gzip.open(self.path, "at", encoding="utf-8")
+        self._started = time.monotonic()
+        self._pending = 0
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def send(self, request: requests.PreparedRequest, *args: Any, **kwargs: Any) -> requests.Response:
+        started = time.monotonic()
+        resp = super().send(request, *args, **kwargs)
+        elapsed_ms = (time.monotonic() - started) * 1000.0
+        path, params = _split(request.method or "GET", request.url or "")
+        row = {
+            "t": round(started - self._started, 6),
+            "method": (request.method or "GET").upper(),
+            "path": path,
+            "params": params,
+            "status": resp.status_code,
+            "ms": round(elapsed_ms, 3),
+            "headers": {k: v for k, v in resp.headers.items() if k.lower().startswith(_KEEP_HEADERS)},
+            "body": resp.text,
+        }
+        line = json.dumps(row, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._fh is not None:
+                self._fh.write(line)
+                self._pending += 1
+                if self._pending >= _FLUSH_EVERY:
+                    self._fh.flush()
+                    self._pending = 0
+        return resp
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+        super().close()
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    Транспорт без мережі: відповіді з журналу ``path``.
+
+    ``speed`` — ділник записаної латентності (0 — без пауз). Коли записані
+    відповіді на GET вичерпано, повторюється остання (``/api/v3/time``,
+    exchangeInfo); для POST — ``ReplayMiss``.
+    """
+
+    def __init__(self, path: str | Path, speed: float = REPLAY_SPEED, *, sleep=time.sleep) -> None:
+        super().__init__()
+        self.path = Path(path)
+        self.speed = max(0.0, float(speed))
+        self._sleep = sleep
+        self._queues: Dict[ReplayKey, Deque[Dict[str, Any]]] = {}
+        self._last: Dict[ReplayKey, Dict[str, Any]] = {}
+        self.served = 0
+        self._lock = threading.Lock()
+        for row in read_log(self.path):
+            key = _key(row["method"], row["path"], row.get("params") or {})
+            self._queues.setdefault(key, deque()).append(row)
+
+    @property
+    def remaining(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def _next(self, key: ReplayKey) -> Dict[str, Any]:
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue:
+                row = queue.popleft()
+                self._last[key] = row
+            elif key[0] == "GET" and key in self._last:
+                row = self._last[key]
+            else:
+                raise ReplayMiss(f"no recorded response for {key[0]} {key[1]} {dict(key[2])}")
+            self.served += 1
+        return row
+
+    def send(self, request: requests.PreparedRequest, *args: Any, **kwargs: Any) -> requests.Response:
+        method = (request.method or "GET").upper()
+        path, params = _split(method, request.url or "")
+        row = self._next(_key(method, path, params))
+        if self.speed > 0 and row.get("ms"):
+            self._sleep(float(row["ms"]) / 1000.0 / self.speed)
+        resp = requests.Response()
+        resp.status_code = int(row["status"])
+        resp._content = (row.get("body") or "").encode("utf-8")
+        resp.headers = CaseInsensitiveDict(row.get("headers") or {})
+        resp.encoding = "utf-8"
+        resp.url = request.url or ""
+        resp.request = request
+        resp.reason = "REPLAY"
+        return resp
+
+    def close(self) -> None:
+        pass
+
+
+def adapter_from_config(**pool_kwargs: Any) -> Optional[BaseAdapter]:
+    """Адаптер за ``HTTP_REPLAY_PATH``/``HTTP_RECORD_PATH`` або ``None`` (звичайний пул)."""
+
+    if REPLAY_PATH:
+        return ReplayAdapter(REPLAY_PATH)
+    if RECORD_PATH:
+        return RecordingAdapter(RECORD_PATH, **pool_kwargs)
+    return None
+
+
+def summarise(path: str | Path) -> List[Dict[str, Any]]:
+    """Кількість і латентність (p50/max, мс) за (метод, шлях) — для швидкого огляду журналу."""
+
+    by_endpoint: Dict[Tuple[str, str], List[float]] = {}
+    for row in read_log(path):
+        by_endpoint.setdefault((row["method"], row["path"]), []).append(float(row.get("ms") or 0.0))
+    out = []
+    for (method, path_), values in sorted(by_endpoint.items()):
+        values.sort()
+        out.append(
+            {
+                "method": method,
+                "path": path_,
+                "count": len(values),
+                "p50_ms": values[len(values) // 2],
+                "max_ms": values[-1],
+            }
+        )
+    return out
@@ -0,0 +1,86 @@
+"""
+Граф пар Convert, побудований один раз зі списку exchangeInfo.
+
+Активи інтернуються в цілі ID, ребра зберігаються як множини вихідних
+сусідів, тож перевірка пари — O(1). Маршрути через хаби складає
+``convert_api.candidate_routes``. Граф нічого не знає про мережу.
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import config_dev3 as config
+
+from . import meta_cache
+
+_TTL_SEC: float = float(getattr(config, "EXCHANGEINFO_TTL_SEC", 3600))
+
+
+class RouteGraph:
+    """Орієнтований граф пар ``from -> to`` з інтернованими ID активів."""
+
+    __slots__ = ("_ids", "_names", "_out", "_complete")
+
+    def __init__(self, pairs: Iterable[Tuple[str, str]] = (), complete: Iterable[str] = ()) -> None:
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._out: List[Set[int]] = []
+        for from_asset, to_asset in pairs:
+            self.add_pair(from_asset, to_asset)
+        self._complete: Set[int] = {self.intern(a) for a in complete}
+
+    def __len__(self) -> int:
+        return sum(len(edges) for edges in self._out)
+
+    def intern(self, asset: str) -> int:
+        asset_id = self._ids.get(asset)
+        if asset_id is None:
+            asset_id = len(self._names)
+            self._ids[sys.intern(asset)] = asset_id
+            self._names.append(sys.intern(asset))
+            self._out.append(set())
+        return asset_id
+
+    def add_pair(self, from_asset: str, to_asset: str) -> None:
+        src, dst = self.intern(from_asset), self.intern(to_asset)
+        self._out[src].add(dst)
+
+    def is_complete(self, asset: str) -> bool:
+        """Чи відомий повний список пар для ``asset`` як from-активу."""
+
+        asset_id = self._ids.get(asset)
+        return asset_id is not None and asset_id in self._complete
+
+    def has_pair(self, from_asset: str, to_asset: str) -> bool:
+        src, dst = self._ids.get(from_asset), self._ids.get(to_asset)
+        return src is not None and dst is not None and dst in self._out[src]
+
+
+_default_graph: Optional[RouteGraph] = None
+_default_key: Tuple[int, float] = (-1, 0.0)
+_default_lock = threading.Lock()
+
+
+def default_graph() -> Optional[RouteGraph]:
+    """Граф з ``meta_cache``; ``None``, якщо список пар ще не завантажено."""
+
+    global _default_graph, _default_key
+    cache = meta_cache.default_cache()
+    now = time.monotonic()
+    with _default_lock:
+        generation, built_at = _default_key
+        if _default_graph is None or generation != cache.generation or now - built_at > _TTL_SEC:
+            pairs = list(cache.pairs())
+            graph = RouteGraph(pairs, cache.complete_assets()) if pairs else None
+            _default_graph, _default_key = graph, (cache.generation, now)
+        return _default_graph
+
+
+def reset_default_graph() -> None:
+    global _default_graph, _default_key
+    with _default_lock:
+        _default_graph, _default_key = None, (-1, 0.0)
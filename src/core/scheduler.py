@@ -1 +1,100 @@
+"""Вікна ринків, стартовий джитер, очікування до вікна, файлові lock-и."""
 
+from __future__ import annotations
+
+import fcntl
+import os
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, time as dtime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+import config_dev3 as config
+
+_START_JITTER_SEC: Tuple[float, float] = tuple(getattr(config, "START_JITTER_SEC", (120, 180)))  # type: ignore[assignment]
+
+
+def _parse_hhmm(value: Any) -> Optional[dtime]:
+    if not value:
+        return None
+    hours, _, minutes = str(value).partition(":")
+    return dtime(int(hours), int(minutes or 0))
+
+
+def region_window(region: str) -> Dict[str, Any]:
+    """``ASIA_WINDOW`` / ``US_WINDOW`` з конфігу (``{"start": "HH:MM", "end": "HH:MM"}``, UTC)."""
+
+    return dict(getattr(config, f"{region.upper()}_WINDOW", {}) or {})
+
+
+def in_window(window: Dict[str, Any], now: datetime | None = None) -> bool:
+    """Чи входить ``now`` (UTC) у вікно; порожнє вікно — завжди так, північ підтримується."""
+
+    start = _parse_hhmm(window.get("start"))
+    end = _parse_hhmm(window.get("end"))
+    if start is None or end is None:
+        return True
+    current = (now or datetime.now(timezone.utc)).time().replace(second=0, microsecond=0)
+    if start <= end:
+        return start <= current <= end
+    return current >= start or current <= end
+
+
+def window_bounds(window: Dict[str, Any], now: datetime | None = None) -> Optional[Tuple[datetime, datetime]]:
+    """
+    ``(start, end)`` поточного або найближчого наступного вікна (UTC);
+    ``None`` — вікно не задано.
+    """
+
+    start_t = _parse_hhmm(window.get("start"))
+    end_t = _parse_hhmm(window.get("end"))
+    if start_t is None or end_t is None:
+        return None
+    now = now or datetime.now(timezone.utc)
+    for day in (-1, 0, 1):
+        base = (now + timedelta(days=day)).date()
+        start = datetime.combine(base, start_t, tzinfo=timezone.utc)
+        end = datetime.combine(base, end_t, tzinfo=timezone.utc)
+        if end <= start:
+            end += timedelta(days=1)
+        if now < end:
+            break
+    return start, end
+
+
+def sleep_until(moment: datetime, sleep: Callable[[float], None] = time.sleep) -> float:
+    """Спить до ``moment`` (UTC); повертає тривалість очікування."""
+
+    delay = (moment - datetime.now(timezone.utc)).total_seconds()
+    if delay > 0:
+        sleep(delay)
+    return max(0.0, delay)
+
+
+def start_jitter(range_sec: Tuple[float, float] = _START_JITTER_SEC) -> float:
+    """Спить випадкову кількість секунд з діапазону; повертає тривалість."""
+
+    delay = random.uniform(*range_sec) if range_sec else 0.0
+    if delay > 0:
+        time.sleep(delay)
+    return delay
+
+
+@contextmanager
+def file_lock(path: str) -> Iterator[bool]:
+    """Неблокуючий ``flock``; yield ``False``, якщо lock уже тримає інший процес."""
+
+    fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o644)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
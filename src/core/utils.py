@@ -1,12 +1,19 @@
 from __future__ import annotations
 
+import contextvars
 import random
 import time
-from decimal import Decimal, InvalidOperation
-from typing import Any
+from decimal import ROUND_DOWN, Decimal, InvalidOperation
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
 
 # Єдина константа нуля для Decimal по всьому проєкту
 DECIMAL_ZERO: Decimal = Decimal("0")
+# Крок сум Convert (8 знаків)
+QUANT8: Decimal = Decimal("0.00000001")
+# Стейблкоїни: оцінюються 1:1 до USDT (portfolio, guard)
+STABLE_ASSETS = frozenset({"USDT", "USDC", "FDUSD", "BUSD"})
 
 
 def now_ms() -> int:
@@ -14,6 +21,21 @@ def now_ms() -> int:
     return int(time.time() * 1000)
 
 
+def bind_context(fn: Callable[..., T]) -> Callable[..., T]:
+    """
+    Прив'язує ``fn`` до contextvars поточного потоку (активний акаунт,
+    клієнт). ``ThreadPoolExecutor`` їх не переносить; кожен виклик
+    виконується у власній копії контексту, тож обгортку можна віддавати
+    в ``pool.map``/``submit`` з кількох потоків одночасно.
+    """
+    ctx = contextvars.copy_context()
+
+    def run(*args: Any, **kwargs: Any) -> T:
+        return ctx.copy().run(fn, *args, **kwargs)
+
+    return run
+
+
 def rand_jitter(
     base: float | int = 1.0,
     *,
@@ -57,10 +79,37 @@ def decimal_from_any(x: Any) -> Decimal:
         raise ValueError(f"decimal_from_any: cannot parse {x!r}") from None
 
 
-def ensure_amount_and_limits(amount: Any, *args: Any, **kwargs: Any) -> Decimal:
+def norm8(x: Any) -> Decimal:
+    """Нормалізація до 8 знаків (вниз)."""
+    if not isinstance(x, Decimal):
+        x = Decimal(str(x))
+    return x.quantize(QUANT8, rounding=ROUND_DOWN)
+
+
+def limits_from_info(info: Any) -> tuple[Decimal, Decimal]:
+    """
+    (fromAssetMinAmount, fromAssetMaxAmount) з рядка exchangeInfo
+    (dict або {"data": dict}); відсутні значення -> 0 (без обмеження).
+    """
+    payload = info.get("data", info) if isinstance(info, dict) else None
+    if not isinstance(payload, dict):
+        return DECIMAL_ZERO, DECIMAL_ZERO
+    return decimal_from_any(payload.get("fromAssetMinAmount")), decimal_from_any(payload.get("fromAssetMaxAmount"))
+
+
+def ensure_amount_and_limits(amount: Any, info: Any = None, *args: Any, **kwargs: Any) -> Decimal:
     """
-    Тимчасовий шім до повної реалізації:
-    приводить amount до Decimal і повертає його як нормалізоване значення.
+    Приводить amount до Decimal і перевіряє його проти лімітів exchangeInfo.
+    - ValueError, якщо amount <= 0, менше за fromAssetMinAmount або більше за fromAssetMaxAmount;
+    - нульові ліміти вважаються відсутніми.
     Параметри *args/**kwargs залишені для сумісності існуючих викликів.
     """
-    return decimal_from_any(amount)
+    value = decimal_from_any(amount)
+    if value <= DECIMAL_ZERO:
+        raise ValueError(f"amount must be positive, got {value}")
+    minimum, maximum = limits_from_info(info)
+    if minimum > DECIMAL_ZERO and value < minimum:
+        raise ValueError(f"amount {value} below fromAssetMinAmount {minimum}")
+    if maximum > DECIMAL_ZERO and value > maximum:
+        raise ValueError(f"amount {value} above fromAssetMaxAmount {maximum}")
+    return value
@@ -0,0 +1,196 @@
+"""
+Резидентний демон для ``cspot``/``cfund``/``cqspot``/``cqfund``.
+
+Тримає теплими HTTP-пул, зсув годинника, кеш exchangeInfo і граф маршрутів
+та обслуговує ``info/quote/now/status`` через локальний Unix-сокет.
+Протокол — один JSON-рядок запиту ``{"command", "params"}`` і один
+JSON-рядок відповіді ``{"exit", "payload"}``.
+
+Запуск: ``python3 -m src.daemon [--socket PATH]``. Клієнтська частина
+(``call``) не імпортує стек Convert — ``src.cli`` використовує її першою
+і переходить до виконання в процесі, якщо демон не запущено.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import socket
+import socketserver
+import stat
+import sys
+import threading
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import config_dev3 as config
+
+LOGGER = logging.getLogger(__name__)
+
+SOCKET_PATH: str = getattr(config, "DAEMON_SOCKET", "/tmp/convert-daemon.sock")
+_CALL_TIMEOUT_SEC: float = float(getattr(config, "DAEMON_CALL_TIMEOUT_SEC", 120))
+_KEEPALIVE_SEC: float = float(getattr(config, "DAEMON_KEEPALIVE_SEC", 30))
+
+
+# команди без побічних ефектів: якщо демон не відповів, їх можна повторити в процесі
+_READ_ONLY = frozenset({"info", "quote", "status"})
+
+
+def call(command: str, params: Dict[str, Any], path: Optional[str] = None) -> Optional[Tuple[int, Any]]:
+    """
+    ``(exit, payload)`` від демона або ``None``, якщо він не слухає сокет чи не
+    відповів (тоді ``src.cli`` виконує команду в процесі). Для ``now`` після
+    відправленого запиту повтору немає: конвертація могла вже відбутися.
+    """
+
+    path = path or SOCKET_PATH
+    if not os.path.exists(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(_CALL_TIMEOUT_SEC)
+    sent = False
+    try:
+        sock.connect(path)
+        sock.sendall(json.dumps({"command": command, "params": params}, default=str).encode() + b"\n")
+        sent = True
+        with sock.makefile("rb") as fh:
+            line = fh.readline()
+        reply = json.loads(line) if line.endswith(b"\n") else None
+    except (OSError, ValueError) as exc:
+        LOGGER.warning("daemon %s on %s failed: %s", command, path, exc)
+        reply = None
+    finally:
+        sock.close()
+    if reply is None:
+        if sent and command not in _READ_ONLY:
+            error = f"daemon did not reply to {command}; the conversion may have run, check `trades`"
+            return 1, {"error": error}
+        return None
+    return int(reply.get("exit", 1)), reply.get("payload")
+
+
+def _is_live(path: str) -> bool:
+    """На сокеті ``path`` хтось приймає з'єднання."""
+
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    probe.settimeout(1.0)
+    try:
+        probe.connect(path)
+    except OSError:
+        return False
+    finally:
+        probe.close()
+    return True
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        from . import cli
+        from .core.convert_errors import _extract_code
+
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+            code, payload = cli.dispatch(request["command"], request.get("params") or {})
+        except Exception as exc:
+            LOGGER.exception("daemon request failed")
+            code, payload = 1, {"error": str(exc) or exc.__class__.__name__, "code": _extract_code(exc)}
+        self.wfile.write(json.dumps({"exit": code, "payload": payload}, default=str).encode() + b"\n")
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str) -> None:
+        if os.path.lexists(path):
+            if not stat.S_ISSOCK(os.lstat(path).st_mode):
+                raise RuntimeError(f"{path} exists and is not a socket")
+            if _is_live(path):
+                raise RuntimeError(f"daemon already listening on {path}")
+            os.unlink(path)  # сокет від процесу, що впав
+        super().__init__(path, _Handler, bind_and_activate=False)
+        self.path = path
+        try:
+            # сокет створюється одразу з 0600 і лише потім починає слухати
+            umask = os.umask(0o177)
+            try:
+                self.server_bind()
+            finally:
+                os.umask(umask)
+            os.chmod(path, 0o600)
+            self.server_activate()
+        except BaseException:
+            self.socket.close()
+            raise
+
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def warm_up() -> None:
+    """Імпорт стеку, синхронізація годинника, кеш пар і граф маршрутів."""
+
+    from .core import binance_client, convert_middleware, meta_cache, route_graph  # noqa: F401
+
+    client = binance_client.default_client()
+    try:
+        client.clock.sync()
+        if route_graph.default_graph() is None:
+            meta_cache.preload_exchange_info()
+        route_graph.default_graph()
+    except Exception as exc:
+        LOGGER.warning("daemon warm-up incomplete: %s", exc)
+
+
+def _keepalive(stop: threading.Event) -> None:
+    """Періодичний ``/api/v3/ping`` тримає з'єднання пулу відкритими, а годинник — свіжим."""
+
+    from .core import binance_client
+
+    while not stop.wait(_KEEPALIVE_SEC):
+        try:
+            client = binance_client.default_client()
+            client.get("/api/v3/ping")
+            client.now_ms()
+        except Exception as exc:
+            LOGGER.warning("daemon keepalive failed: %s", exc)
+
+
+def serve(path: Optional[str] = None, *, warm: bool = True) -> DaemonServer:
+    """Створює сервер (без блокування); ``serve_forever`` — на боці викликача."""
+
+    if warm:
+        warm_up()
+    return DaemonServer(path or SOCKET_PATH)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="src.daemon")
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    from .core import eventlog
+
+    eventlog.install()
+    server = serve(args.socket)
+    stop = threading.Event()
+    threading.Thread(target=_keepalive, args=(stop,), name="keepalive", daemon=True).start()
+    LOGGER.info("convert daemon listening on %s", args.socket)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
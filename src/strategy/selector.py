@@ -1 +1,186 @@
+"""
+Відбір маршрутів із ``ROUTES_WHITELIST`` за фазою.
 
+Для кожного кандидата в масиви NumPy збираються: ratio з останнього
+analyze, середній ratio історичних виконань (локальний ledger) і ліміти
+пари (meta_cache). Оцінка векторизована::
+
+    score = edge - fee - slippage
+    edge      = analyze_ratio / fill_ratio - 1     (0, якщо історії немає)
+    fee       = SELECTOR_FEE_BPS / 1e4
+    slippage  = SELECTOR_SLIPPAGE_BPS / 1e4 * amount / fromAssetMaxAmount
+
+Маршрути, що впали в analyze або порушують мінімум пари, відкидаються;
+маршрути без котирування в analyze йдуть після котированих. Фаза trade
+котирує лише top-K (``np.argpartition``), K — ``SELECTOR_TOP_K`` або
+``QUOTE_BUDGET_PER_RUN``.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+import config_dev3 as config
+
+from ..core import candidates, meta_cache
+from ..core.quote_engine import QuoteTask
+from ..core.utils import limits_from_info
+
+LOGGER = logging.getLogger(__name__)
+
+Pair = Tuple[str, str]
+
+_FEE_BPS: float = float(getattr(config, "SELECTOR_FEE_BPS", 0.0))
+_SLIPPAGE_BPS: float = float(getattr(config, "SELECTOR_SLIPPAGE_BPS", 10.0))
+_HISTORY_DAYS: float = float(getattr(config, "SELECTOR_HISTORY_DAYS", 30))
+# штраф, що ставить маршрути без котирування analyze після котированих
+_UNQUOTED_PENALTY = 1.0
+
+
+def routes_for_phase(routes: Iterable[Dict[str, Any]], phase: str) -> List[Dict[str, Any]]:
+    """Записи whitelist без ``phase`` діють в обох фазах; інакше — лише у своїй."""
+
+    out = []
+    for route in routes:
+        phases = route.get("phase")
+        if phases is None or phase in ([phases] if isinstance(phases, str) else phases):
+            out.append(route)
+    return out
+
+
+@dataclass
+class SelectorInputs:
+    quotes: Dict[Pair, float] = field(default_factory=dict)  # найкращий ratio analyze
+    failed: Set[Pair] = field(default_factory=set)  # пари, що впали в analyze
+    fills: Dict[Pair, float] = field(default_factory=dict)  # середній ratio виконань
+    limits: Callable[[str, str], Tuple[float, float]] = lambda a, b: (0.0, 0.0)
+
+    @property
+    def empty(self) -> bool:
+        return not (self.quotes or self.failed or self.fills)
+
+
+def _cached_limits(from_asset: str, to_asset: str) -> Tuple[float, float]:
+    hit, payload = meta_cache.default_cache().get_pair(from_asset, to_asset)
+    if not hit or not payload:
+        return 0.0, 0.0
+    minimum, maximum = limits_from_info(payload)
+    return float(minimum), float(maximum)
+
+
+def _ledger_fills(since_ms: int) -> Dict[Pair, float]:
+    from ..core import ledger
+
+    if not Path(ledger.DEFAULT_PATH).exists():
+        return {}
+    sums: Dict[Pair, List[float]] = {}
+    for row in ledger.Ledger().query(since_ms):
+        if str(row.get("orderStatus", "SUCCESS")).upper() != "SUCCESS":
+            continue
+        try:
+            ratio = float(row.get("ratio") or 0.0)
+        except (TypeError, ValueError):
+            continue
+        if ratio > 0.0:
+            acc = sums.setdefault((str(row.get("fromAsset")), str(row.get("toAsset"))), [0.0, 0.0])
+            acc[0] += ratio
+            acc[1] += 1.0
+    return {pair: total / count for pair, (total, count) in sums.items()}
+
+
+def load_inputs(region: str, out_dir: Path, *, with_history: bool = True) -> SelectorInputs:
+    """Останній analyze цього регіону + історія виконань + ліміти з кешу."""
+
+    inputs = SelectorInputs(limits=_cached_limits)
+    summary = candidates.load_summary(out_dir, region, "analyze")
+    for row in candidates.iter_candidates(out_dir, summary):
+        pair = (str(row.get("from")), str(row.get("to")))
+        if int(row.get("ok") or 0) and row.get("ratio"):
+            ratio = float(row["ratio"])
+            if ratio > inputs.quotes.get(pair, 0.0):
+                inputs.quotes[pair] = ratio
+        elif not int(row.get("skipped") or 0):
+            inputs.failed.add(pair)
+    if with_history:
+        try:
+            inputs.fills = _ledger_fills(int((time.time() - _HISTORY_DAYS * 86400) * 1000))
+        except Exception as exc:
+            LOGGER.warning("selector: ledger history unavailable: %s", exc)
+    return inputs
+
+
+def score_routes(
+    tasks: Sequence[QuoteTask],
+    inputs: SelectorInputs,
+    *,
+    fee_bps: float = _FEE_BPS,
+    slippage_bps: float = _SLIPPAGE_BPS,
+) -> np.ndarray:
+    """Оцінка кожного завдання; ``-inf`` — маршрут відкинуто."""
+
+    n = len(tasks)
+    quote = np.zeros(n)
+    fill = np.zeros(n)
+    amount = np.zeros(n)
+    minimum = np.zeros(n)
+    maximum = np.zeros(n)
+    failed = np.zeros(n, dtype=bool)
+    limits_memo: Dict[Pair, Tuple[float, float]] = {}
+    for i, task in enumerate(tasks):
+        pair = (task.from_asset, task.to_asset)
+        quote[i] = inputs.quotes.get(pair, 0.0)
+        fill[i] = inputs.fills.get(pair, 0.0)
+        amount[i] = float(task.amount)
+        lim = limits_memo.get(pair)
+        if lim is None:
+            lim = limits_memo[pair] = inputs.limits(*pair)
+        minimum[i], maximum[i] = lim
+        failed[i] = pair in inputs.failed
+
+    quoted = quote > 0.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        edge = np.where(quoted & (fill > 0.0), quote / np.where(fill > 0.0, fill, 1.0) - 1.0, 0.0)
+        slippage = np.where(maximum > 0.0, slippage_bps / 1e4 * amount / np.where(maximum > 0.0, maximum, 1.0), 0.0)
+    scores = edge - fee_bps / 1e4 - slippage - np.where(quoted, 0.0, _UNQUOTED_PENALTY)
+    rejected = (failed & ~quoted) | ((minimum > 0.0) & (amount < minimum)) | (amount <= 0.0)
+    scores[rejected] = -np.inf
+    return scores
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Індекси K найкращих (без ``-inf``) за спаданням оцінки; при рівності — за порядком whitelist."""
+
+    valid = np.flatnonzero(np.isfinite(scores))
+    if k <= 0 or valid.size == 0:
+        return valid[:0]
+    if valid.size > k:
+        part = np.argpartition(-scores[valid], k - 1)[:k]
+        valid = valid[part]
+    return valid[np.lexsort((valid, -scores[valid]))]
+
+
+def select_routes(
+    tasks: Sequence[QuoteTask],
+    region: str,
+    out_dir: Path,
+    *,
+    k: Optional[int] = None,
+    inputs: Optional[SelectorInputs] = None,
+) -> List[QuoteTask]:
+    """Фаза trade: top-K завдань за оцінкою; без даних analyze/історії — порядок whitelist."""
+
+    inputs = inputs if inputs is not None else load_inputs(region, out_dir)
+    if inputs.empty:
+        return list(tasks)
+    if k is None:
+        k = int(getattr(config, "SELECTOR_TOP_K", 0) or getattr(config, "QUOTE_BUDGET_PER_RUN", 0) or len(tasks))
+    scores = score_routes(tasks, inputs)
+    picked = top_k(scores, k)
+    LOGGER.info("selector: %d of %d routes selected (k=%d)", picked.size, len(tasks), k)
+    return [tasks[i] for i in picked]
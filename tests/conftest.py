@@ -0,0 +1,105 @@
+import time
+
+import pytest
+
+from convert_sim import ConvertSimulator
+
+_BENCH_RESULTS = []
+
+
+@pytest.fixture
+def convert_sim(tmp_path, monkeypatch):
+    """Симулятор Convert + клієнт, кеші, журнал дедупу, стан пар і гард, спрямовані на нього."""
+
+    from src.core import binance_client, convert_api, dedup, guard, meta_cache, pair_health, route_graph
+
+    sim = ConvertSimulator().start()
+    limiter = binance_client.AdaptiveRateLimiter(1000, 1000, max_qps=1000)
+    client = binance_client.BinanceClient("key", "secret", base_url=sim.url, limiter=limiter)
+    monkeypatch.setattr(binance_client, "_default_client", client)
+    monkeypatch.setattr(meta_cache, "_default_cache", meta_cache.MetaCache(tmp_path / "meta.sqlite"))
+    monkeypatch.setattr(dedup, "_default_index", dedup.DedupIndex(tmp_path / "dedup.jsonl"))
+    monkeypatch.setattr(pair_health, "_default_health", pair_health.PairHealth(tmp_path / "pair_health.json"))
+    monkeypatch.setattr(guard, "_default_guard", guard.RiskGuard(tmp_path / "guard" / "state.json").load())
+    binance_client.clear_info_cache()
+    route_graph.reset_default_graph()
+    convert_api._route_steps.cache_clear()
+    yield sim
+    client.close()
+    sim.stop()
+    binance_client.clear_info_cache()
+    route_graph.reset_default_graph()
+    convert_api._route_steps.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def _event_log(tmp_path, monkeypatch):
+    """Журнал подій (``cli.main``/``app.main`` вмикають його) — у tmp_path, а не в state/events."""
+
+    from src.core import eventlog
+
+    monkeypatch.setattr(eventlog, "EVENT_DIR", str(tmp_path / "events"))
+    yield
+    log = eventlog.default_log()
+    eventlog.set_default_log(None)
+    if log is not None:
+        log.close()
+
+
+class Benchmark:
+    """Мінімальний аналог ``pytest-benchmark``: ``benchmark(fn, *args, rounds=N)``."""
+
+    def __init__(self, name):
+        self.name = name
+        self.timings = []
+        self.extra = {}
+
+    def __call__(self, fn, *args, rounds=20, **kwargs):
+        result = None
+        for _ in range(rounds):
+            started = time.perf_counter()
+            result = fn(*args, **kwargs)
+            self.timings.append(time.perf_counter() - started)
+        return result
+
+    def stats(self):
+        data = sorted(self.timings)
+        if not data:
+            return {}
+
+        def pct(p):
+            return data[min(len(data) - 1, int(round(p / 100 * (len(data) - 1))))] * 1000
+
+        return {
+            "rounds": len(data),
+            "ops_per_sec": len(data) / sum(data),
+            "p50_ms": pct(50),
+            "p95_ms": pct(95),
+            "p99_ms": pct(99),
+        }
+
+
+@pytest.fixture
+def benchmark(request):
+    bench = Benchmark(request.node.name)
+    yield bench
+    _BENCH_RESULTS.append(bench)
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "bench: benchmark against the local Convert simulator")
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _BENCH_RESULTS:
+        return
+    terminalreporter.section("convert benchmarks")
+    for bench in _BENCH_RESULTS:
+        stats = bench.stats()
+        if not stats:
+            continue
+        extra = " ".join(f"{k}={v}" for k, v in bench.extra.items())
+        terminalreporter.write_line(
+            f"{bench.name:<45} n={stats['rounds']:<4} {stats['ops_per_sec']:8.1f} ops/s "
+            f"p50={stats['p50_ms']:.2f}ms p95={stats['p95_ms']:.2f}ms p99={stats['p99_ms']:.2f}ms {extra}"
+        )
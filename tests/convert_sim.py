@@ -0,0 +1,239 @@
+"""
+Локальний симулятор ``/sapi/v1/convert/*`` для тестів і бенчмарків.
+
+Піднімає ``ThreadingHTTPServer`` на 127.0.0.1 з keep-alive і емулює:
+exchangeInfo/assetInfo/getQuote/acceptQuote/orderStatus/tradeFlow та
+``/api/v3/time``. Налаштовується затримка, TTL котирувань, ін'єкція кодів
+помилок (-1021, -429, 345231, -2010, ...) і заголовки ваги.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import socket
+import threading
+import time
+from collections import Counter, deque
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+# код помилки -> HTTP статус
+_ERROR_STATUS = {-1003: 429, -429: 429}
+# реальні ваги Binance; за замовчуванням симулятор рахує по 1, щоб не впиратися в ліміт у тестах
+BINANCE_WEIGHTS = {"getQuote": 200, "acceptQuote": 500, "exchangeInfo": 3000, "orderStatus": 100, "tradeFlow": 3000}
+
+
+class ConvertSimulator:
+    def __init__(
+        self,
+        pairs: Optional[List[Tuple[str, str]]] = None,
+        *,
+        latency_ms: float = 0.0,
+        quote_ttl_ms: int = 10000,
+        ratio: str = "0.00001",
+        weights: Optional[Dict[str, int]] = None,
+        min_amount: str = "0.0001",
+        max_amount: str = "100000",
+    ) -> None:
+        self.pairs = pairs if pairs is not None else [("USDT", "BTC"), ("BTC", "USDT"), ("USDT", "ETH"), ("ETH", "BTC")]
+        # exchangeInfo без фільтрів: на Binance — лише частина пар; ``None`` — усі ``pairs``
+        self.unfiltered_pairs: Optional[List[Tuple[str, str]]] = None
+        self.latency_ms = latency_ms
+        self.quote_ttl_ms = quote_ttl_ms
+        self.ratio = Decimal(ratio)
+        self.min_amount = min_amount
+        self.max_amount = max_amount
+        self.clock_skew_ms = 0
+        # затримка відповіді після обробки, мс: ``delays["acceptQuote"]`` — ордер є, відповідь запізнюється
+        self.delays: Dict[str, float] = {}
+        self.calls: Counter = Counter()
+        self.quotes: Dict[str, Dict[str, Any]] = {}
+        self.orders: Dict[str, Dict[str, Any]] = {}
+        self._errors: Dict[str, Deque[int]] = {}
+        self._ids = itertools.count(1)
+        self.weights = dict(weights or {})
+        self._weight = 0
+        self._weight_window = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    # --- керування ---------------------------------------------------------------
+    @property
+    def url(self) -> str:
+        assert self._server is not None
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def inject(self, endpoint: str, code: int, times: int = 1) -> None:
+        """
+        Наступні ``times`` викликів ``endpoint`` (напр. ``acceptQuote``) повернуть ``code``;
+        ``code`` 5xx — HTTP-статус без коду біржі.
+        """
+
+        with self._lock:
+            self._errors.setdefault(endpoint, deque()).extend([code] * times)
+
+    def start(self) -> "ConvertSimulator":
+        sim = self
+
+        class Handler(_Handler):
+            simulator = sim
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    # --- ендпойнти ----------------------------------------------------------------
+    def now_ms(self) -> int:
+        return int(time.time() * 1000) + self.clock_skew_ms
+
+    def handle(self, endpoint: str, params: Dict[str, str]) -> Tuple[int, Any]:
+        with self._lock:
+            self.calls[endpoint] += 1
+            window = int(time.time() // 60)
+            if window != self._weight_window:
+                self._weight, self._weight_window = 0, window
+            self._weight += self.weights.get(endpoint, 1)
+            pending = self._errors.get(endpoint)
+            code = pending.popleft() if pending else None
+        if code is not None and 500 <= code < 600:
+            return code, {"msg": "injected"}
+        if code is not None:
+            return _ERROR_STATUS.get(code, 400), {"code": code, "msg": "injected"}
+        if "signature" in params and "timestamp" in params:
+            skew = int(params["timestamp"]) - self.now_ms()
+            if skew > 1000 or skew < -int(params.get("recvWindow", 5000)):
+                return 400, {"code": -1021, "msg": "Timestamp for this request is outside of the recvWindow."}
+        handler = getattr(self, f"_ep_{endpoint}", None)
+        if handler is None:
+            return 404, {"code": -1, "msg": f"unknown endpoint {endpoint}"}
+        return handler(params)
+
+    def _ep_time(self, params):
+        return 200, {"serverTime": self.now_ms()}
+
+    def _ep_exchangeInfo(self, params):
+        f, t = params.get("fromAsset"), params.get("toAsset")
+        listed = self.unfiltered_pairs if not f and not t and self.unfiltered_pairs is not None else self.pairs
+        rows = [
+            {"fromAsset": a, "toAsset": b, "fromAssetMinAmount": self.min_amount, "fromAssetMaxAmount": self.max_amount}
+            for a, b in listed
+            if (not f or a == f) and (not t or b == t)
+        ]
+        if f and t and not rows:
+            return 400, {"code": 345239, "msg": "pair not supported"}
+        return 200, rows
+
+    def _ep_assetInfo(self, params):
+        assets = sorted({a for pair in self.pairs for a in pair})
+        return 200, [{"asset": a, "fraction": 8} for a in assets]
+
+    def _ep_getQuote(self, params):
+        amount = Decimal(params["fromAmount"])
+        if amount < Decimal(self.min_amount) or amount > Decimal(self.max_amount):
+            return 400, {"code": 345103, "msg": "amount outside of pair limits"}
+        qid = str(next(self._ids))
+        quote = {
+            "quoteId": qid,
+            "ratio": str(self.ratio),
+            "inverseRatio": str(1 / self.ratio),
+            "validTimestamp": self.now_ms() + self.quote_ttl_ms,
+            "toAmount": str(amount * self.ratio),
+            "fromAmount": str(amount),
+        }
+        with self._lock:
+            self.quotes[qid] = dict(quote, fromAsset=params["fromAsset"], toAsset=params["toAsset"])
+        return 200, quote
+
+    def _ep_acceptQuote(self, params):
+        with self._lock:
+            quote = self.quotes.pop(params.get("quoteId", ""), None)
+        if quote is None or quote["validTimestamp"] < self.now_ms():
+            return 400, {"code": 345231, "msg": "quote expired"}
+        order_id = str(next(self._ids))
+        order = {
+            "orderId": order_id,
+            "orderStatus": "SUCCESS",
+            "fromAsset": quote["fromAsset"],
+            "fromAmount": quote["fromAmount"],
+            "toAsset": quote["toAsset"],
+            "toAmount": quote["toAmount"],
+            "ratio": quote["ratio"],
+            "createTime": self.now_ms(),
+            "quoteId": quote["quoteId"],
+        }
+        with self._lock:
+            self.orders[order_id] = order
+        return 200, {"orderId": order_id, "createTime": order["createTime"], "orderStatus": "PROCESS"}
+
+    def _ep_orderStatus(self, params):
+        order = self.orders.get(params.get("orderId", ""))
+        if order is None:
+            return 400, {"code": 345233, "msg": "order not found"}
+        return 200, order
+
+    def _ep_tradeFlow(self, params):
+        start, end = int(params["startTime"]), int(params["endTime"])
+        limit = int(params.get("limit", 100))
+        rows = sorted(
+            (o for o in self.orders.values() if start <= o["createTime"] <= end), key=lambda o: o["createTime"]
+        )
+        return 200, {
+            "list": rows[:limit],
+            "startTime": start,
+            "endTime": end,
+            "limit": limit,
+            "moreData": len(rows) > limit,
+        }
+
+    def headers(self) -> Dict[str, str]:
+        with self._lock:
+            return {"X-SAPI-USED-IP-WEIGHT-1M": str(self._weight), "X-SAPI-USED-UID-WEIGHT-1M": str(self._weight)}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    simulator: ConvertSimulator
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def _reply(self):
+        sim = self.simulator
+        parts = urlsplit(self.path)
+        params = dict(parse_qsl(parts.query))
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            params.update(parse_qsl(self.rfile.read(length).decode()))
+        if sim.latency_ms:
+            time.sleep(sim.latency_ms / 1000.0)
+        endpoint = parts.path.rsplit("/", 1)[-1]
+        status, body = sim.handle(endpoint, params)
+        if sim.delays.get(endpoint):
+            time.sleep(sim.delays[endpoint] / 1000.0)
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in sim.headers().items():
+            self.send_header(name, value)
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = _reply
+    do_POST = _reply
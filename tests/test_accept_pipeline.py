@@ -0,0 +1,91 @@
+import time
+from decimal import Decimal
+
+import pytest
+
+
+class _Expired(Exception):
+    class _Resp:
+        def json(self):
+            return {"code": 345231}
+
+    def __init__(self):
+        self.response = self._Resp()
+
+
+def _quote(qid, ttl_ms):
+    from src.core.convert_api import ConvertQuote
+    from src.core.utils import now_ms
+
+    return ConvertQuote(
+        qid, "USDT", "BTC", Decimal("1"), Decimal("2"), Decimal("2"), now_ms() + ttl_ms, {"quoteId": qid}
+    )
+
+
+def test_short_ttl_uses_shadow_quote_on_345231():
+    from src.core.accept_pipeline import AcceptStats, QuotePipeline
+
+    issued = iter(["q1", "q2", "q3"])
+    fetched, accepted = [], []
+
+    def fetch():
+        qid = next(issued)
+        fetched.append(qid)
+        time.sleep(0.02)
+        return _quote(qid, 500 if qid == "q1" else 30000)
+
+    def accept(qid):
+        accepted.append(qid)
+        if qid == "q1":
+            raise _Expired()
+        return {"orderId": "o-" + qid}
+
+    stats = AcceptStats()
+    result = QuotePipeline(fetch, accept, safety_ms=1200, stats=stats).run()
+    assert result["orderId"] == "o-q2" and result["quote"] == {"quoteId": "q2"}
+    assert fetched == ["q1", "q2"] and accepted == ["q1", "q2"]
+    hist = {row["ttl"]: row for row in stats.histogram()}
+    assert hist["0-1000ms"]["expired"] == 1
+    assert hist[">=10000ms"]["count"] == 1
+
+
+def test_other_errors_propagate_and_missing_quote_fails():
+    from src.core.accept_pipeline import AcceptStats, QuotePipeline
+
+    def accept(qid):
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        QuotePipeline(lambda: _quote("q", 30000), accept, safety_ms=1200, stats=AcceptStats()).run()
+    with pytest.raises(RuntimeError):
+        QuotePipeline(lambda: None, accept, safety_ms=1200, stats=AcceptStats(), label="USDT->BTC").run()
+
+
+def test_unused_shadow_is_settled_and_charged():
+    from src.core import metrics
+    from src.core.accept_pipeline import AcceptStats, QuotePipeline
+    from src.core.quote_engine import QuoteBudget
+
+    metrics.reset()
+    fetched = []
+
+    def fetch():
+        fetched.append(len(fetched))
+        time.sleep(0.05)
+        return _quote(f"q{len(fetched)}", 30000)
+
+    def accept(qid):
+        time.sleep(0.1)
+        return {"orderId": "o"}
+
+    budget = QuoteBudget(1)
+    pipeline = QuotePipeline(fetch, accept, safety_ms=1200, stats=AcceptStats(), budget=budget)
+    assert pipeline.run(_quote("q0", 500))["orderId"] == "o"
+    # тіньове котирування дочекане до виходу з run, списане з бюджету й враховане в метриках
+    assert fetched == [0] and budget.used == 1 and pipeline._shadow is None
+    assert 'convert_shadow_quotes_total{result="unused"} 1' in metrics.render()
+
+    # бюджет вичерпано -> тіньового котирування немає
+    QuotePipeline(fetch, accept, safety_ms=1200, stats=AcceptStats(), budget=budget).run(_quote("q0", 500))
+    assert fetched == [0]
+    metrics.reset()
@@ -0,0 +1,95 @@
+from decimal import Decimal
+
+
+def _accounts():
+    from src.core.accounts import Account
+
+    return [
+        Account("a", "key-a", "secret-a", wallets=("SPOT", "FUNDING"), qps=1000),
+        Account("b", "key-b", "secret-b", wallets=("SPOT",), qps=1000),
+    ]
+
+
+def test_load_accounts_defaults_to_single_implicit_account():
+    from src.core import accounts
+
+    assert [a.name for a in accounts.load_accounts({})] == ["main"]
+    loaded = accounts.load_accounts(
+        {"sub1": {"api_key": "k", "secret_key": "s", "wallets": ["spot", "SPOT", "funding"]}}
+    )
+    assert loaded[0].wallets == ("SPOT", "FUNDING") and not loaded[0].uses_default_client
+
+
+def test_run_phase_across_accounts_merges_outputs(convert_sim, tmp_path, monkeypatch):
+    from src import app
+    from src.core import accounts, binance_client, candidates
+
+    monkeypatch.setattr(binance_client, "BASE_URL", convert_sim.url)
+    monkeypatch.setattr(accounts, "_sessions", {})
+    routes = [{"from": "USDT", "to": "BTC", "amount": "5"}, {"from": "USDT", "to": "ETH", "amount": "5"}]
+
+    run = app.run_phase("asia", "analyze", True, routes, tmp_path, account_list=_accounts())
+    assert run.summary.total == 6 and run.summary.ok == 6
+
+    summary = candidates.load_summary(tmp_path, "asia", "analyze")
+    assert summary["total"] == 6 and summary["accounts"] == {"a": {"total": 4, "ok": 4}, "b": {"total": 2, "ok": 2}}
+    lanes = {(r["account"], r["wallet"]) for r in candidates.iter_candidates(tmp_path, summary)}
+    assert lanes == {("a", "SPOT"), ("a", "FUNDING"), ("b", "SPOT")}
+
+    # кожен акаунт — власний клієнт (підпис, лімітер, пул), не спільний клієнт процесу
+    clients = [accounts.session_for(a).client for a in _accounts()]
+    assert clients[0] is not clients[1] and binance_client.default_client() not in clients
+    assert all(c.clock.sync_count for c in clients)
+    accounts.close_sessions()
+
+
+def test_dedup_is_scoped_per_account(convert_sim, monkeypatch):
+    from src.core import accounts, binance_client, convert_api
+
+    monkeypatch.setattr(binance_client, "BASE_URL", convert_sim.url)
+    monkeypatch.setattr(accounts, "_sessions", {})
+    route = convert_api.route_exists("USDT", "BTC")
+    a, b = _accounts()
+    with accounts.activate(a):
+        assert convert_api.execute_unique(route, Decimal("5"), "SPOT")
+    with accounts.activate(b):
+        assert convert_api.execute_unique(route, Decimal("5"), "SPOT")
+        assert convert_api.execute_unique(route, Decimal("5"), "SPOT") is None
+    accounts.close_sessions()
+
+
+def test_risk_guard_is_scoped_and_seeded_per_account(convert_sim, tmp_path, monkeypatch):
+    from src import app
+    from src.core import accounts, balance, binance_client, guard, portfolio
+
+    monkeypatch.setattr(binance_client, "BASE_URL", convert_sim.url)
+    monkeypatch.setattr(accounts, "_sessions", {})
+    monkeypatch.setattr(portfolio, "fetch_prices", lambda assets: {a: 1.0 for a in assets})
+    seeded_from = []
+
+    def snapshot(self):
+        seeded_from.append(self)
+        return {"SPOT": {"USDT": 100.0}}
+
+    monkeypatch.setattr(balance.BalanceService, "snapshot", snapshot)
+    make = guard.guard_for
+
+    def guard_for(name):
+        risk = make(name)
+        risk.max_drawdown = 0.5
+        return risk
+
+    monkeypatch.setattr(guard, "guard_for", guard_for)
+    routes = [{"from": "USDT", "to": "BTC", "amount": "5"}]
+
+    run = app.run_phase("asia", "trade", False, routes, tmp_path, account_list=_accounts())
+    assert run.summary.ok == 3 and convert_sim.calls["acceptQuote"] == 3
+
+    # fills кожного акаунта — лише в його гарді, спільний гард процесу не зачеплено
+    risk_a, risk_b = (accounts.session_for(a).guard for a in _accounts())
+    assert risk_a.path != risk_b.path and risk_a.path.parent.parent == guard.default_guard().path.parent
+    assert (risk_a.fills, risk_b.fills, guard.default_guard().fills) == (2, 1, 0)
+    assert risk_a.seeded and risk_b.seeded and not guard.default_guard().seeded
+    assert {id(s) for s in seeded_from} == {id(accounts.session_for(a).balances) for a in _accounts()}
+    assert guard.RiskGuard(risk_a.path).load().fills == 2
+    accounts.close_sessions()
@@ -0,0 +1,54 @@
+import tracemalloc
+from decimal import Decimal
+
+import pytest
+
+from src.core.amounts import Amount
+from src.core.utils import decimal_from_any, norm8
+
+
+@pytest.mark.parametrize(
+    "raw", ["5", "0.1", "12.345678919", "0.00000001", "1e-05", "-3.999999999", "100.", ".5", "", "+7.25"]
+)
+def test_parse_matches_norm8(raw):
+    amount = Amount.parse(raw)
+    expected = norm8(decimal_from_any(raw or "0"))
+    assert amount == expected and amount.to_decimal() == expected
+    assert str(amount) == format(expected, "f")
+    assert hash(amount) == hash(expected)
+
+
+def test_parse_rejects_garbage():
+    for raw in ("abc", "1.2.3", "NaN", True):
+        with pytest.raises(ValueError):
+            Amount.parse(raw)
+
+
+def test_arithmetic_and_comparisons():
+    a, b = Amount.parse("1.5"), Amount.parse("0.25")
+    assert str(a + b) == "1.75000000" and str(a - b) == "1.25000000"
+    assert sum([a, b]) == Decimal("1.75")
+    assert a * 3 == Decimal("4.5") and a * Decimal("0.333333333") == Decimal("0.49999999")
+    assert a / 4 == Decimal("0.375") and a / b == Decimal(6)
+    assert b < a and a > Decimal("1.49999999") and a >= 1 and not Amount()
+    assert {Decimal("1.5"): "x"}[a] == "x"
+
+
+@pytest.mark.bench
+def test_amount_parse_allocates_less_than_decimal(benchmark):
+    payloads = [f"{i}.{i * 7919 % 10**8:08d}123" for i in range(2000)]
+
+    def peak(fn):
+        tracemalloc.start()
+        kept = [fn(p) for p in payloads]
+        _, top = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del kept
+        return top
+
+    decimal_peak = peak(lambda p: norm8(decimal_from_any(p)))
+    amount_peak = peak(Amount.parse)
+    benchmark(lambda: [Amount.parse(p) for p in payloads], rounds=20)
+    benchmark.extra["decimal_bytes_per_quote"] = decimal_peak / len(payloads)
+    benchmark.extra["amount_bytes_per_quote"] = amount_peak / len(payloads)
+    assert amount_peak < decimal_peak
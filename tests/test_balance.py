@@ -0,0 +1,105 @@
+import threading
+import time
+from decimal import Decimal
+
+import pytest
+
+
+def _service(ttl=30.0):
+    from src.core.balance import BalanceService
+
+    calls = {"SPOT": 0, "FUNDING": 0}
+    threads = set()
+
+    def fetcher(wallet, data):
+        def fetch():
+            calls[wallet] += 1
+            threads.add(threading.current_thread().name)
+            time.sleep(0.1)
+            return dict(data)
+
+        return fetch
+
+    svc = BalanceService(
+        {
+            "SPOT": fetcher("SPOT", {"USDT": Decimal("100"), "BTC": Decimal("0.001")}),
+            "FUNDING": fetcher("FUNDING", {"USDT": Decimal("5")}),
+        },
+        ttl_sec=ttl,
+    )
+    return svc, calls, threads
+
+
+def test_parallel_fetch_and_ttl():
+    svc, calls, threads = _service()
+    started = time.monotonic()
+    snap = svc.snapshot()
+    assert time.monotonic() - started < 0.18  # обидва гаманці паралельно
+    assert len(threads) == 2
+    assert snap["FUNDING"]["USDT"] == Decimal("5")
+    assert svc.get("btc") == Decimal("0.001")
+    assert calls == {"SPOT": 1, "FUNDING": 1}
+
+    svc.ttl_sec = 0.0
+    svc.get("USDT")
+    assert calls == {"SPOT": 2, "FUNDING": 2}
+
+
+def test_local_deltas_and_drift_resync():
+    from src.core.convert_api import ConvertRoute, ConvertStep
+
+    svc, calls, _ = _service()
+    svc.snapshot()
+    route = ConvertRoute(steps=(ConvertStep("USDT", "ETH"), ConvertStep("ETH", "BTC")))
+    results = [
+        {"quote": {"fromAmount": "10", "toAmount": "0.004"}},
+        {"quote": {"fromAmount": "0.004", "toAmount": "0.0002"}},
+    ]
+    svc.apply_route(route.steps, results, "SPOT")
+    assert svc.get("USDT") == Decimal("90")
+    assert svc.get("ETH") == Decimal("0")
+    assert svc.get("BTC") == Decimal("0.0012")
+    assert calls["SPOT"] == 1
+
+    svc.apply("USDT", "BTC", "500", "0.01")  # більше, ніж є -> drift
+    assert not svc.fresh
+    assert svc.get("USDT") == Decimal("100") and calls["SPOT"] == 2
+
+
+def test_execute_route_applies_deltas(convert_sim, monkeypatch):
+    from src.core import balance, convert_api
+
+    svc, calls, _ = _service()
+    monkeypatch.setattr(balance, "_default_service", svc)
+    svc.snapshot()
+    route = convert_api.route_exists("USDT", "BTC")
+    convert_api.execute_route(route, Decimal("20"))
+    assert svc.get("USDT") == Decimal("80")
+    assert svc.get("BTC") == Decimal("0.001") + Decimal("20") * Decimal("0.00001")
+    assert calls["SPOT"] == 1
+
+
+def test_trade_phase_accept_uses_dedup_breaker_and_snapshot(convert_sim, tmp_path, monkeypatch):
+    from src import app
+    from src.core import balance, convert_api, pair_health
+
+    svc, _, _ = _service()
+    monkeypatch.setattr(balance, "_default_service", svc)
+    svc.snapshot()
+    routes = [{"from": "USDT", "to": "BTC", "amount": "20"}]
+
+    run = app.run_phase("asia", "trade", False, routes, tmp_path)
+    assert run.summary.ok == 1 and convert_sim.calls["acceptQuote"] == 1
+    assert svc.get("USDT") == Decimal("80")
+
+    # перекриття cron / повторний запуск: той самий accept — дубль
+    app.run_phase("asia", "trade", False, routes, tmp_path)
+    assert convert_sim.calls["acceptQuote"] == 1
+
+    # breaker, що відкрився між котируванням і accept, не пропускає accept
+    quote = convert_api.get_quote("USDT", "BTC", Decimal("30"))
+    for _ in range(pair_health.THRESHOLD):
+        pair_health.default_health().record_error("USDT", "BTC", "business")
+    with pytest.raises(pair_health.CircuitOpenError):
+        convert_api.accept_unique(quote)
+    assert convert_sim.calls["acceptQuote"] == 1
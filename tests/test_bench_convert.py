@@ -0,0 +1,65 @@
+from decimal import Decimal
+
+import pytest
+
+pytestmark = pytest.mark.bench
+
+
+def test_bench_quote_fan_out(convert_sim, benchmark):
+    from src.core.quote_engine import QuoteTask, fan_out
+
+    convert_sim.latency_ms = 5
+    tasks = [QuoteTask("USDT", "BTC", Decimal("10") + i) for i in range(40)]
+    run = benchmark(fan_out, tasks, max_workers=8, rounds=3)
+    assert run.summary.ok == 40
+    benchmark.extra["quotes_per_sec"] = round(40 / (run.summary.wall_ms / 1000.0))
+    assert convert_sim.calls["getQuote"] == 120
+
+
+def test_bench_execute_route_direct_and_hub(convert_sim, benchmark):
+    from src.core import convert_api
+
+    direct = convert_api.route_exists("USDT", "BTC")
+    hub = convert_api.ConvertRoute((convert_api.ConvertStep("USDT", "ETH"), convert_api.ConvertStep("ETH", "BTC")))
+    out = benchmark(convert_api.execute_route, direct, Decimal("1000"), rounds=10)
+    assert out[0]["orderId"]
+    out = benchmark(convert_api.execute_route, hub, Decimal("1000"), rounds=10)
+    assert len(out) == 2
+    assert convert_sim.calls["acceptQuote"] == 30
+
+
+def test_bench_execute_unique(convert_sim, benchmark):
+    from src.core import convert_api
+
+    route = convert_api.route_exists("USDT", "BTC")
+    amounts = iter(Decimal(100 + 10 * i) for i in range(1000))
+    benchmark(lambda: convert_api.execute_unique(route, next(amounts), "SPOT"), rounds=20)
+    assert convert_api.execute_unique(route, Decimal("100.5"), "SPOT") is None
+    assert convert_sim.calls["acceptQuote"] == 20
+
+
+def test_bench_accept_retry_overhead(convert_sim, benchmark):
+    from src.core import convert_api
+    from src.core import convert_middleware as mw
+
+    def accept_once(inject):
+        if inject:
+            convert_sim.inject("acceptQuote", inject)
+        quote = mw.get_quote("USDT", "BTC", Decimal("1"))
+        return mw.accept_quote(quote)
+
+    clean = benchmark(accept_once, None, rounds=10)
+    assert clean["orderId"]
+    clean_p50 = benchmark.stats()["p50_ms"]
+    benchmark.timings.clear()
+    retried = benchmark(accept_once, -429, rounds=10)
+    assert retried["orderId"]
+    benchmark.extra["retry_overhead_ms"] = round(benchmark.stats()["p50_ms"] - clean_p50, 2)
+    assert convert_sim.calls["acceptQuote"] == 30
+
+    convert_sim.inject("acceptQuote", -2010)
+    assert accept_once(None) is None  # business_skip
+
+    convert_sim.inject("acceptQuote", 345231)
+    result = convert_api.execute_conversion("USDT", "BTC", Decimal("5"))
+    assert result["orderId"] and convert_sim.calls["getQuote"] == 23
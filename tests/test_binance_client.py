@@ -0,0 +1,98 @@
+import hashlib
+import hmac
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import pytest
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def _reply(self):
+        srv = self.server
+        srv.ports.add(self.client_address[1])
+        srv.calls += 1
+        parts = urlsplit(self.path)
+        srv.queries.append(dict(parse_qsl(parts.query)))
+        status, body = 200, {"ok": 1}
+        if srv.fail_first and srv.calls == 1:
+            status, body = 429, {"code": -1003, "msg": "Too many requests"}
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("X-SAPI-USED-IP-WEIGHT-1M", str(srv.used_weight))
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = _reply
+    do_POST = _reply
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.ports, server.queries, server.calls = set(), [], 0
+    server.fail_first, server.used_weight = False, 10
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _client(stub, **kw):
+    from src.core.binance_client import AdaptiveRateLimiter, BinanceClient
+
+    limiter = AdaptiveRateLimiter(50, 50, max_qps=100)
+    return BinanceClient("key", "secret", base_url=f"http://127.0.0.1:{stub.server_port}", limiter=limiter, **kw)
+
+
+def test_connection_is_reused(stub):
+    client = _client(stub)
+    for _ in range(5):
+        assert client.get("/sapi/v1/convert/exchangeInfo", {"fromAsset": "USDT"}) == {"ok": 1}
+    assert stub.calls == 5
+    assert len(stub.ports) == 1
+
+
+def test_signed_query_verifies(stub):
+    client = _client(stub)
+    client.post("/sapi/v1/convert/getQuote", {"fromAsset": "USDT", "toAsset": "BTC"}, signed=True)
+    query = stub.queries[-1]
+    signature = query.pop("signature")
+    raw = "&".join(f"{k}={v}" for k, v in query.items())
+    assert signature == hmac.new(b"secret", raw.encode(), hashlib.sha256).hexdigest()
+    assert "timestamp" in query and "recvWindow" in query
+
+
+def test_backoff_on_429_then_success(stub):
+    stub.fail_first = True
+    client = _client(stub)
+    assert client.get("/api/v3/time") == {"ok": 1}
+    assert stub.calls == 2
+
+
+def test_limiter_slows_down_near_weight_limit(stub):
+    client = _client(stub)
+    client.get("/api/v3/time")
+    fast = client.limiter.rate
+    stub.used_weight = 10750  # ~90% від 12000
+    client.get("/api/v3/time")
+    assert client.limiter.rate < fast
+    stub.used_weight = 11900
+    client.get("/api/v3/time")
+    assert client.limiter.blocked_for > 0
@@ -0,0 +1,63 @@
+import json
+
+
+def test_sink_streams_rows_and_summarises(tmp_path):
+    from src.core import candidates
+
+    with candidates.CandidateSink(tmp_path, "asia", "analyze") as sink:
+        sink.write({"from": "USDT", "to": "BTC", "ok": 1, "ratio": "0.00001"})
+        assert (tmp_path / "candidates.jsonl").read_text().count("\n") == 1  # рядок на диску одразу
+        sink.write({"from": "USDT", "to": "BTC", "ok": 1, "ratio": "0.00002"})
+        sink.write({"from": "USDT", "to": "ETH", "ok": 0, "error": "-2010 insufficient balance"})
+        sink.write({"from": "USDT", "to": "SOL", "ok": 0, "skipped": 1, "error": "budget exhausted"})
+
+    summary = candidates.load_summary(tmp_path, "asia", "analyze")
+    assert (summary["total"], summary["ok"], summary["errors"], summary["skipped"]) == (4, 2, 1, 1)
+    assert summary["best"] == {"USDT->BTC": "0.00002"}
+
+    with candidates.CandidateSink(tmp_path, "asia", "trade") as sink:
+        sink.write({"from": "USDT", "to": "BTC", "ok": 1, "ratio": "0.00003"})
+
+    rows = list(candidates.iter_candidates(tmp_path, summary))
+    assert [r.get("error") for r in rows][2] == "-2010 insufficient balance" and len(rows) == 4
+    trade = candidates.load_summary(tmp_path, "asia", "trade")
+    assert [r["ratio"] for r in candidates.iter_candidates(tmp_path, trade)] == ["0.00003"]
+
+    cols = candidates.read_columns(candidates.compact(tmp_path))
+    assert list(cols["ratio"]) == ["0.00001", "0.00002", "", "", "0.00003"]
+
+
+def test_run_phase_writes_stream(convert_sim, tmp_path):
+    from src import app
+
+    routes = [{"from": "USDT", "to": "BTC", "amount": "5"}, {"from": "USDT", "to": "ETH", "amount": "0.00000001"}]
+    run = app.run_phase("asia", "analyze", True, routes=routes, out_dir=tmp_path)
+    assert run.summary.ok == 1
+    lines = [json.loads(x) for x in (tmp_path / "candidates.jsonl").read_text().splitlines()]
+    assert sorted((r["to"], r["ok"]) for r in lines) == [("BTC", 1), ("ETH", 0)]
+    assert "Latency:      quotes=2" in (tmp_path / "summary.txt").read_text()
+
+
+def test_concurrent_sinks_keep_their_own_rows_and_summaries(tmp_path):
+    from src.core import candidates
+
+    asia = candidates.CandidateSink(tmp_path, "asia", "analyze")
+    us = candidates.CandidateSink(tmp_path, "us", "analyze")
+    for i in range(3):
+        asia.write({"region": "asia", "phase": "analyze", "from": "USDT", "to": "BTC", "ok": 1, "ratio": str(i)})
+        us.write({"region": "us", "phase": "analyze", "from": "USDT", "to": "ETH", "ok": 1, "ratio": str(i)})
+    us.close()
+    asia.close()
+
+    # обидва підсумки вцілілі (read-modify-write під flock), діапазони перекриваються
+    asia_sum = candidates.load_summary(tmp_path, "asia", "analyze")
+    us_sum = candidates.load_summary(tmp_path, "us", "analyze")
+    assert asia_sum["offset"] < us_sum["end"] and us_sum["offset"] < asia_sum["end"]
+    assert {r["to"] for r in candidates.iter_candidates(tmp_path, asia_sum)} == {"BTC"}
+    assert [r["to"] for r in candidates.iter_candidates(tmp_path, us_sum)] == ["ETH"] * 3
+
+    # журнал ротовано після прогону: рядки нового журналу не видаються за старий прогін
+    with candidates.CandidateSink(tmp_path, "us", "trade", max_bytes=0) as sink:
+        for _ in range(10):
+            sink.write({"region": "asia", "phase": "analyze", "from": "USDT", "to": "SOL", "ok": 1})
+    assert list(candidates.iter_candidates(tmp_path, asia_sum)) == []
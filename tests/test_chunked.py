@@ -0,0 +1,38 @@
+from decimal import Decimal
+
+import pytest
+
+
+def test_split_amount_respects_limits_and_sum():
+    from src.core.chunked import split_amount
+
+    assert split_amount(Decimal("5"), Decimal("1"), Decimal("10")) == [Decimal("5")]
+    parts = split_amount(Decimal("25.123456789"), Decimal("1"), Decimal("10"))
+    assert len(parts) == 3 and all(p <= Decimal("10") for p in parts)
+    assert sum(parts) == Decimal("25.12345678")
+    with pytest.raises(ValueError):
+        split_amount(Decimal("10.5"), Decimal("6"), Decimal("10"))
+
+
+def test_execute_conversion_above_max_runs_chunks(convert_sim):
+    from src.core import convert_api
+    from src.core.utils import QUANT8
+
+    convert_sim.max_amount = "10"
+    result = convert_api.execute_conversion("USDT", "BTC", Decimal("35"))
+    assert len(result["chunks"]) == 4 and len(set(result["orderIds"])) == 4
+    assert not result["failed"]
+    assert Decimal(result["quote"]["fromAmount"]) == Decimal("35")
+    assert Decimal(result["quote"]["toAmount"]) == (Decimal("35") * Decimal("0.00001")).quantize(QUANT8)
+    assert all(Decimal(c["slippage_bps"]) == 0 for c in result["chunks"])
+    assert convert_sim.calls["acceptQuote"] == 4
+
+
+def test_partial_chunk_failure_is_reported(convert_sim):
+    from src.core import convert_api
+
+    convert_sim.max_amount = "10"
+    convert_sim.inject("acceptQuote", -1121, times=1)
+    result = convert_api.execute_conversion("USDT", "BTC", Decimal("20"))
+    assert len(result["chunks"]) == 1 and len(result["failed"]) == 1
+    assert Decimal(result["quote"]["fromAmount"]) == Decimal("10")
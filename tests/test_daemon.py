@@ -0,0 +1,63 @@
+import json
+import os
+import socket
+import stat
+import threading
+
+import pytest
+
+
+def test_cli_goes_through_daemon_and_falls_back(convert_sim, tmp_path, monkeypatch, capsys):
+    from src import cli, daemon
+
+    path = str(tmp_path / "d.sock")
+    monkeypatch.setattr(daemon, "SOCKET_PATH", path)
+
+    # демон не запущено -> виконання в процесі
+    assert cli.main(["quote", "USDT", "BTC", "1.5", "--wallet=SPOT"]) == 0
+    assert json.loads(capsys.readouterr().out)["fromAmount"] == "1.50000000"
+
+    server = daemon.serve(path)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    try:
+        served = []
+        orig = cli.dispatch
+        monkeypatch.setattr(cli, "dispatch", lambda c, p: served.append(c) or orig(c, p))
+        assert cli.main(["info", "USDT", "BTC"]) == 0
+        assert json.loads(capsys.readouterr().out)["route"] == "direct:USDT->BTC"
+        assert served == ["info"]
+
+        assert daemon.call("status", {"order_id": "404"})[0] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_hung_daemon_falls_back_and_live_socket_is_kept(convert_sim, tmp_path, monkeypatch, capsys):
+    from src import cli, daemon
+
+    path = str(tmp_path / "d.sock")
+    monkeypatch.setattr(daemon, "SOCKET_PATH", path)
+    monkeypatch.setattr(daemon, "_CALL_TIMEOUT_SEC", 0.2)
+    hung = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    hung.bind(path)
+    hung.listen(4)  # приймає з'єднання, але ніколи не відповідає
+    try:
+        assert cli.main(["info", "USDT", "BTC"]) == 0
+        assert json.loads(capsys.readouterr().out)["route"] == "direct:USDT->BTC"
+        # запит на конвертацію вже відправлено: без повтору в процесі
+        code, payload = daemon.call("now", {"from_asset": "USDT"})
+        assert code == 1 and "may have run" in payload["error"]
+
+        with pytest.raises(RuntimeError, match="already listening"):
+            daemon.serve(path, warm=False)
+        assert os.path.exists(path)
+    finally:
+        hung.close()
+
+    server = daemon.serve(path, warm=False)  # сокет процесу, що впав, замінюється
+    try:
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    finally:
+        server.server_close()
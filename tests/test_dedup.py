@@ -0,0 +1,102 @@
+from decimal import Decimal
+
+import pytest
+
+
+def test_claim_within_tolerance_across_instances(tmp_path):
+    from src.core.dedup import DedupIndex
+
+    path = tmp_path / "journal.jsonl"
+    first = DedupIndex(path)
+    route = ["USDT->BTC"]
+    assert first.claim(route, "spot", Decimal("100"))
+    assert not first.claim(route, "SPOT", Decimal("100.9"))
+    assert first.claim(route, "FUNDING", Decimal("100"))
+    assert first.claim(route, "SPOT", Decimal("105"))
+
+    # "інший процес" з тим самим журналом
+    second = DedupIndex(path)
+    assert not second.claim(route, "SPOT", Decimal("99.5"))
+    assert second.claim(["USDT->ETH"], "SPOT", Decimal("100"))
+    assert not first.claim(["USDT->ETH"], "SPOT", Decimal("100"))
+
+
+def test_window_and_reset(tmp_path):
+    from src.core.dedup import DedupIndex
+
+    path = tmp_path / "journal.jsonl"
+    idx = DedupIndex(path, window_sec=-1)
+    assert idx.claim(["A->B"], "SPOT", Decimal("1"))
+    assert idx.claim(["A->B"], "SPOT", Decimal("1"))  # запис уже поза вікном
+
+    idx = DedupIndex(path)
+    assert idx.claim(["A->B"], "SPOT", Decimal("2"))
+    idx.reset()
+    assert idx.claim(["A->B"], "SPOT", Decimal("2"))
+
+
+def test_next_day_trade_is_not_a_duplicate(tmp_path, monkeypatch):
+    from types import SimpleNamespace
+
+    from src.core import dedup
+
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(dedup, "time", SimpleNamespace(time=lambda: now[0]))
+    idx = dedup.DedupIndex(tmp_path / "journal.jsonl")
+    assert idx.claim(["USDT->BTC"], "SPOT", Decimal("10"))
+    now[0] += 600  # повтор у тому ж вікні
+    assert not idx.claim(["USDT->BTC"], "SPOT", Decimal("10"))
+    now[0] += 23 * 3600  # наступного дня trade випав раніше в межах вікна
+    assert idx.claim(["USDT->BTC"], "SPOT", Decimal("10"))
+
+
+def test_execute_unique_skips_duplicate(tmp_path, monkeypatch):
+    from src.core import convert_api, dedup
+
+    monkeypatch.setattr(dedup, "_default_index", dedup.DedupIndex(tmp_path / "journal.jsonl"))
+    calls = []
+    monkeypatch.setattr(
+        convert_api, "execute_route", lambda r, a, w, executed: calls.append(a) or executed.append({"orderId": 1})
+    )
+    route = convert_api.ConvertRoute((convert_api.ConvertStep("USDT", "BTC"),))
+    assert convert_api.execute_unique(route, Decimal("10"), "SPOT") == [{"orderId": 1}]
+    assert convert_api.execute_unique(route, Decimal("10.05"), "SPOT") is None
+    assert calls == [Decimal("10")]
+
+
+def test_failed_attempt_releases_claim(convert_sim, tmp_path):
+    import requests
+
+    from src.core import convert_api, dedup
+
+    route = convert_api.ConvertRoute((convert_api.ConvertStep("USDT", "BTC"),))
+    convert_sim.inject("acceptQuote", -1002, times=1)
+    with pytest.raises(requests.HTTPError):
+        convert_api.execute_unique(route, Decimal("10"), "SPOT")
+    # інший процес бачить зняття claim; його власне зняття бачить цей
+    other = dedup.DedupIndex(dedup.default_index().path)
+    assert other.claim(["USDT->BTC"], "SPOT", Decimal("10"))
+    other.release(["USDT->BTC"], "SPOT", Decimal("10"))
+    assert convert_api.execute_unique(route, Decimal("10"), "SPOT")
+    assert convert_api.execute_unique(route, Decimal("10"), "SPOT") is None
+    assert not dedup.DedupIndex(dedup.default_index().path).claim(["USDT->BTC"], "SPOT", Decimal("10"))
+
+
+def test_unknown_accept_outcome_keeps_claim(convert_sim, monkeypatch):
+    import requests
+
+    from src.core import binance_client, convert_api
+
+    route = convert_api.ConvertRoute((convert_api.ConvertStep("USDT", "BTC"),))
+    monkeypatch.setattr(binance_client.default_client(), "timeout", 0.2)
+    convert_sim.delays["acceptQuote"] = 500  # ордер створено, відповідь не дійшла
+    with pytest.raises(requests.Timeout):
+        convert_api.execute_unique(route, Decimal("10"), "SPOT")
+    convert_sim.delays.clear()
+    assert convert_api.execute_unique(route, Decimal("10"), "SPOT") is None
+    assert len(convert_sim.orders) == 1 and convert_sim.calls["acceptQuote"] == 1
+
+    convert_sim.inject("acceptQuote", 503)  # 5xx без коду біржі — теж невідомо
+    with pytest.raises(requests.HTTPError):
+        convert_api.execute_unique(route, Decimal("20"), "SPOT")
+    assert convert_api.execute_unique(route, Decimal("20"), "SPOT") is None
@@ -0,0 +1,100 @@
+from decimal import Decimal
+
+from src.core.amounts import Amount
+from src.core.convert_api import ConvertLimits, ConvertRoute, ConvertStep
+
+PRICES = {"BTC": 50000.0, "ETH": 2500.0, "BNB": 500.0, "USDT": 1.0}
+
+
+def _routes(*pairs):
+    direct = set(pairs)
+
+    def route_for(a, b):
+        if (a, b) in direct:
+            return ConvertRoute((ConvertStep(a, b),))
+        if (a, "USDT") in direct and ("USDT", b) in direct:
+            return ConvertRoute((ConvertStep(a, "USDT"), ConvertStep("USDT", b)))
+        return None
+
+    return route_for
+
+
+def _limits(minimum="0.0001"):
+    return lambda a, b: ConvertLimits(Amount.parse(minimum), Amount())
+
+
+def test_plan_nets_flows_over_direct_pairs():
+    from src.core.ensure_invested import plan_rebalance
+
+    balances = {"BTC": "0.004", "BNB": "0.2", "USDT": "100"}  # 200 + 100 + 100 = 400 USDT
+    targets = {"BTC": 1, "ETH": 2, "BNB": 0, "USDT": 1}
+    route_for = _routes(("BTC", "ETH"), ("BNB", "ETH"), ("BTC", "USDT"), ("USDT", "ETH"))
+    plan = plan_rebalance(balances, targets, PRICES, route_for=route_for, limits_for=_limits())
+
+    assert plan.deltas == {"BTC": -100.0, "ETH": 200.0, "BNB": -100.0, "USDT": 0.0}
+    legs = {leg.label: leg for leg in plan.legs}
+    assert set(legs) == {"BTC->ETH", "BNB->ETH"} and all(leg.route.is_direct for leg in plan.legs)
+    assert legs["BTC->ETH"].amount == Decimal("0.002")
+    assert legs["BNB->ETH"].amount == Decimal("0.2")  # вага 0 -> увесь залишок
+    assert (plan.quotes, plan.naive_quotes) == (2, 3)
+
+
+def test_plan_uses_hubs_and_respects_limits():
+    from src.core.ensure_invested import plan_rebalance
+
+    balances = {"BTC": "0.004", "BNB": "0.05", "DOGE": "500"}  # 200 + 25 + 50 = 275 USDT
+    targets = {"BTC": 1, "ETH": 1, "BNB": 1, "DOGE": 0}
+    route_for = _routes(("BTC", "USDT"), ("USDT", "ETH"), ("USDT", "BNB"))
+    plan = plan_rebalance(
+        balances, targets, dict(PRICES, DOGE=0.1), min_trade_usdt=1, route_for=route_for, limits_for=_limits("0.0005")
+    )
+
+    # прямих пар між надлишком і нестачею немає -> BTC іде через USDT, спершу більший потік
+    assert [(leg.label, leg.route.description) for leg in plan.legs] == [("BTC->ETH", "hub:USDT")]
+    reasons = {row.get("leg") or row.get("asset"): row["reason"] for row in plan.skipped}
+    assert reasons["BTC->BNB"].startswith("below minimum")  # решта BTC ~16.7 USDT < 0.0005 BTC
+    assert reasons["DOGE"] == reasons["BNB"] == "no route"
+
+
+def test_ensure_invested_executes_all_legs(convert_sim):
+    from src.core import ensure_invested
+
+    convert_sim.ratio = Decimal("1")
+    report = ensure_invested.ensure_invested(
+        {"BTC": 2, "ETH": 1, "USDT": 1},
+        dry_run=False,
+        balances={"BTC": "0.004", "ETH": "0", "USDT": "0"},
+        prices=PRICES,
+    )
+    assert [leg["route"] for leg in report["legs"]] == ["direct:BTC->USDT", "hub:USDT"]
+    assert [len(r["orders"]) for r in report["results"]] == [1, 2]
+    assert convert_sim.calls["acceptQuote"] == report["quotes"] == 3
+
+
+def test_execute_plan_serialises_legs_of_one_source(monkeypatch):
+    import threading
+    import time
+
+    from src.core import convert_api, ensure_invested
+    from src.core.ensure_invested import Leg, RebalancePlan
+
+    def leg(a, b):
+        return Leg(a, b, Decimal("1"), 1.0, ConvertRoute((ConvertStep(a, b),)))
+
+    active, peak, lock = {}, {}, threading.Lock()
+
+    def fake_execute(route, amount, wallet):
+        src = route.steps[0].from_asset
+        with lock:
+            active[src] = active.get(src, 0) + 1
+            peak[src] = max(peak.get(src, 0), active[src])
+        time.sleep(0.02)
+        with lock:
+            active[src] -= 1
+        return [{"orderId": route.description}]
+
+    monkeypatch.setattr(convert_api, "execute_route", fake_execute)
+    plan = RebalancePlan(0.0, {}, [leg("BTC", "ETH"), leg("BNB", "ETH"), leg("BTC", "USDT")])
+    results = ensure_invested.execute_plan(plan, max_workers=4)
+    assert [r["orders"] for r in results] == [["direct:BTC->ETH"], ["direct:BNB->ETH"], ["direct:BTC->USDT"]]
+    assert peak == {"BTC": 1, "BNB": 1}  # один надлишок не списується двома потоками одночасно
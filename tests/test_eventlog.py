@@ -0,0 +1,78 @@
+import json
+from decimal import Decimal
+
+import pytest
+
+HOUR_MS = 3600 * 1000
+
+
+def test_index_query_rotation_and_retention(tmp_path):
+    from src.core.eventlog import EventLog, explain, query
+
+    now = [1_700_000_000.0]
+    log = EventLog(tmp_path, segment_bytes=1, flush_sec=3600, retention_days=7, clock=lambda: now[0])
+    old_ts = int(now[0] * 1000) - 8 * 24 * HOUR_MS
+    log.emit("http", ts=old_ts, endpoint="acceptQuote", pair="BTC/USDT", code=345231)
+    log.flush()
+    for i in range(5):
+        log.emit("http", endpoint="getQuote", pair="BTC/USDT", quoteId=f"q{i}", status="200")
+        log.emit("http", endpoint="acceptQuote", quoteId=f"q{i}", status="400", code=345231 if i % 2 else -2010)
+        log.flush()  # сегмент ротується між пачками
+    log.emit("http", endpoint="acceptQuote", pair="ETH/USDT", quoteId="e1", code=345231)
+    log.emit("log", level="WARNING", logger="x", msg="business_skip")
+    assert log.flush() == 2 and len(list(tmp_path.glob("events-*.jsonl"))) > 1  # ротація сегментів
+
+    since = int(now[0] * 1000) - 7 * 24 * HOUR_MS
+    rows = query(tmp_path, code=345231, pair="BTC->USDT", since_ms=since)
+    assert [r["quoteId"] for r in rows] == ["q1", "q3"]
+    assert all(r["pair"] == "BTC/USDT" for r in rows)  # пару acceptQuote підставлено з getQuote
+    assert [r["endpoint"] for r in query(tmp_path, quote_id="q2")] == ["getQuote", "acceptQuote"]
+    assert len(query(tmp_path, code=345231, pair="BTC/USDT")) == 3  # без since — і стара подія
+    plan = " ".join(explain(tmp_path, code=345231, pair="BTC/USDT", since_ms=since))
+    assert "USING INDEX" in plan and "SCAN events" not in plan
+    log.close()
+
+    # новий процес: сегмент старший за retention_days видаляється з індексом
+    reopened = EventLog(tmp_path, flush_sec=3600, retention_days=7, clock=lambda: now[0])
+    reopened.emit("log", level="ERROR", logger="x", msg="again")
+    reopened.flush()
+    assert len(query(tmp_path, code=345231, pair="BTC/USDT")) == 2
+    reopened.close()
+
+
+def test_convert_errors_are_queryable_from_cli(convert_sim, tmp_path, capsys):
+    from src import cli
+    from src.core import convert_api, eventlog
+
+    log = eventlog.install(tmp_path / "events")
+    convert_sim.inject("acceptQuote", 345231, times=3)
+    with pytest.raises(RuntimeError):
+        convert_api.execute_conversion("USDT", "BTC", Decimal("5"))
+    log.flush()
+
+    assert cli.main(["events", "--code", "345231", "--pair", "USDT->BTC", "--since", "1h", "--dir", str(log.dir)]) == 0
+    rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert len(rows) == 3 and {r["endpoint"] for r in rows} == {"acceptQuote"}
+    assert all(r["status"] == "400" and r["quoteId"] for r in rows)
+    quote_id = rows[0]["quoteId"]
+    assert {r["endpoint"] for r in eventlog.query(log.dir, quote_id=quote_id)} == {"getQuote", "acceptQuote"}
+    assert eventlog.query(log.dir, kind="log")  # WARNING-и з текстового логу теж у журналі
+
+
+@pytest.mark.bench
+def test_bench_emit(benchmark, tmp_path):
+    from src.core.eventlog import EventLog
+
+    log = EventLog(tmp_path, flush_sec=3600)
+    n = 10000
+
+    def run():
+        for i in range(n):
+            log.emit("http", endpoint="getQuote", pair="USDT/BTC", quoteId=str(i), status="200", ms=1.5)
+
+    benchmark(run, rounds=3)
+    per_emit_us = min(benchmark.timings) / n * 1e6
+    benchmark.extra["emit_us"] = round(per_emit_us, 2)
+    assert log.flush() == 3 * n
+    log.close()
+    assert per_emit_us < 50
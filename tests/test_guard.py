@@ -0,0 +1,117 @@
+import time
+from decimal import Decimal
+
+import pytest
+
+
+def _fill(from_amount, to_amount):
+    return {"orderId": "1", "quote": {"fromAmount": str(from_amount), "toAmount": str(to_amount)}}
+
+
+def test_aggregates_and_vetoes(tmp_path):
+    from src.core.guard import RiskGuard
+
+    now = [1_000_000.0]
+    guard = RiskGuard(
+        tmp_path / "state.json",
+        max_turnover=100,
+        max_asset_exposure=60,
+        max_drawdown=0.005,
+        window_sec=240,
+        clock=lambda: now[0],
+    ).load()
+
+    guard.on_fill("USDT", "BTC", _fill(50, "0.0005"))
+    assert guard.price("BTC") == pytest.approx(100000) and guard.exposure["BTC"] == pytest.approx(50)
+    assert "BTC exposure" in guard.check("USDT", "BTC", 20, "0.0002")
+    assert guard.check("BTC", "USDT", "0.0001", 10) is None
+    assert "turnover" in guard.check("USDT", "ETH", 60)
+
+    now[0] += 241  # вікно обігу минуло
+    assert guard.turnover() == 0 and guard.check("USDT", "ETH", 60) is None
+
+    guard.seed(1000)
+    guard.on_fill("BTC", "USDT", _fill("0.0005", 40))  # продано на 10 USDT дешевше
+    assert guard.drawdown == pytest.approx(0.01) and guard.total_exposure == 0
+    assert "drawdown" in guard.check("USDT", "ETH", 1)
+    assert guard.check("BTC", "USDT", "0.0001", 10) is None  # вихід у стейбл дозволено
+
+    # інший процес: знімка ще немає -> увесь журнал; після flush -> знімок + порожній хвіст
+    other = RiskGuard(tmp_path / "state.json", window_sec=240, clock=lambda: now[0]).load()
+    assert (other.fills, other.value, other.turnover()) == (2, guard.value, guard.turnover())
+    guard.flush()
+    again = RiskGuard(tmp_path / "state.json", window_sec=240, clock=lambda: now[0]).load()
+    assert again.fills == 2 and again.exposure == pytest.approx(guard.exposure)
+
+
+def test_unseeded_guard_skips_drawdown(tmp_path):
+    from src.core.guard import RiskGuard
+
+    guard = RiskGuard(tmp_path / "state.json", max_drawdown=0.05).load()
+    guard.on_fill("USDT", "BTC", _fill("10.00", "0.0001"))
+    guard.on_fill("BTC", "USDT", _fill("0.0001", "10.01"))  # +0.01
+    guard.on_fill("USDT", "BTC", _fill("10.11", "0.0001"))  # -0.11
+    assert not guard.seeded and guard.check("USDT", "ETH", 1) is None
+
+    guard.seed(1000)  # пік із P&L до seed відкинуто
+    assert guard.peak == 1000 and guard.drawdown == 0
+    assert RiskGuard(tmp_path / "state.json").load().seeded
+
+
+def test_execute_route_seeds_guard_from_balances(convert_sim, monkeypatch):
+    from src.core import balance, convert_api, guard, portfolio
+
+    svc = balance.BalanceService({"SPOT": lambda: {"USDT": Decimal("100"), "BTC": Decimal("0.001")}})
+    monkeypatch.setattr(balance, "_default_service", svc)
+    monkeypatch.setattr(portfolio, "fetch_prices", lambda assets: {"USDT": 1.0, "BTC": 100000.0})
+    risk = guard.default_guard()
+    risk.max_drawdown = 0.5
+    convert_api.execute_route(convert_api.route_exists("USDT", "BTC"), Decimal("20"))
+    assert risk.seeded and risk.peak == pytest.approx(200)
+    assert risk.fills == 1 and risk.check("USDT", "ETH", 1) is None
+
+
+def test_rotation_keeps_processes_consistent(tmp_path, monkeypatch):
+    from src.core import guard as guard_mod
+    from src.core.guard import RiskGuard
+
+    monkeypatch.setattr(guard_mod, "_ROTATE_BYTES", 0)  # ротація на кожному знімку
+    a = RiskGuard(tmp_path / "state.json", snapshot_every=1).load()
+    b = RiskGuard(tmp_path / "state.json", snapshot_every=1).load()
+    a.on_fill("USDT", "BTC", _fill(10, "0.0001"))
+    b.on_fill("USDT", "ETH", _fill(10, "0.004"))  # новий inode: b перечитує знімок a
+    a.on_fill("USDT", "BTC", _fill(10, "0.0001"))
+    assert (a.fills, b.load().fills, RiskGuard(tmp_path / "state.json").load().fills) == (3, 3, 3)
+    assert a.exposure == pytest.approx({"BTC": 20, "ETH": 10}) and b.exposure == pytest.approx(a.exposure)
+
+
+def test_execute_conversion_is_vetoed_inline(convert_sim):
+    from src.core import convert_api, guard
+
+    risk = guard.default_guard()
+    risk.max_asset_exposure = 8
+    assert convert_api.execute_conversion("USDT", "BTC", Decimal("5"))["orderId"]
+    with pytest.raises(guard.GuardVeto):
+        convert_api.execute_conversion("USDT", "BTC", Decimal("5"))
+    assert convert_sim.calls["acceptQuote"] == 1 and risk.fills == 1
+
+
+@pytest.mark.bench
+def test_bench_guard_check(benchmark, tmp_path):
+    from src.core.guard import RiskGuard
+
+    guard = RiskGuard(tmp_path / "state.json", max_turnover=1e9, max_asset_exposure=1e9, max_exposure=1e9).load()
+    guard.on_fill("USDT", "BTC", _fill(50, "0.0005"))
+    n = 10000
+
+    def run():
+        for _ in range(n):
+            guard.check("USDT", "BTC", 5, "0.00005")
+
+    benchmark(run, rounds=5)
+    per_check_us = min(benchmark.timings) / n * 1e6
+    benchmark.extra["check_us"] = round(per_check_us, 2)
+    assert per_check_us < 100
+    started = time.perf_counter()
+    guard.on_fill("USDT", "ETH", _fill(5, "0.002"))
+    benchmark.extra["fill_us"] = round((time.perf_counter() - started) * 1e6, 1)
@@ -0,0 +1,38 @@
+from decimal import Decimal
+
+
+def test_incremental_sync_and_details(convert_sim, tmp_path):
+    from src.core import convert_api
+    from src.core.ledger import Ledger
+
+    for amount in ("10", "20"):
+        convert_api.execute_conversion("USDT", "BTC", Decimal(amount))
+    ledger = Ledger(tmp_path / "ledger.sqlite")
+    since = min(o["createTime"] for o in convert_sim.orders.values()) - 1000
+    assert ledger.sync(since) == 2
+    assert ledger.fill_details(since) == 2
+    assert convert_sim.calls["orderStatus"] == 2
+
+    convert_api.execute_conversion("USDT", "BTC", Decimal("30"))
+    flows_before = convert_sim.calls["tradeFlow"]
+    ledger.sync(since)
+    assert convert_sim.calls["tradeFlow"] == flows_before + 1
+    assert ledger.fill_details(since) == 1  # SUCCESS-ордери з деталями не перезапитуються
+
+    rows = ledger.query(since)
+    assert [r["fromAmount"] for r in rows] == ["10", "20", "30"]
+    assert all(r["detail"]["orderStatus"] == "SUCCESS" for r in rows)
+
+
+def test_full_pages_are_split(tmp_path):
+    from src.core import ledger as ledger_mod
+
+    orders = [{"orderId": str(i), "createTime": 1000 + i, "orderStatus": "SUCCESS"} for i in range(10)]
+
+    def fetch(start, end, limit):
+        rows = [o for o in orders if start <= o["createTime"] <= end]
+        return {"list": rows[:3], "moreData": len(rows) > 3}
+
+    ledger = ledger_mod.Ledger(tmp_path / "ledger.sqlite")
+    assert ledger.sync(1000, now=2000, fetch=fetch) == 10
+    assert len(ledger.query(0)) == 10
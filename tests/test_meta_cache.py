@@ -0,0 +1,68 @@
+import pytest
+import requests
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    from src.core import meta_cache
+
+    c = meta_cache.MetaCache(tmp_path / "meta.sqlite", ttl_sec=60)
+    monkeypatch.setattr(meta_cache, "_default_cache", c)
+    return c
+
+
+def test_preload_makes_lookups_local(cache, tmp_path):
+    from src.core.meta_cache import MetaCache
+
+    n = cache.preload_pairs(
+        [
+            {"fromAsset": "USDT", "toAsset": "BTC", "fromAssetMinAmount": "1"},
+            {"fromAsset": "USDT", "toAsset": "ETH", "fromAssetMinAmount": "1"},
+        ]
+    )
+    assert n == 2
+    # інший "процес" бачить ті самі записи
+    other = MetaCache(tmp_path / "meta.sqlite")
+    assert other.get_pair("USDT", "BTC") == (True, {"fromAsset": "USDT", "toAsset": "BTC", "fromAssetMinAmount": "1"})
+    # пари немає у повному списку USDT -> негатив без мережі
+    assert other.get_pair("USDT", "DOGE") == (True, None)
+    assert other.get_pair("BTC", "DOGE") == (False, None)
+
+
+def test_expired_entries_miss(tmp_path):
+    from src.core.meta_cache import MetaCache
+
+    c = MetaCache(tmp_path / "meta.sqlite", ttl_sec=-1)
+    c.put_pair("USDT", "BTC", {"fromAsset": "USDT"})
+    assert c.get_pair("USDT", "BTC") == (False, None)
+
+
+def test_safe_exchange_info_negative_cache(cache, monkeypatch):
+    from src.core import binance_client, convert_api
+
+    calls = []
+
+    def fake(from_asset, to_asset):
+        calls.append((from_asset, to_asset))
+        resp = requests.Response()
+        resp.status_code = 404
+        raise requests.HTTPError(response=resp)
+
+    monkeypatch.setattr(binance_client, "get_convert_exchange_info", fake)
+    assert convert_api._safe_exchange_info("AAA", "BBB") is None
+    assert convert_api._safe_exchange_info("AAA", "BBB") is None
+    assert calls == [("AAA", "BBB")]
+
+
+def test_partial_pair_dump_is_not_treated_as_complete(convert_sim):
+    from src.core import convert_api, meta_cache, route_graph
+
+    # exchangeInfo без фільтрів віддає лише частину пар, як Binance
+    convert_sim.unfiltered_pairs = [("USDT", "BTC")]
+    assert convert_api.route_exists("USDT", "ETH").is_direct
+    assert convert_api.route_exists("ETH", "USDT").description == "hub:BTC"
+    assert convert_api.route_exists("BTC", "DOGE") is None
+    # дамп один раз, далі по запиту на from-актив (USDT, BTC, ETH) замість запиту на кожну пару
+    assert convert_sim.calls["exchangeInfo"] == 4
+    assert route_graph.default_graph() is not None
+    assert not meta_cache.default_cache().is_complete("DOGE")
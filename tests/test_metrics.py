@@ -0,0 +1,46 @@
+import threading
+from decimal import Decimal
+
+
+def test_sharded_recording_and_openmetrics_render():
+    from src.core import metrics
+
+    metrics.reset()
+
+    def work():
+        for i in range(1000):
+            metrics.inc("convert_calls_total", op="getQuote", result="ok")
+            metrics.observe("convert_http_request_duration_ms", i % 50, endpoint="/x", method="GET", status="200")
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    text = metrics.render()
+    assert 'convert_calls_total{op="getQuote",result="ok"} 4000' in text
+    assert 'convert_http_request_duration_ms_bucket{endpoint="/x",method="GET",status="200",le="+Inf"} 4000' in text
+    assert 'convert_http_request_duration_ms_bucket{endpoint="/x",method="GET",status="200",le="10"} 880' in text
+    assert "# TYPE convert_calls counter" in text and text.endswith("# EOF\n")
+    metrics.reset()
+    assert metrics.render() == "# EOF\n"
+
+
+def test_hot_path_is_instrumented(convert_sim, tmp_path):
+    from src.core import convert_api, convert_middleware, metrics
+
+    metrics.reset()
+    convert_sim.inject("getQuote", -1003)
+    quote = convert_middleware.get_quote("USDT", "BTC", Decimal("5"))
+    convert_api.execute_conversion("USDT", "BTC", Decimal("5"))
+    assert convert_middleware.accept_quote(quote)
+
+    path = metrics.write_textfile(tmp_path / "convert.prom")
+    text = path.read_text()
+    assert 'convert_http_retries_total{endpoint="/sapi/v1/convert/getQuote",reason="rate_limit"} 1' in text
+    assert 'endpoint="/sapi/v1/convert/getQuote",method="POST",status="429"' in text
+    assert 'convert_calls_total{op="acceptQuote",result="ok"} 1' in text
+    assert 'convert_calls_total{op="getQuote",result="ok"} 1' in text
+    assert "convert_quote_ttl_remaining_ms_count" in text and "convert_quote_accept_gap_ms_sum" in text
+    assert "convert_sleep_seconds_total" in text
@@ -0,0 +1,92 @@
+from decimal import Decimal
+
+import pytest
+import requests
+
+
+def test_breaker_opens_backs_off_and_resets(tmp_path):
+    from src.core.pair_health import PairHealth
+
+    now = [1000.0]
+    health = PairHealth(
+        tmp_path / "health.json", threshold=3, cooldown_sec=60, max_cooldown_sec=100, clock=lambda: now[0]
+    )
+
+    health.record_error("USDT", "BTC", "other")  # мережеві/інші помилки breaker не рахує
+    for _ in range(2):
+        health.record_error("USDT", "BTC", "business")
+    assert health.allow("USDT", "BTC")
+    health.record_error("usdt", "btc", "expired")
+    assert not health.allow("USDT", "BTC")
+    assert health.state()["USDT/BTC"]["state"] == "open"
+
+    # інший процес бачить той самий стан з диска
+    assert not PairHealth(tmp_path / "health.json", clock=lambda: now[0]).allow("USDT", "BTC")
+
+    now[0] += 61  # напіввідкрита: одна невдача -> cool-down ×2
+    assert health.allow("USDT", "BTC") and health.state()["USDT/BTC"]["state"] == "half-open"
+    health.record_error("USDT", "BTC", "business")
+    assert health.state()["USDT/BTC"]["retry_in"] == 100  # 120, обмежено max_cooldown_sec
+
+    now[0] += 101
+    health.record_success("USDT", "BTC")
+    assert health.state() == {}
+    health.record_error("USDT", "ETH", "business")
+    assert health.reset(["usdt/eth"]) == ["USDT/ETH"]
+
+
+def test_sparse_errors_or_quote_success_break_the_streak(tmp_path):
+    from src.core.pair_health import PairHealth
+
+    now = [1000.0]
+    health = PairHealth(tmp_path / "health.json", threshold=3, window_sec=3600, clock=lambda: now[0])
+    for _ in range(3):  # аналіз раз на тиждень: помилки не поспіль
+        health.record_error("USDT", "BTC", "business")
+        now[0] += 7 * 86400
+    assert health.allow("USDT", "BTC") and health.state()["USDT/BTC"]["fails"] == 1
+
+    health.record_error("USDT", "BTC", "business")
+    health.record_quote_success("USDT", "BTC")
+    health.record_error("USDT", "BTC", "business")
+    assert health.allow("USDT", "BTC") and health.state()["USDT/BTC"]["fails"] == 1
+    health.record_error("USDT", "BTC", "business")
+    health.record_error("USDT", "BTC", "business")
+    assert not health.allow("USDT", "BTC")
+    health.record_quote_success("USDT", "BTC")  # відкритий breaker котирування не закриває
+    assert not health.allow("USDT", "BTC")
+
+
+def test_expired_after_requotes_counts_for_breaker(convert_sim):
+    from src.core import convert_api, pair_health
+
+    convert_sim.inject("acceptQuote", 345231, times=3)
+    with pytest.raises(RuntimeError) as err:
+        convert_api.execute_conversion("USDT", "BTC", Decimal("5"))
+    assert pair_health.error_class(err.value) == "expired"
+    assert pair_health.default_health().state()["USDT/BTC"]["recent"][-1][1] == "expired"
+
+
+def test_open_pair_is_skipped_without_network(convert_sim, capsys):
+    from src import cli
+    from src.core import convert_api, convert_middleware, pair_health, quote_engine
+
+    convert_sim.inject("getQuote", -2010, times=3)
+    for _ in range(3):
+        with pytest.raises(requests.HTTPError):
+            convert_middleware.get_quote("USDT", "BTC", Decimal("5"))
+    calls = convert_sim.calls["getQuote"]
+
+    run = quote_engine.fan_out([quote_engine.QuoteTask("USDT", "BTC", Decimal("5"))])
+    assert run.outcomes[0].skipped and run.outcomes[0].error == "circuit open"
+    with pytest.raises(pair_health.CircuitOpenError):
+        convert_api.execute_conversion("USDT", "BTC", Decimal("5"))
+    assert convert_sim.calls["getQuote"] == calls
+
+    route = convert_api.route_exists("USDT", "BTC")
+    assert route is None or ("USDT", "BTC") not in [(s.from_asset, s.to_asset) for s in route.steps]
+
+    assert cli.main(["health"]) == 0
+    assert '"state": "open"' in capsys.readouterr().out
+    assert cli.main(["health", "--reset", "USDT/BTC"]) == 0
+    assert convert_api.route_exists("USDT", "BTC").description
+    assert convert_api.execute_conversion("USDT", "BTC", Decimal("5"))["orderId"]
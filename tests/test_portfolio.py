@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+
+def test_valuation_peaks_and_drawdown(tmp_path):
+    from src.core.portfolio import Portfolio
+
+    path = tmp_path / "position.json"
+    path.write_text(
+        json.dumps({"assets": {"BTC": 0.001, "USDT": 10}, "peaks": {"BTC": 100000.0}, "portfolio_peak": 150.0, "ts": 1})
+    )
+    book = Portfolio.load(path)
+    assert set(book.assets) == {"BTC", "USDT"}
+
+    val = book.mark({"BTC": 90000.0})
+    assert val.value == pytest.approx(100.0)
+    assert val.peak == 150.0 and val.drawdown == pytest.approx(1 / 3)
+    assert book.asset_drawdowns()["BTC"] == pytest.approx(0.1)
+
+    val = book.mark({"BTC": 200000.0, "ETH": 3000.0})
+    assert val.value == pytest.approx(210.0) and val.drawdown == 0.0
+    assert book.peaks[book.index("BTC")] == 200000.0
+
+    book.save(path)
+    state = json.loads(path.read_text())
+    assert state["assets"] == {"BTC": 0.001, "USDT": 10.0}
+    assert state["peaks"]["ETH"] == 3000.0 and state["portfolio_peak"] == pytest.approx(210.0)
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_index_grows_and_balances_replace():
+    from src.core.portfolio import Portfolio
+
+    book = Portfolio(capacity=2)
+    book.set_balances({f"A{i}": 1.0 for i in range(40)})
+    book.update_prices({f"A{i}": float(i) for i in range(40)})
+    assert len(book) == 40 and book.value() == pytest.approx(sum(range(40)))
+    book.set_balances({"A1": 2.0})
+    assert book.value() == pytest.approx(2.0)
+
+
+def test_fetch_prices_single_request():
+    from src.core.portfolio import fetch_prices
+
+    calls = []
+
+    def get(path):
+        calls.append(path)
+        return [{"symbol": "BTCUSDT", "price": "100"}, {"symbol": "ETHBTC", "price": "0.05"}]
+
+    assert fetch_prices(["btc", "USDT", "XYZ"], get=get) == {"BTC": 100.0, "USDT": 1.0}
+    assert calls == ["/api/v3/ticker/price"]
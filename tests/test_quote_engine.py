@@ -0,0 +1,40 @@
+import time
+from decimal import Decimal
+
+
+def _quote(f, t, amount):
+    from src.core.convert_api import ConvertQuote
+
+    return ConvertQuote("q-" + f + t, f, t, amount, amount * 2, Decimal("2"), 0, {})
+
+
+def test_fan_out_runs_concurrently_and_keeps_order():
+    from src.core.quote_engine import QuoteTask, fan_out
+
+    def slow(f, t, amount, wallet):
+        time.sleep(0.1)
+        return _quote(f, t, amount)
+
+    tasks = [QuoteTask("USDT", f"A{i}", Decimal("1")) for i in range(8)]
+    started = time.perf_counter()
+    run = fan_out(tasks, max_workers=8, quote_fn=slow)
+    assert time.perf_counter() - started < 0.5
+    assert [q.to_asset for q in run.quotes] == [f"A{i}" for i in range(8)]
+    assert run.summary.ok == 8 and run.summary.p50_ms >= 100
+
+
+def test_fan_out_respects_budget_and_norm8(monkeypatch):
+    from src.core import convert_middleware as mw
+    from src.core.quote_engine import QuoteBudget, fan_out, tasks_from_whitelist
+
+    seen = []
+
+    def fake(f, t, amount, wallet):
+        seen.append(amount)
+        return _quote(f, t, amount)
+
+    monkeypatch.setattr(mw, "_orig_get_quote", fake)
+    tasks = tasks_from_whitelist([{"from": "usdt", "to": "btc", "amount": "1.123456789"}] * 3)
+    run = fan_out(tasks, budget=QuoteBudget(2))
+    assert run.summary.ok == 2 and run.summary.skipped == 1
+    assert seen == [Decimal("1.12345678")] * 2
@@ -0,0 +1,54 @@
+from decimal import Decimal
+
+import pytest
+
+
+def _session():
+    from src.core import convert_api, quote_engine
+
+    run = quote_engine.fan_out(
+        [quote_engine.QuoteTask("USDT", asset, Decimal("5")) for asset in ("BTC", "ETH", "BNB")], max_workers=1
+    )
+    order = convert_api.execute_conversion("USDT", "BTC", Decimal("5"))
+    return [o.quote.quote_id for o in run.outcomes], order["orderId"]
+
+
+def _fresh_caches(monkeypatch, tmp_path, name):
+    from src.core import binance_client, convert_api, meta_cache, route_graph
+
+    monkeypatch.setattr(meta_cache, "_default_cache", meta_cache.MetaCache(tmp_path / f"{name}.sqlite"))
+    binance_client.clear_info_cache()
+    route_graph.reset_default_graph()
+    convert_api._route_steps.cache_clear()
+
+
+def test_record_then_replay_without_exchange(convert_sim, tmp_path, monkeypatch):
+    from src.core import binance_client, replay
+
+    log, url = tmp_path / "session.jsonl.gz", convert_sim.url
+    limiter = binance_client.AdaptiveRateLimiter(1000, 1000, max_qps=1000)
+    recorder = replay.RecordingAdapter(log)
+    client = binance_client.BinanceClient("key", "secret", base_url=url, limiter=limiter, adapter=recorder)
+    monkeypatch.setattr(binance_client, "_default_client", client)
+    _fresh_caches(monkeypatch, tmp_path, "record")
+    recorded = _session()
+    client.close()
+    convert_sim.stop()
+
+    rows = list(replay.read_log(log))
+    assert {r["path"] for r in rows} >= {"/sapi/v1/convert/getQuote", "/sapi/v1/convert/acceptQuote"}
+    assert all("signature" not in r["params"] and "timestamp" not in r["params"] for r in rows)
+    assert {s["path"]: s["count"] for s in replay.summarise(log)}["/sapi/v1/convert/getQuote"] == 4
+
+    slept = []
+    player = replay.ReplayAdapter(log, speed=10, sleep=slept.append)
+    client = binance_client.BinanceClient("key", "secret", base_url=url, limiter=limiter, adapter=player)
+    monkeypatch.setattr(binance_client, "_default_client", client)
+    _fresh_caches(monkeypatch, tmp_path, "replay")
+    assert _session() == recorded
+    assert player.served == len(rows) and player.remaining == 0
+    # латентність відтворюється з прискоренням 10x
+    assert sum(slept) == pytest.approx(sum(r["ms"] for r in rows) / 1000.0 / 10)
+
+    with pytest.raises(replay.ReplayMiss):
+        binance_client.post("/sapi/v1/convert/acceptQuote", {"quoteId": "nope"}, signed=True)
@@ -0,0 +1,63 @@
+from decimal import Decimal
+
+PAIRS = [("USDT", "BTC"), ("USDT", "ETH"), ("ETH", "SOL"), ("BTC", "SOL"), ("USDT", "BNB"), ("BNB", "SOL")]
+RATES = {("USDT", "BTC"): "0.5", ("BTC", "SOL"): "2", ("USDT", "ETH"): "1", ("ETH", "SOL"): "1.5"}
+
+
+def test_graph_pairs():
+    from src.core.route_graph import RouteGraph
+
+    g = RouteGraph(PAIRS, complete=["USDT"])
+    assert g.has_pair("USDT", "BTC") and not g.has_pair("BTC", "USDT") and len(g) == len(PAIRS)
+    assert g.is_complete("USDT") and not g.is_complete("BTC")
+
+
+def _fake_quote(f, t, amount, wallet="SPOT"):
+    from src.core.convert_api import ConvertQuote
+
+    rate = Decimal(RATES.get((f, t), "0.1"))
+    return ConvertQuote("q", f, t, amount, amount * rate, rate, 0, {})
+
+
+def test_route_lookup_without_network(tmp_path, monkeypatch):
+    from src.core import binance_client, convert_api, convert_middleware, meta_cache, pair_health, route_graph
+    from src.core.quote_engine import QuoteBudget
+
+    cache = meta_cache.MetaCache(tmp_path / "meta.sqlite")
+    monkeypatch.setattr(meta_cache, "_default_cache", cache)
+    monkeypatch.setattr(pair_health, "_default_health", pair_health.PairHealth(tmp_path / "pair_health.json"))
+    route_graph.reset_default_graph()
+    cache.preload_pairs([{"fromAsset": f, "toAsset": t} for f, t in PAIRS + [("USDT", "XRP"), ("XRP", "DOGE")]])
+
+    def boom(*a, **k):
+        raise AssertionError("network call")
+
+    monkeypatch.setattr(binance_client, "get_convert_exchange_info", boom)
+    convert_api._route_steps.cache_clear()
+    assert convert_api.route_exists("usdt", "sol").description == "hub:BTC"
+    assert len(convert_api.candidate_routes("USDT", "SOL")) == 3
+    # хаби — лише HUB_ASSETS, навіть якщо граф знає інші проміжні активи
+    assert convert_api.route_exists("USDT", "DOGE") is None
+
+    # для виконання хаб обирається за живим курсом, а не порядком HUB_ASSETS
+    monkeypatch.setattr(convert_middleware, "get_quote", _fake_quote)
+    assert convert_api.best_route("USDT", "SOL", Decimal("10")).description == "hub:ETH"
+    assert convert_api.preferred_route(["USDT"], "SOL", Decimal("10")).description == "hub:ETH"
+    assert convert_api.preferred_route(["USDT"], "SOL").description == "hub:BTC"
+    # котирування вибору хабу йдуть з бюджету прогону; вичерпаний бюджет -> перший маршрут
+    budget = QuoteBudget(3)
+    assert convert_api.best_route("USDT", "SOL", Decimal("10"), budget=budget).description == "hub:BTC"
+    assert budget.used == 3
+    route_graph.reset_default_graph()
+    convert_api._route_steps.cache_clear()
+
+
+def test_rank_routes_prefers_best_live_ratio():
+    from src.core.convert_api import ConvertRoute, ConvertStep
+    from src.core.quote_engine import rank_routes
+
+    via_btc = ConvertRoute((ConvertStep("USDT", "BTC"), ConvertStep("BTC", "SOL")))
+    via_eth = ConvertRoute((ConvertStep("USDT", "ETH"), ConvertStep("ETH", "SOL")))
+    ranked = rank_routes([via_btc, via_eth], Decimal("10"), quote_fn=_fake_quote)
+    assert [r.description for r, _ in ranked] == ["hub:ETH", "hub:BTC"]
+    assert ranked[0][1] == Decimal("1.5")
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta, timezone
+
+
+def test_window_bounds_current_next_and_overnight():
+    from src.core.scheduler import window_bounds
+
+    at = datetime(2025, 1, 10, 5, 30, tzinfo=timezone.utc)
+    start, end = window_bounds({"start": "05:00", "end": "06:00"}, at)
+    assert (start.day, start.hour, end.hour) == (10, 5, 6)
+    start, _ = window_bounds({"start": "05:00", "end": "06:00"}, at.replace(hour=7))
+    assert (start.day, start.hour) == (11, 5)
+    start, end = window_bounds({"start": "22:00", "end": "02:00"}, at.replace(hour=1))
+    assert (start.day, start.hour, end.day, end.hour) == (9, 22, 10, 2)
+    assert window_bounds({}, at) is None
+
+
+def test_paced_budget_spreads_slots():
+    from src.core.quote_engine import PacedBudget
+
+    now = [0.0]
+    waits = []
+
+    def sleep(sec):
+        waits.append(sec)
+        now[0] += sec
+
+    budget = PacedBudget(4, 40.0, sleep=sleep, clock=lambda: now[0])
+    assert all(budget.take() for _ in range(4)) and not budget.take()
+    # кожен слот — у своєму 10-секундному інтервалі
+    assert [int(t // 10) for t in (sum(waits[: i + 1]) for i in range(len(waits)))] == [0, 1, 2, 3]
+
+    # задач менше за ліміт -> слоти ширші, щоб покрити весь інтервал
+    waits.clear()
+    budget = PacedBudget(50, 40.0, sleep=sleep, clock=lambda: now[0])
+    budget.plan(2)
+    assert budget.take() and budget.take()
+    assert 20 <= sum(waits) < 40
+
+
+def test_run_window_runs_analyze_then_trade_in_one_process(convert_sim, tmp_path, monkeypatch):
+    from src import app, daemon
+    from src.core import scheduler
+
+    now = datetime.now(timezone.utc)
+    start = now - timedelta(seconds=30)
+    monkeypatch.setattr(
+        scheduler,
+        "region_window",
+        lambda region: {"start": start.strftime("%H:%M"), "end": (start + timedelta(hours=1)).strftime("%H:%M")},
+    )
+    warmed = []
+    monkeypatch.setattr(daemon, "warm_up", lambda: warmed.append(True))
+    slept = []
+    routes = [{"from": "USDT", "to": "BTC", "amount": "5"}, {"from": "USDT", "to": "ETH", "amount": "5"}]
+
+    runs = app.run_window("asia", True, routes=routes, out_dir=tmp_path, now=now, sleep=slept.append)
+    assert warmed == [True]
+    assert runs["analyze"].summary.ok == 2 and runs["trade"].summary.ok == 2
+    # бюджет розподілено в часі: кожне котирування чекало на свій слот, плюс очікування до trade
+    assert len(slept) >= 4 and max(slept) > 60
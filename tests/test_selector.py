@@ -0,0 +1,83 @@
+import random
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+
+def _tasks(pairs):
+    from src.core.quote_engine import QuoteTask
+
+    return [QuoteTask(a, b, Decimal(str(amount))) for a, b, amount in pairs]
+
+
+def test_scores_edge_slippage_and_rejections():
+    from src.strategy.selector import SelectorInputs, score_routes, top_k
+
+    tasks = _tasks(
+        [
+            ("USDT", "BTC", 10),  # ratio на 2% кращий за історію
+            ("USDT", "ETH", 10),  # на рівні історії, велика частка ліміту
+            ("USDT", "SOL", 10),  # без котирування analyze
+            ("USDT", "BNB", 10),  # впав в analyze
+            ("USDT", "XRP", 0.5),  # нижче мінімуму
+        ]
+    )
+    inputs = SelectorInputs(
+        quotes={("USDT", "BTC"): 1.02, ("USDT", "ETH"): 1.0, ("USDT", "XRP"): 1.0},
+        failed={("USDT", "BNB")},
+        fills={("USDT", "BTC"): 1.0, ("USDT", "ETH"): 1.0},
+        limits=lambda a, b: (1.0, 20.0 if b == "ETH" else 1000.0),
+    )
+    scores = score_routes(tasks, inputs, fee_bps=0, slippage_bps=10)
+    assert scores[0] == pytest.approx(0.02 - 0.001 * 10 / 1000)
+    assert scores[1] == pytest.approx(-0.001 * 0.5)
+    assert scores[2] < scores[1] and np.isfinite(scores[2])
+    assert np.isneginf(scores[3]) and np.isneginf(scores[4])
+    assert list(top_k(scores, 2)) == [0, 1]
+    assert list(top_k(scores, 10)) == [0, 1, 2]
+
+
+def test_select_routes_reads_last_analyze_run(tmp_path):
+    from src.core import candidates
+    from src.strategy import selector
+
+    with candidates.CandidateSink(tmp_path, "asia", "analyze") as sink:
+        sink.write({"from": "USDT", "to": "ETH", "ok": 0, "error": "345103"})
+        sink.write({"from": "USDT", "to": "BTC", "ok": 1, "ratio": "0.00001"})
+    tasks = _tasks([("USDT", "ETH", 5), ("USDT", "SOL", 5), ("USDT", "BTC", 5)])
+    inputs = selector.load_inputs("asia", tmp_path, with_history=False)
+    picked = selector.select_routes(tasks, "asia", tmp_path, k=5, inputs=inputs)
+    assert [t.to_asset for t in picked] == ["BTC", "SOL"]
+    # без даних analyze порядок whitelist не змінюється
+    assert selector.select_routes(tasks, "us", tmp_path, inputs=selector.SelectorInputs()) == tasks
+
+
+def test_routes_for_phase():
+    from src.strategy.selector import routes_for_phase
+
+    routes = [
+        {"from": "A", "to": "B"},
+        {"from": "A", "to": "C", "phase": "trade"},
+        {"from": "A", "to": "D", "phase": ["analyze"]},
+    ]
+    assert [r["to"] for r in routes_for_phase(routes, "trade")] == ["B", "C"]
+    assert [r["to"] for r in routes_for_phase(routes, "analyze")] == ["B", "D"]
+
+
+@pytest.mark.bench
+def test_bench_selector_10k_routes(benchmark):
+    from src.strategy.selector import SelectorInputs, score_routes, top_k
+
+    rng = random.Random(7)
+    assets = [f"A{i}" for i in range(400)]
+    tasks = _tasks([(rng.choice(assets), rng.choice(assets), rng.uniform(1, 500)) for _ in range(12000)])
+    pairs = {(t.from_asset, t.to_asset) for t in tasks}
+    inputs = SelectorInputs(
+        quotes={p: rng.uniform(0.9, 1.1) for p in pairs if rng.random() < 0.8},
+        fills={p: 1.0 for p in pairs if rng.random() < 0.5},
+        limits=lambda a, b: (1.0, 1000.0),
+    )
+    picked = benchmark(lambda: top_k(score_routes(tasks, inputs), 50), rounds=10)
+    assert picked.size == 50
+    benchmark.extra["routes"] = len(tasks)
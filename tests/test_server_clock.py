@@ -0,0 +1,56 @@
+from decimal import Decimal
+
+
+def test_offset_applied_to_signed_requests(convert_sim):
+    from src.core import binance_client, convert_api
+
+    convert_sim.clock_skew_ms = -4000  # сервер відстає на 4 с: локальний timestamp -> -1021
+    result = convert_api.execute_conversion("USDT", "BTC", Decimal("10"))
+    assert result["orderId"]
+    clock = binance_client.default_client().clock
+    assert abs(clock.offset_ms + 4000) < 200
+    assert clock.timestamp_errors == 0
+    assert abs(binance_client.server_now_ms() - convert_sim.now_ms()) < 200
+
+
+def test_timestamp_error_resyncs_once(convert_sim):
+    from src.core import binance_client, convert_middleware
+
+    client = binance_client.default_client()
+    client.clock.offset_ms, client.clock.synced_at = 0.0, 1e18  # "синхронізовано", але зсув застарів
+    convert_sim.clock_skew_ms = 6000  # локальний timestamp старший за recvWindow
+    quote = convert_middleware.get_quote("USDT", "BTC", Decimal("1"))
+    assert quote is not None
+    assert client.clock.timestamp_errors == 1 and client.clock.sync_count == 1
+    convert_middleware.get_quote("USDT", "BTC", Decimal("1"))
+    assert client.clock.timestamp_errors == 1
+
+
+def test_large_skew_corrected_by_single_resync(convert_sim):
+    from src.core import binance_client, convert_middleware
+
+    client = binance_client.default_client()
+    client.clock.sync()
+    # зсув більший за recvWindow / alpha: згладжене оновлення лишило б timestamp поза вікном
+    convert_sim.clock_skew_ms = 60000
+    assert convert_middleware.get_quote("USDT", "BTC", Decimal("1")) is not None
+    assert client.clock.timestamp_errors == 1 and abs(client.clock.offset_ms - 60000) < 1000
+    convert_middleware.get_quote("USDT", "BTC", Decimal("1"))
+    assert client.clock.timestamp_errors == 1
+
+
+def test_clock_picks_lowest_rtt_sample():
+    import time
+
+    from src.core.binance_client import ServerClock
+
+    delays = iter([0.05, 0.0, 0.03])
+
+    def fetch():
+        delay = next(delays)
+        time.sleep(delay)
+        return int(time.time() * 1000) + 1000 - int(delay * 500)
+
+    clock = ServerClock(fetch, samples=3)
+    clock.sync()
+    assert abs(clock.offset_ms - 1000) < 10
@@ -0,0 +1,104 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+REPO = Path(__file__).resolve().parents[1]
+HEAVY = ("requests", "numpy", "src.core.convert_api", "src.core.convert_middleware")
+# холодний старт точки входу понад голий інтерпретатор (python -c pass)
+COLD_START_BUDGET_MS = 120
+
+
+def _env(tmp_path, **overrides):
+    """Оточення дочірнього процесу: config_dev3 тестів + перевизначення (стан — у tmp_path)."""
+
+    import config_dev3
+
+    cfg = tmp_path / "cfg"
+    cfg.mkdir(exist_ok=True)
+    overrides.setdefault("PAIR_HEALTH_PATH", str(tmp_path / "pair_health.json"))
+    overrides.setdefault("META_CACHE_PATH", str(tmp_path / "meta.sqlite"))
+    overrides.setdefault("DAEMON_SOCKET", str(tmp_path / "daemon.sock"))
+    overrides.setdefault("EVENT_LOG_DIR", str(tmp_path / "events"))
+    lines = [
+        "import runpy as _runpy",
+        f"globals().update({{k: v for k, v in _runpy.run_path({config_dev3.__file__!r}).items() if k[:2] != '__'}})",
+    ]
+    lines += [f"{key} = {value!r}" for key, value in overrides.items()]
+    (cfg / "config_dev3.py").write_text("\n".join(lines) + "\n")
+    return dict(os.environ, PYTHONPATH=os.pathsep.join([str(cfg), str(REPO)]))
+
+
+def _far_window():
+    """Вікно на 6 год пізніше: cron-запуск ``src.app`` виходить одразу."""
+
+    start = datetime.now(timezone.utc) + timedelta(hours=6)
+    return {"start": start.strftime("%H:%M"), "end": (start + timedelta(minutes=30)).strftime("%H:%M")}
+
+
+def _run(env, *args):
+    return subprocess.run([sys.executable, *args], cwd=REPO, env=env, capture_output=True, text=True, timeout=60)
+
+
+def _report(stderr):
+    return json.loads(stderr[stderr.rindex('{\n  "entry"') :])
+
+
+def test_entry_points_do_not_import_convert_stack(tmp_path):
+    code = f"import sys, src, src.cli, src.app; print([m for m in {HEAVY!r} if m in sys.modules])"
+    proc = _run(_env(tmp_path), "-c", code)
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.strip() == "[]"
+
+    # сумісність: src.convert_middleware вантажиться при першому зверненні
+    proc = _run(_env(tmp_path), "-c", "import src; print(src.convert_middleware.get_quote.__name__)")
+    assert proc.stdout.strip() == "_wrapped_get_quote", proc.stderr
+
+
+def test_profile_startup_reports_imports_and_first_request(convert_sim, tmp_path):
+    env = _env(tmp_path, BASE=convert_sim.url)
+    proc = _run(env, "-m", "src.cli", "--no-daemon", "--profile-startup", "info", "USDT", "BTC")
+    assert proc.returncode == 0, proc.stderr
+    assert json.loads(proc.stdout)["route"]
+
+    report = _report(proc.stderr)
+    modules = {row["module"]: row for row in report["imports"]["top"]}
+    assert {"src.core.convert_api", "requests"} <= set(modules)
+    assert modules["src.core.convert_api"]["cumulative_ms"] >= modules["src.core.convert_api"]["self_ms"]
+    first = report["first_request"]
+    assert first["path"].startswith(("/api/", "/sapi/")) and first["status"] == "200"
+    assert report["requests"][0] == first and report["phases"]["command"] > 0
+
+    env = _env(tmp_path, ASIA_WINDOW=_far_window())
+    proc = _run(env, "-m", "src.app", "--region", "asia", "--phase", "trade", "--profile-startup")
+    assert proc.returncode == 0 and "outside market window" in proc.stderr
+    assert _report(proc.stderr)["imports"]["count"] == 0
+
+
+@pytest.mark.bench
+def test_bench_cold_start(benchmark, tmp_path):
+    env = _env(tmp_path, ASIA_WINDOW=_far_window())
+    commands = {
+        "baseline": ["-c", "pass"],
+        "cli": ["-m", "src.cli", "health"],
+        "cron": ["-m", "src.app", "--region", "asia", "--phase", "trade", "--no-jitter"],
+    }
+    best = {}
+    for name, args in commands.items():
+        timings = []
+        for _ in range(5):
+            started = time.perf_counter()
+            assert _run(env, *args).returncode == 0
+            timings.append(time.perf_counter() - started)
+        best[name] = min(timings) * 1000.0
+        if name == "cli":
+            benchmark.timings.extend(timings)
+    for name in ("cli", "cron"):
+        overhead = best[name] - best["baseline"]
+        benchmark.extra[f"{name}_ms"] = round(overhead, 1)
+        assert overhead < COLD_START_BUDGET_MS, f"{name} cold start {overhead:.0f}ms over interpreter"